@@ -0,0 +1,190 @@
+"""
+转换内容选择
+在转换前把输入文件裁剪为所选内容，转换器只处理选中的部分，耗时与所选范围成正比：
+1.PDF按页码选择（pages、max_pages），用PyPDF2复制所选页面生成新PDF，不解析未选页面的内容流
+2.DOCX、Markdown按标题选择章节（section），从匹配的标题开始，到下一个同级或更高级标题之前结束
+build_selection在主进程中校验参数，select_content在转换进程中执行裁剪
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.pdf_converter", "Agents.FileConvertAgents.docx_converter")
+
+# 支持页码选择、章节选择的输入格式
+PAGE_SELECTION_FORMATS = {".pdf"}
+SECTION_SELECTION_FORMATS = {".docx", ".md"}
+
+_PAGE_RANGE_PATTERN = re.compile(r'^(\d+)(?:\s*-\s*(\d*))?$')
+_MD_HEADING_PATTERN = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t#]*$')
+_MD_FENCE_PATTERN = re.compile(r'^ {0,3}(```|~~~)')
+
+
+def parse_page_ranges(pages: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    解析页码范围（从1开始），如 "1-5,8,10-"，结束页为None表示到最后一页
+
+    Raises:
+        ValueError: 格式错误
+    """
+    ranges = []
+    for part in pages.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = _PAGE_RANGE_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"页码格式错误: {part}，示例: 1-5,8,10-")
+        start = int(match.group(1))
+        if match.group(2) is None:
+            end = start
+        else:
+            end = int(match.group(2)) if match.group(2) else None
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"页码范围无效: {part}")
+        ranges.append((start, end))
+    if not ranges:
+        raise ValueError("页码范围不能为空")
+    return ranges
+
+
+def build_selection(source_ext: str, pages: Optional[str] = None, max_pages: Optional[int] = None,
+                    section: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    校验选择参数，返回传给select_content的选择条件；未指定任何选择时返回None
+
+    Raises:
+        ValueError: 参数错误或输入格式不支持该选择方式
+    """
+    section = section.strip() if section else None
+    if not pages and max_pages is None and not section:
+        return None
+
+    if pages or max_pages is not None:
+        if source_ext not in PAGE_SELECTION_FORMATS:
+            raise ValueError(f"页码选择仅支持: {', '.join(sorted(PAGE_SELECTION_FORMATS))}")
+        if max_pages is not None and max_pages < 1:
+            raise ValueError("max_pages必须大于0")
+    if section and source_ext not in SECTION_SELECTION_FORMATS:
+        raise ValueError(f"章节选择仅支持: {', '.join(sorted(SECTION_SELECTION_FORMATS))}")
+
+    return {
+        "pages": parse_page_ranges(pages) if pages else None,
+        "max_pages": max_pages,
+        "section": section
+    }
+
+
+def selection_key(selection: Dict[str, Any]) -> str:
+    """选择条件的规范化表示，用于转换缓存键"""
+    pages = ','.join(f"{start}-{'' if end is None else end}" for start, end in selection["pages"] or [])
+    return f"pages={pages};max_pages={selection['max_pages'] or ''};section={selection['section'] or ''}"
+
+
+def select_content(input_path: str, output_path: str, source_ext: str, selection: Dict[str, Any]):
+    """将输入文件裁剪为所选内容写入output_path（在转换进程中执行）"""
+    if source_ext == ".pdf":
+        _select_pdf_pages(input_path, output_path, selection["pages"], selection["max_pages"])
+    elif source_ext == ".md":
+        _select_md_section(input_path, output_path, selection["section"])
+    elif source_ext == ".docx":
+        _select_docx_section(input_path, output_path, selection["section"])
+    else:
+        raise ValueError(f"不支持选择内容的输入格式: {source_ext}")
+
+
+def _select_pdf_pages(input_path: str, output_path: str, ranges: Optional[List[Tuple[int, Optional[int]]]], max_pages: Optional[int]):
+    from Agents.FileConvertAgents.pdf_converter import get_page_count, extract_pdf_pages
+
+    page_count = get_page_count(input_path)
+    ranges = ranges or [(1, None)]
+    selected = set()
+    for start, end in ranges:
+        selected.update(range(start, min(page_count if end is None else end, page_count) + 1))
+    page_numbers = sorted(selected)
+    if max_pages is not None:
+        page_numbers = page_numbers[:max_pages]
+    if not page_numbers:
+        raise ValueError(f"所选页码超出文档页数（共{page_count}页）")
+
+    extract_pdf_pages(input_path, output_path, page_numbers)
+
+
+def _match_section(headings: List[Tuple[int, int, str]], section: str) -> Tuple[int, int]:
+    """
+    在标题列表 [(位置, 级别, 标题文本)] 中查找章节，优先完全匹配（忽略大小写），其次包含匹配
+
+    Returns:
+        (标题位置, 标题级别)
+    """
+    target = section.casefold()
+    for position, level, text in headings:
+        if text.strip().casefold() == target:
+            return position, level
+    for position, level, text in headings:
+        if target in text.casefold():
+            return position, level
+    raise ValueError(f"未找到章节: {section}")
+
+
+def _section_end(headings: List[Tuple[int, int, str]], start: int, level: int, default: int) -> int:
+    """章节结束位置：下一个同级或更高级标题的位置"""
+    for position, other_level, _ in headings:
+        if position > start and other_level <= level:
+            return position
+    return default
+
+
+def _select_md_section(input_path: str, output_path: str, section: str):
+    """按行扫描ATX标题（跳过代码块），只保留所选章节的文本，Markdown解析只处理这部分"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+
+    headings = []
+    fence = None
+    for index, line in enumerate(lines):
+        fence_match = _MD_FENCE_PATTERN.match(line)
+        if fence_match:
+            if fence is None:
+                fence = fence_match.group(1)
+            elif fence_match.group(1) == fence:
+                fence = None
+            continue
+        if fence is None:
+            match = _MD_HEADING_PATTERN.match(line)
+            if match:
+                headings.append((index, len(match.group(1)), match.group(2) or ""))
+
+    start, level = _match_section(headings, section)
+    end = _section_end(headings, start, level, len(lines))
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines[start:end]))
+
+
+def _select_docx_section(input_path: str, output_path: str, section: str):
+    """删除正文中所选章节以外的段落和表格（保留节属性），转换器只遍历所选章节"""
+    from docx import Document
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph
+    from Agents.FileConvertAgents.docx_converter import heading_level
+
+    doc = Document(input_path)
+    body = doc.element.body
+    elements = [element for element in body.iterchildren() if element.tag != qn('w:sectPr')]
+
+    headings = []
+    style_cache = {}
+    for index, element in enumerate(elements):
+        if element.tag == qn('w:p'):
+            paragraph = Paragraph(element, doc)
+            level = heading_level(paragraph, style_cache)
+            if level:
+                headings.append((index, level, paragraph.text))
+
+    start, level = _match_section(headings, section)
+    end = _section_end(headings, start, level, len(elements))
+    for element in elements[:start] + elements[end:]:
+        body.remove(element)
+
+    doc.save(output_path)
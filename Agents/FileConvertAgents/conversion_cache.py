@@ -0,0 +1,164 @@
+"""
+文档转换结果缓存
+以（上传内容SHA-256, 源扩展名, 目标扩展名, 转换器版本, 转换选项）为键，在本地磁盘缓存转换结果，按总大小做LRU淘汰
+转换器版本取转换器模块及其依赖模块（CACHE_DEPENDENCIES，逐层展开）源码的哈希，修改转换器或其依赖的代码后旧缓存自动失效
+"""
+import hashlib
+import importlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from Configs.FileConvertConfig.convert_config_init import conversion_config
+
+logger = logging.getLogger("convert_run")
+
+_converter_versions = {}
+
+
+def _dependency_files(module_name, files):
+    """模块及其CACHE_DEPENDENCIES（逐层展开）的源码文件，按首次出现的顺序加入files"""
+    module = importlib.import_module(module_name)
+    if module.__file__ in files:
+        return
+    files.append(module.__file__)
+    for dependency in getattr(module, "CACHE_DEPENDENCIES", ()):
+        _dependency_files(dependency, files)
+
+
+def converter_version(converter_name):
+    """转换器模块及其依赖模块的源码哈希（前12位），进程内缓存"""
+    version = _converter_versions.get(converter_name)
+    if version is None:
+        digest = hashlib.sha256()
+        files = []
+        _dependency_files(f"Agents.FileConvertAgents.{converter_name}", files)
+        for path in files:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        version = digest.hexdigest()[:12]
+        _converter_versions[converter_name] = version
+    return version
+
+
+def _link_or_copy(src, dst):
+    """优先硬链接（同一文件系统时不复制数据），失败时复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class ConversionCache:
+    """磁盘转换结果缓存，条目文件名为 {缓存键}{目标扩展名}"""
+
+    def __init__(self, cache_dir, max_size_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self._entries = OrderedDict()  # 缓存键 -> (文件路径, 大小)，按最近使用排序
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+            "evictions": 0
+        }
+        self._load_index()
+
+    def _load_index(self):
+        """启动时扫描缓存目录，按最后访问时间恢复LRU顺序"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                files.append((stat.st_atime, entry.name, entry.path, stat.st_size))
+        for _, name, path, size in sorted(files):
+            self._entries[Path(name).stem] = (path, size)
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def make_key(content_hash, source_ext, target_ext, version, options=""):
+        """options为影响转换结果的选项（如页码、章节选择），为空时与未加选项前的键一致"""
+        raw = f"{content_hash}|{source_ext}|{target_ext}|{version}"
+        if options:
+            raw += f"|{options}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def fetch(self, key, output_path):
+        """命中时将缓存结果放到output_path并返回True"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return False
+            path, size = entry
+            try:
+                _link_or_copy(path, output_path)
+            except OSError as e:
+                # 缓存文件被外部删除
+                logger.warning(f"Conversion cache entry unreadable, dropping: {path}: {e}")
+                del self._entries[key]
+                self._size -= size
+                self.stats["misses"] += 1
+                return False
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += size
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def store(self, key, output_path, target_ext):
+        """保存转换结果；单个结果超过缓存上限时不缓存"""
+        size = os.path.getsize(output_path)
+        if size > self.max_size_bytes:
+            return
+        path = str(self.cache_dir / f"{key}{target_ext}")
+        temp_path = str(self.cache_dir / f".{key}.{uuid.uuid4().hex[:8]}.tmp")
+        _link_or_copy(output_path, temp_path)
+        os.replace(temp_path, path)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (path, size)
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_size_bytes and self._entries:
+            _, (path, size) = self._entries.popitem(last=False)
+            self._size -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_size_bytes": self.max_size_bytes
+            }
+
+
+_cache_config = conversion_config.get("cache", {})
+# 创建全局转换缓存实例（未启用时为None）
+conversion_cache = ConversionCache(
+    _cache_config.get("path", "./Files/ConvertCache"),
+    int(_cache_config.get("maxSizeMb", 1024) * 1024 * 1024)
+) if _cache_config.get("enabled", True) else None
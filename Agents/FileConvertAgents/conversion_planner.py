@@ -0,0 +1,227 @@
+"""
+转换路径规划
+conversion_map中的直接转换构成有向图（源格式 -> 目标格式），没有直接转换的格式对按边的代价求最短转换链，
+如 pdf -> md -> docx、yaml -> json -> csv
+1.边的代价为每MiB输入的转换耗时（秒），以配置中的估计值为初始值，按实际转换耗时做指数滑动平均；
+  同时记录输出与输入的大小比，转换链的代价按每一步输入的实际大小折算为每MiB源文件的耗时
+2.存在直接转换时始终使用直接转换，不经过中间格式；纯文本等会丢失文档结构的格式不作为中间格式（excludedIntermediates）
+3.转换链在一个转换进程任务中执行（convert_chain），中间结果以文本形式留在内存中，
+  下一步通过 parse_document（统一文档模型）或 parse_data（JSON、YAML）直接解析；
+  仅当下一步的转换器只接受文件路径（如 docx -> pdf）时才将中间结果写入请求的临时目录
+"""
+import importlib
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from Configs.FileConvertConfig.convert_config_init import conversion_config
+
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.document_model",)
+
+# 计算每MiB耗时时输入大小的下限（MiB），避免很小的文件因固定开销得到过高的代价；小于该大小的输入也不计入大小比
+_MIN_SAMPLE_MIB = 1 / 16
+
+
+class Route(NamedTuple):
+    """转换路径：path为依次经过的格式（含源格式和目标格式），cost为估计的每MiB源文件转换耗时（秒）"""
+    path: Tuple[str, ...]
+    cost: float
+
+
+class ConversionPlanner:
+    """按边的代价在转换图上求代价最小的转换链"""
+
+    def __init__(self, conversion_map, default_cost=1.0, estimated_costs=None, estimated_size_ratios=None,
+                 excluded_intermediates=(), max_hops=3, smoothing=0.2):
+        self.graph = {source_ext: list(target_info["target_formats"]) for source_ext, target_info in conversion_map.items()}
+        self.default_cost = default_cost
+        self.estimated_costs = estimated_costs or {}
+        self.estimated_size_ratios = estimated_size_ratios or {}
+        self.excluded_intermediates = set(excluded_intermediates)
+        self.max_hops = max_hops
+        self.smoothing = smoothing
+        self._measured = {}  # (源格式, 目标格式) -> [每MiB耗时, 输出/输入大小比, 样本数]，均为滑动平均
+
+    def edge_cost(self, source_ext: str, target_ext: str) -> float:
+        """每MiB输入的转换耗时（秒）"""
+        measured = self._measured.get((source_ext, target_ext))
+        if measured is not None:
+            return measured[0]
+        return self.estimated_costs.get(source_ext, {}).get(target_ext, self.default_cost)
+
+    def size_ratio(self, source_ext: str, target_ext: str) -> float:
+        """输出与输入的大小比，未配置估计值时按1估计"""
+        measured = self._measured.get((source_ext, target_ext))
+        if measured is not None:
+            return measured[1]
+        return self.estimated_size_ratios.get(source_ext, {}).get(target_ext, 1.0)
+
+    def record(self, source_ext: str, target_ext: str, seconds: float, input_bytes: int, output_bytes: int):
+        """记录一次实际转换的耗时和输出大小，更新边的代价"""
+        size_mib = input_bytes / (1024 * 1024)
+        cost = seconds / max(size_mib, _MIN_SAMPLE_MIB)
+        # 小文件的输出大小主要由模板等固定内容决定，不计入大小比
+        ratio = output_bytes / input_bytes if size_mib >= _MIN_SAMPLE_MIB else None
+        measured = self._measured.get((source_ext, target_ext))
+        if measured is None:
+            # 以估计值作为滑动平均的初始值，少量样本不会让该边的代价与其余未测得的边相差悬殊
+            measured = [self.edge_cost(source_ext, target_ext), self.size_ratio(source_ext, target_ext), 0]
+            self._measured[(source_ext, target_ext)] = measured
+        measured[0] += self.smoothing * (cost - measured[0])
+        if ratio is not None:
+            measured[1] += self.smoothing * (ratio - measured[1])
+        measured[2] += 1
+
+    def path_cost(self, path: Tuple[str, ...]) -> float:
+        """转换链的估计代价：每一步的代价按该步输入相对源文件的大小缩放后求和"""
+        cost = 0.0
+        scale = 1.0
+        for source_ext, target_ext in zip(path, path[1:]):
+            cost += scale * self.edge_cost(source_ext, target_ext)
+            scale *= self.size_ratio(source_ext, target_ext)
+        return cost
+
+    def routes(self, source_ext: str) -> Dict[str, Route]:
+        """
+        从源格式出发可到达的所有目标格式及其转换路径：有直接转换时使用直接转换，
+        其余取不超过max_hops步的转换链中代价最小的一条（代价随中间结果大小缩放，不满足可加性，转换图很小，直接枚举所有简单路径）
+        """
+        best = {}
+        stack = [(source_ext,)]
+        while stack:
+            path = stack.pop()
+            node = path[-1]
+            if len(path) > 1:
+                cost = self.path_cost(path)
+                if node not in best or cost < best[node].cost:
+                    best[node] = Route(path, cost)
+            if len(path) > self.max_hops or (len(path) > 1 and node in self.excluded_intermediates):
+                continue
+            for target_ext in self.graph.get(node, []):
+                if target_ext not in path:
+                    stack.append(path + (target_ext,))
+
+        for target_ext in self.graph.get(source_ext, []):
+            best[target_ext] = Route((source_ext, target_ext), self.edge_cost(source_ext, target_ext))
+        return best
+
+    def plan(self, source_ext: str, target_ext: str) -> Optional[Route]:
+        """源格式到目标格式的转换路径，无法到达时返回None"""
+        if target_ext in self.graph.get(source_ext, []):
+            return Route((source_ext, target_ext), self.edge_cost(source_ext, target_ext))
+        return self.routes(source_ext).get(target_ext)
+
+    def get_stats(self):
+        return {
+            f"{source_ext}->{target_ext}": {"cost": round(cost, 4), "size_ratio": round(ratio, 4), "samples": samples}
+            for (source_ext, target_ext), (cost, ratio, samples) in sorted(self._measured.items())
+        }
+
+
+# ==================== 转换链执行（在转换进程中） ====================
+
+def _converter_module(source_ext: str):
+    converter_name = conversion_config["conversion_map"][source_ext]["converter"]
+    return importlib.import_module(f"Agents.FileConvertAgents.{converter_name}")
+
+
+def timed_convert(converter_name: str, func_name: str, input_path: str, output_path: str) -> float:
+    """执行直接转换并返回耗时（秒），用于更新边的代价"""
+    module = importlib.import_module(f"Agents.FileConvertAgents.{converter_name}")
+    start = time.perf_counter()
+    getattr(module, func_name)(input_path, output_path)
+    return time.perf_counter() - start
+
+
+def _convert_in_memory(module, source_ext: str, target_ext: str, content: str) -> Optional[Union[str, bytes]]:
+    """转换上一步在内存中的输出，转换器不支持解析文本时返回None"""
+    from Agents.FileConvertAgents import document_model
+
+    if hasattr(module, "parse_document") and target_ext in document_model.RENDERERS:
+        return document_model.render_document(module.parse_document(content), target_ext)
+    dump = getattr(module, f"dump_{source_ext[1:]}_to_{target_ext[1:]}", None)
+    if dump is not None and hasattr(module, "parse_data"):
+        return dump(module.parse_data(content))
+    return None
+
+
+def _convert_file(module, source_ext: str, target_ext: str, input_path: str, step_output_path: str) -> Optional[Union[str, bytes]]:
+    """
+    转换文件输入：转换器能在内存中生成结果时返回结果，否则调用 convert_{源格式}_to_{目标格式} 写入step_output_path并返回None
+    """
+    from Agents.FileConvertAgents import document_model
+
+    if hasattr(module, "build_document") and target_ext in document_model.RENDERERS:
+        return document_model.render_document(module.build_document(input_path), target_ext)
+    dump = getattr(module, f"dump_{source_ext[1:]}_to_{target_ext[1:]}", None)
+    if dump is not None and hasattr(module, "load_data"):
+        return dump(module.load_data(input_path))
+    stream = getattr(module, f"stream_{source_ext[1:]}_to_{target_ext[1:]}", None)
+    if stream is not None:
+        return ''.join(stream(input_path))
+    getattr(module, f"convert_{source_ext[1:]}_to_{target_ext[1:]}")(input_path, step_output_path)
+    return None
+
+
+def _content_size(content: Union[str, bytes]) -> int:
+    return len(content.encode("utf-8")) if isinstance(content, str) else len(content)
+
+
+def convert_chain(input_path: str, output_path: str, path: List[str]) -> List[Tuple[str, str, float, int, int]]:
+    """
+    按转换路径逐步转换（在转换进程中执行），中间结果不落盘
+
+    Args:
+        path: 依次经过的格式，如 [".pdf", ".md", ".docx"]
+
+    Returns:
+        每一步的 [(源格式, 目标格式, 耗时秒数, 输入字节数, 输出字节数)]，用于更新边的代价
+    """
+    from Agents.FileConvertAgents import document_model
+
+    work_dir = os.path.dirname(output_path)
+    timings = []
+    content = None  # 上一步在内存中的输出；为None时上一步输出在文件current_path中
+    current_path = input_path
+    steps = list(zip(path, path[1:]))
+    for index, (source_ext, target_ext) in enumerate(steps):
+        module = _converter_module(source_ext)
+        start = time.perf_counter()
+        if content is not None:
+            input_bytes = _content_size(content)
+            result = _convert_in_memory(module, source_ext, target_ext, content) if isinstance(content, str) else None
+            if result is None:
+                # 转换器只接受文件路径
+                current_path = os.path.join(work_dir, f"chain_{index}{source_ext}")
+                document_model.write_content(content, current_path, newline="")
+        else:
+            input_bytes = os.path.getsize(current_path)
+            result = None
+        if result is None:
+            step_output_path = output_path if index == len(steps) - 1 else os.path.join(work_dir, f"chain_{index + 1}{target_ext}")
+            result = _convert_file(module, source_ext, target_ext, current_path, step_output_path)
+            if result is None:
+                current_path = step_output_path
+        content = result
+        seconds = time.perf_counter() - start
+        output_bytes = _content_size(content) if content is not None else os.path.getsize(current_path)
+        timings.append((source_ext, target_ext, seconds, input_bytes, output_bytes))
+
+    if content is not None:
+        # 不做换行转换，保留转换器生成的换行（如CSV的\r\n）
+        document_model.write_content(content, output_path, newline="")
+    return timings
+
+
+_planner_config = conversion_config.get("planner", {})
+# 创建全局转换路径规划实例（未启用时为None，只允许直接转换）
+conversion_planner = ConversionPlanner(
+    conversion_config["conversion_map"],
+    default_cost=_planner_config.get("defaultCost", 1.0),
+    estimated_costs=_planner_config.get("estimatedCosts", {}),
+    estimated_size_ratios=_planner_config.get("estimatedSizeRatios", {}),
+    excluded_intermediates=_planner_config.get("excludedIntermediates", []),
+    max_hops=_planner_config.get("maxHops", 3),
+    smoothing=_planner_config.get("smoothing", 0.2)
+) if _planner_config.get("enabled", True) else None
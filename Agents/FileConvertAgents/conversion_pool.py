@@ -0,0 +1,369 @@
+"""
+文档转换工作进程池
+1.工作进程启动时预先导入所有转换器模块（pdfminer、python-docx、markdown等），并调用转换器的warm_up()初始化耗时的运行时
+  （如aspose.words的字体缓存），转换请求不再承担导入和初始化开销
+2.每次转换限制CPU时间（RLIMIT_CPU）和内存（按常驻内存监控），超时、超限或崩溃的进程直接终止并补充新进程；
+  工作进程自成进程组，其创建的子进程（PDF分页并行）计入内存，终止时整个进程组一起终止
+3.等待中的转换数超过队列上限时拒绝新请求（API返回429），避免请求无限堆积
+转换在独立进程中执行，大文件转换不再阻塞事件循环，并发吞吐随CPU核数扩展
+流式转换（stream）在工作进程中迭代生成器，每个输出片段经管道逐条返回
+"""
+import asyncio
+import concurrent.futures
+import importlib
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+try:
+    import resource
+except ImportError:  # Windows不支持resource模块，CPU时间限制不生效，仅保留超时和内存监控
+    resource = None
+
+from Configs.FileConvertConfig.convert_config_init import conversion_config
+
+logger = logging.getLogger("convert_run")
+
+# 父进程检查子进程状态（超时、内存）的间隔（秒）
+_POLL_INTERVAL = 0.2
+
+
+class ConversionQueueFullError(Exception):
+    """等待转换的请求数已达上限"""
+
+
+class ConversionLimitError(Exception):
+    """转换超时、超出CPU时间或内存限制"""
+
+
+def _converter_modules():
+    return sorted({target_info["converter"] for target_info in conversion_config["conversion_map"].values()})
+
+
+def _cpu_seconds_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def limit_cpu_time(cpu_seconds_limit):
+    """
+    限制本进程此后可用的CPU时间（秒）
+    RLIMIT_CPU按进程累计计算，每次任务在已用CPU时间基础上放宽，超出时进程收到SIGXCPU被终止
+    """
+    if resource is None or not cpu_seconds_limit:
+        return
+    soft = int(_cpu_seconds_used()) + cpu_seconds_limit
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, cpu_seconds_limit):
+    """工作进程：预先导入转换器、预热后循环执行转换任务"""
+    if hasattr(os, "setpgrp"):
+        # 自成进程组，替换进程时连同其子进程一起终止
+        os.setpgrp()
+    for module_name in _converter_modules():
+        try:
+            module = importlib.import_module(f"Agents.FileConvertAgents.{module_name}")
+            if hasattr(module, "warm_up"):
+                module.warm_up()
+        except Exception as e:
+            logger.warning(f"Failed to preload converter {module_name}: {e}")
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        module_name, func_name, args, streaming = job
+        limit_cpu_time(cpu_seconds_limit)
+        try:
+            module = importlib.import_module(f"Agents.FileConvertAgents.{module_name}")
+            result = getattr(module, func_name)(*args)
+            if streaming:
+                # 管道缓冲区写满时send阻塞，生成速度自动受父进程读取速度限制
+                for chunk in result:
+                    conn.send(("chunk", chunk))
+                result = None
+            conn.send(("ok", result))
+        except MemoryError:
+            conn.send(("error", "转换超出内存限制"))
+        except ValueError as e:
+            # 参数或输入内容错误，调用方按ValueError处理（接口返回400）
+            conn.send(("invalid", str(e)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+def _rss_bytes(pid):
+    """读取进程常驻内存（仅Linux），无法获取时返回None"""
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _group_rss_bytes(pgid):
+    """读取进程组内所有进程的常驻内存之和（仅Linux），无法获取时返回None"""
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return _rss_bytes(pgid)
+    total = None
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                # 进程名可能包含空格和括号，进程组号取最后一个")"之后的第3个字段
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[2]) != pgid:
+                continue
+        except (OSError, ValueError, IndexError):
+            continue
+        rss = _rss_bytes(pid)
+        if rss is not None:
+            total = (total or 0) + rss
+    return total if total is not None else _rss_bytes(pgid)
+
+
+class _Worker:
+    """单个工作进程及其通信管道"""
+
+    def __init__(self, context, cpu_seconds_limit):
+        self.conn, child_conn = context.Pipe()
+        # 非守护进程：PDF分页并行转换需要在工作进程中再创建子进程；父进程退出时管道关闭，工作进程随之退出
+        self.process = context.Process(target=_worker_main, args=(child_conn, cpu_seconds_limit), daemon=False)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, job, timeout_seconds, memory_limit_bytes):
+        """在工作进程中执行任务（阻塞，由线程池调用）；超时或超限时抛出ConversionLimitError，进程需由调用方替换"""
+        self.send(job)
+        deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+        return self.receive(deadline, timeout_seconds, memory_limit_bytes)
+
+    def send(self, job):
+        try:
+            self.conn.send(job)
+        except OSError:
+            raise ConversionLimitError("转换进程已退出")
+
+    def receive(self, deadline, timeout_seconds, memory_limit_bytes):
+        """等待工作进程的下一条消息（阻塞），期间检查超时和内存"""
+        while not self.conn.poll(_POLL_INTERVAL):
+            if deadline is not None and time.monotonic() > deadline:
+                raise ConversionLimitError(f"转换超时（超过{timeout_seconds}秒）")
+            if memory_limit_bytes:
+                rss = _group_rss_bytes(self.process.pid)
+                if rss is not None and rss > memory_limit_bytes:
+                    raise ConversionLimitError(f"转换超出内存限制（{memory_limit_bytes // (1024 * 1024)}MB）")
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            # 进程在返回结果前退出（CPU时间超限被SIGXCPU终止或崩溃）
+            self.process.join(1)
+            raise ConversionLimitError(f"转换进程异常退出（退出码{self.process.exitcode}），可能超出CPU时间限制")
+
+    def _kill_group(self):
+        """终止工作进程及其创建的子进程（同一进程组）"""
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        self.process.kill()
+
+    def kill(self):
+        self._kill_group()
+        self.process.join(5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self._kill_group()
+        self.conn.close()
+
+
+class ConversionPool:
+    """常驻转换进程池"""
+
+    def __init__(self, workers=0, max_queue=16, cpu_seconds_limit=120, memory_limit_mb=2048, timeout_seconds=300):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.cpu_seconds_limit = cpu_seconds_limit
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        self.timeout_seconds = timeout_seconds
+        self._context = multiprocessing.get_context("spawn")
+        self._threads = concurrent.futures.ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="convert")
+        self._workers = [self._spawn() for _ in range(self.worker_count)]
+        self._idle = None
+        self._pending = 0
+        self.stats = {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "replaced": 0
+        }
+
+    def _spawn(self):
+        return _Worker(self._context, self.cpu_seconds_limit)
+
+    def _idle_queue(self):
+        # asyncio.Queue需在事件循环中创建
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for worker in self._workers:
+                self._idle.put_nowait(worker)
+        return self._idle
+
+    async def run(self, module_name, func_name, *args):
+        """
+        在工作进程中执行 {module_name}.{func_name}(*args)，返回函数返回值
+
+        Raises:
+            ConversionQueueFullError: 等待数已达上限
+            ConversionLimitError: 超时、超出CPU时间或内存限制
+            ValueError: 转换函数抛出的ValueError（参数或输入内容错误）
+            Exception: 转换函数抛出的其他错误
+        """
+        if self._pending >= self.worker_count + self.max_queue:
+            self.stats["rejected"] += 1
+            raise ConversionQueueFullError("转换请求过多，请稍后重试")
+
+        idle = self._idle_queue()
+        self._pending += 1
+        try:
+            worker = await idle.get()
+            try:
+                loop = asyncio.get_running_loop()
+                status, result = await loop.run_in_executor(
+                    self._threads, worker.run, (module_name, func_name, args, False), self.timeout_seconds, self.memory_limit_bytes
+                )
+            except ConversionLimitError:
+                self.stats["failed"] += 1
+                self._replace(worker)
+                worker = self._workers[-1]
+                raise
+            except asyncio.CancelledError:
+                # 请求被取消时进程可能仍在转换，不能直接放回空闲队列
+                self._replace(worker)
+                worker = self._workers[-1]
+                raise
+            finally:
+                idle.put_nowait(worker)
+        finally:
+            self._pending -= 1
+
+        if status != "ok":
+            self.stats["failed"] += 1
+            raise ValueError(result) if status == "invalid" else Exception(result)
+        self.stats["completed"] += 1
+        return result
+
+    async def stream(self, module_name, func_name, *args):
+        """
+        在工作进程中迭代生成器 {module_name}.{func_name}(*args)，逐个产出片段；超时时间按整个转换计算
+
+        Raises:
+            与run相同
+        """
+        if self._pending >= self.worker_count + self.max_queue:
+            self.stats["rejected"] += 1
+            raise ConversionQueueFullError("转换请求过多，请稍后重试")
+
+        idle = self._idle_queue()
+        self._pending += 1
+        try:
+            worker = await idle.get()
+            finished = False
+            try:
+                loop = asyncio.get_running_loop()
+                worker.send((module_name, func_name, args, True))
+                deadline = time.monotonic() + self.timeout_seconds if self.timeout_seconds else None
+                while True:
+                    status, result = await loop.run_in_executor(
+                        self._threads, worker.receive, deadline, self.timeout_seconds, self.memory_limit_bytes
+                    )
+                    if status != "chunk":
+                        break
+                    yield result
+                finished = True
+            except ConversionLimitError:
+                self.stats["failed"] += 1
+                raise
+            finally:
+                # 未读完就结束（超限、请求取消或客户端断开）时进程可能仍在产出，不能直接放回空闲队列
+                if not finished:
+                    self._replace(worker)
+                    worker = self._workers[-1]
+                idle.put_nowait(worker)
+        finally:
+            self._pending -= 1
+
+        if status != "ok":
+            self.stats["failed"] += 1
+            raise ValueError(result) if status == "invalid" else Exception(result)
+        self.stats["completed"] += 1
+
+    def _replace(self, worker):
+        """终止卡住或超限的进程并补充新进程"""
+        logger.warning(f"Replacing conversion worker pid={worker.process.pid}")
+        worker.kill()
+        self._workers.remove(worker)
+        self._workers.append(self._spawn())
+        self.stats["replaced"] += 1
+
+    def get_stats(self):
+        idle = self._idle.qsize() if self._idle is not None else self.worker_count
+        return {
+            **self.stats,
+            "workers": self.worker_count,
+            "busy": self.worker_count - idle,
+            "queued": max(self._pending - (self.worker_count - idle), 0),
+            "max_queue": self.max_queue
+        }
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+        self._threads.shutdown(wait=False)
+
+
+_pool = None
+
+
+def get_conversion_pool():
+    """获取全局转换进程池，首次调用时按配置创建"""
+    global _pool
+    if _pool is None:
+        pool_config = conversion_config.get("pool", {})
+        _pool = ConversionPool(
+            workers=pool_config.get("workers", 0),
+            max_queue=pool_config.get("maxQueue", 16),
+            cpu_seconds_limit=pool_config.get("cpuSecondsLimit", 120),
+            memory_limit_mb=pool_config.get("memoryLimitMb", 2048),
+            timeout_seconds=pool_config.get("timeoutSeconds", 300)
+        )
+        logger.info(f"Conversion pool started with {_pool.worker_count} workers")
+    return _pool
+
+
+def shutdown_conversion_pool():
+    """关闭转换进程池（服务关闭时调用）"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -2,17 +2,29 @@
 """
 文件格式转换执行模块
 处理具体的文件格式转换逻辑
+转换器提供 stream_{源格式}_to_{目标格式} 生成器时流式返回结果，同时写入输出文件供转换缓存使用
+指定页码或章节时先将输入文件裁剪为所选内容，再交给转换器
+指定多个目标格式时打包为zip返回，支持统一文档模型的输入只解析一次
+没有直接转换的格式对由转换路径规划选择代价最小的转换链（如 pdf -> md -> docx），在一个转换进程任务中完成
 """
 
 import os
+import asyncio
+import hashlib
 import logging
 import tempfile
+import time
 import uuid
 import shutil
-from typing import Dict, Any
+import zipfile
+from typing import Dict, Any, List, Optional
 import importlib
 
 from Configs.FileConvertConfig.convert_config_init import conversion_config
+from Agents.FileConvertAgents.conversion_pool import get_conversion_pool
+from Agents.FileConvertAgents.conversion_cache import conversion_cache, converter_version
+from Agents.FileConvertAgents.content_selection import build_selection, selection_key
+from Agents.FileConvertAgents.conversion_planner import Route, conversion_planner
 
 logger = logging.getLogger("convert_run")
 
@@ -37,18 +49,42 @@ def get_supported_formats_info():
                     "description": format_descriptions.get(target_ext, f'{target_ext}格式文件')
                 }
                 for target_ext in target_info["target_formats"]
+            ],
+            # 包含经转换链可到达的格式，estimated_cost为估计的每MiB源文件转换耗时（秒）
+            "reachable_formats": [
+                {
+                    "extension": target_ext,
+                    "description": format_descriptions.get(target_ext, f'{target_ext}格式文件'),
+                    "path": list(route.path),
+                    "estimated_cost": round(route.cost, 4)
+                }
+                for target_ext, route in sorted(_routes(source_ext).items(), key=lambda item: item[1].cost)
             ]
         }
     return format_info
 
 
-async def execute_conversion(file, target_format: str) -> Dict[str, Any]:
+def _routes(source_ext: str) -> Dict[str, Route]:
+    """源格式可到达的目标格式及转换路径，未启用转换路径规划时只有直接转换"""
+    if conversion_planner is not None:
+        return conversion_planner.routes(source_ext)
+    return {
+        target_ext: Route((source_ext, target_ext), 0.0)
+        for target_ext in conversion_config["conversion_map"][source_ext]["target_formats"]
+    }
+
+
+async def execute_conversion(file, target_format: str, pages: Optional[str] = None, max_pages: Optional[int] = None,
+                             section: Optional[str] = None) -> Dict[str, Any]:
     """
     执行文档格式转换
 
     Args:
         file: 上传的文件对象
-        target_format: 目标格式
+        target_format: 目标格式，多个目标格式用逗号分隔（如 "html,md,txt"），此时返回包含各格式结果的zip
+        pages: 页码范围（从1开始，如 "1-5,8"），仅PDF
+        max_pages: 最多转换的页数，仅PDF
+        section: 按标题选择的章节，仅DOCX、Markdown
 
     Returns:
         包含输出文件路径和相关信息的字典
@@ -66,46 +102,91 @@ async def execute_conversion(file, target_format: str) -> Dict[str, Any]:
             f"不支持的输入格式: {ext}。支持的格式: {', '.join(supported_formats)}"
         )
 
-    target_format = target_format.lower()
-    target_ext = f".{target_format}"
+    target_formats = list(dict.fromkeys(fmt.strip().lower() for fmt in target_format.split(',') if fmt.strip()))
+    if not target_formats:
+        raise ValueError("目标格式不能为空")
 
     # 验证目标格式
     conversion_map = conversion_config["conversion_map"]
     if ext not in conversion_map:
         raise ValueError(f"不支持的输入格式: {ext}")
 
-    if target_ext not in conversion_map[ext]["target_formats"]:
-        available_formats = ', '.join([fmt[1:] for fmt in conversion_map[ext]["target_formats"]])
-        raise ValueError(
-            f"无法将 {ext} 转换为 {target_format}。支持的目标格式: {available_formats}"
-        )
+    routes = _routes(ext)
+    disabled = conversion_config.get("disabled_conversions", {}).get(ext, {})
+    for fmt in target_formats:
+        if f".{fmt}" in disabled:
+            raise ValueError(f"无法将 {ext} 转换为 {fmt}：{disabled[f'.{fmt}']}")
+        if f".{fmt}" not in routes:
+            available_formats = ', '.join(sorted(target_ext[1:] for target_ext in routes))
+            raise ValueError(
+                f"无法将 {ext} 转换为 {fmt}。支持的目标格式: {available_formats}"
+            )
+
+    selection = build_selection(ext, pages, max_pages, section)
 
     # 使用系统临时目录，避免权限问题
     temp_dir = tempfile.mkdtemp()
     try:
-        # 保存上传文件
-        input_path = os.path.join(temp_dir, file.filename)
-        with open(input_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # 保存上传文件，边写入边计算内容哈希
+        input_path = os.path.join(temp_dir, os.path.basename(file.filename))
+        content_hash = await _save_upload(file, input_path)
+
+        if len(target_formats) > 1:
+            return await _convert_to_zip(file.filename, input_path, content_hash, ext,
+                                         [routes[f".{fmt}"] for fmt in target_formats], selection, temp_dir)
+
+        target_ext = f".{target_formats[0]}"
+        route = routes[target_ext]
 
         # 生成输出文件路径
         # 保证文件名不重复
         output_filename = f"{os.path.splitext(file.filename)[0]}_{uuid.uuid4().hex[:8]}{target_ext}"
         output_path = os.path.join(temp_dir, output_filename)
 
-        # 执行转换
-        await _perform_conversion(input_path, output_path, ext, target_ext)
+        # 相同内容、相同转换器版本的结果直接从缓存返回，不调用转换器
+        cache_key = _cache_key(content_hash, ext, target_ext, selection, route)
+        cache_hit = cache_key is not None and conversion_cache.fetch(cache_key, output_path)
+
+        if not cache_hit and selection:
+            # 裁剪为所选页面或章节，转换器只处理这部分内容
+            input_path = await _select_content(input_path, ext, selection, temp_dir)
+
+        if cache_hit:
+            logger.info(f"Conversion cache hit: {file.filename} to {target_ext}")
+        elif len(route.path) > 2:
+            await _perform_chain(input_path, output_path, route)
+        elif conversion_config.get("stream", {}).get("enabled", True):
+            opened = await _open_stream(input_path, ext, target_ext)
+            if opened is not None:
+                first_chunk, chunks = opened
+                return {
+                    "temp_dir": temp_dir,
+                    "output_path": output_path,
+                    "output_filename": output_filename,
+                    "media_type": _get_media_type(target_ext),
+                    "cache_hit": False,
+                    "stream": _tee_stream(first_chunk, chunks, output_path, cache_key, target_ext, temp_dir)
+                }
+            await _perform_conversion(input_path, output_path, ext, target_ext)
+        else:
+            # 执行转换
+            await _perform_conversion(input_path, output_path, ext, target_ext)
 
         # 检查输出文件是否存在
         if not os.path.exists(output_path):
             raise Exception("转换失败：输出文件未正确生成")
 
+        if cache_key is not None and not cache_hit:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, conversion_cache.store, cache_key, output_path, target_ext)
+
         return {
             "temp_dir": temp_dir,
             "output_path": output_path,
             "output_filename": output_filename,
-            "media_type": _get_media_type(target_ext)
+            "media_type": _get_media_type(target_ext),
+            "cache_hit": cache_hit,
+            "stream": None
         }
 
     except Exception as e:
@@ -117,9 +198,165 @@ async def execute_conversion(file, target_format: str) -> Dict[str, Any]:
         raise e
 
 
+def _cache_key(content_hash: str, source_ext: str, target_ext: str, selection: Optional[Dict[str, Any]],
+               route: Route) -> Optional[str]:
+    """转换缓存键，未启用缓存时返回None；转换链的键包含路径及路径上每个转换器的版本"""
+    if conversion_cache is None:
+        return None
+    conversion_map = conversion_config["conversion_map"]
+    version = converter_version(conversion_map[source_ext]["converter"])
+    options = []
+    if selection:
+        options.append(f"{selection_key(selection)}|{converter_version('content_selection')}")
+    if len(route.path) > 2:
+        versions = ','.join(converter_version(conversion_map[ext]["converter"]) for ext in route.path[1:-1])
+        options.append(f"chain={'>'.join(route.path)}|{versions}|{converter_version('conversion_planner')}")
+    return conversion_cache.make_key(content_hash, source_ext, target_ext, version, '|'.join(options))
+
+
+async def _select_content(input_path: str, source_ext: str, selection: Dict[str, Any], temp_dir: str) -> str:
+    """在转换进程中将输入裁剪为所选页面或章节，返回裁剪后的文件路径"""
+    selected_path = os.path.join(temp_dir, f"selected_{uuid.uuid4().hex[:8]}{source_ext}")
+    await get_conversion_pool().run("content_selection", "select_content", input_path, selected_path, source_ext, selection)
+    return selected_path
+
+
+async def _convert_to_zip(filename: str, input_path: str, content_hash: str, source_ext: str, routes: List[Route],
+                          selection: Optional[Dict[str, Any]], temp_dir: str) -> Dict[str, Any]:
+    """
+    一次上传转换为多个目标格式并打包为zip：缓存未命中的直接转换在同一个转换进程任务中完成，
+    支持统一文档模型的转换器只解析一次输入；需要转换链的格式逐个执行转换链
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    output_dir = os.path.join(temp_dir, "outputs")
+    os.makedirs(output_dir)
+
+    outputs = []
+    missing = []
+    for route in routes:
+        target_ext = route.path[-1]
+        output_path = os.path.join(output_dir, f"{stem}{target_ext}")
+        cache_key = _cache_key(content_hash, source_ext, target_ext, selection, route)
+        if cache_key is not None and conversion_cache.fetch(cache_key, output_path):
+            logger.info(f"Conversion cache hit: {filename} to {target_ext}")
+        else:
+            missing.append((route, output_path, cache_key))
+        outputs.append(output_path)
+
+    loop = asyncio.get_running_loop()
+    if missing:
+        if selection:
+            input_path = await _select_content(input_path, source_ext, selection, temp_dir)
+        converter_name = conversion_config["conversion_map"][source_ext]["converter"]
+        direct = [(route.path[-1], output_path) for route, output_path, _ in missing if len(route.path) == 2]
+        if direct:
+            logger.info(f"Performing conversion from {source_ext} to {', '.join(target_ext for target_ext, _ in direct)}")
+            await get_conversion_pool().run("document_model", "convert_to_targets", input_path, source_ext, direct, converter_name)
+        for route, output_path, _ in missing:
+            if len(route.path) > 2:
+                await _perform_chain(input_path, output_path, route)
+        for route, output_path, cache_key in missing:
+            target_ext = route.path[-1]
+            if not os.path.exists(output_path):
+                raise Exception(f"转换失败：{target_ext} 输出文件未正确生成")
+            if cache_key is not None:
+                await loop.run_in_executor(None, conversion_cache.store, cache_key, output_path, target_ext)
+
+    output_filename = f"{stem}_{uuid.uuid4().hex[:8]}.zip"
+    zip_path = os.path.join(temp_dir, output_filename)
+    await loop.run_in_executor(None, _write_zip, zip_path, outputs)
+    logger.info(f"Conversion completed: {zip_path}")
+
+    return {
+        "temp_dir": temp_dir,
+        "output_path": zip_path,
+        "output_filename": output_filename,
+        "media_type": _get_media_type(".zip"),
+        "cache_hit": not missing,
+        "stream": None
+    }
+
+
+def _write_zip(zip_path: str, paths: List[str]):
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, os.path.basename(path))
+
+
+async def _save_upload(file, input_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """分块写入上传文件，同时计算SHA-256"""
+    digest = hashlib.sha256()
+    with open(input_path, "wb") as f:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+async def _open_stream(input_path: str, source_ext: str, target_ext: str):
+    """
+    转换器提供流式生成器时开始流式转换，等到第一个片段产出后返回，转换一开始就失败时接口仍能返回错误状态码
+
+    Returns:
+        (第一个片段, 后续片段的异步迭代器)；转换器不支持流式输出时返回None
+    """
+    converter_name = conversion_config["conversion_map"][source_ext]["converter"]
+    converter_module = importlib.import_module(f"Agents.FileConvertAgents.{converter_name}")
+    stream_func_name = f"stream_{source_ext[1:]}_to_{target_ext[1:]}"
+    if not hasattr(converter_module, stream_func_name):
+        return None
+
+    start = time.perf_counter()
+    chunks = get_conversion_pool().stream(converter_name, stream_func_name, input_path)
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = ""
+    except Exception as e:
+        logger.error(f"Conversion failed: {str(e)}", exc_info=True)
+        raise
+    logger.info(f"Streaming conversion from {source_ext} to {target_ext}, first chunk after {time.perf_counter() - start:.3f}s")
+    return first_chunk, chunks
+
+
+async def _tee_stream(first_chunk: str, chunks, output_path: str, cache_key, target_ext: str, temp_dir: str):
+    """逐个产出UTF-8编码的片段，同时写入输出文件；完整产出后存入转换缓存，结束（含客户端断开）时清理临时目录"""
+    try:
+        # 不做换行转换，保证缓存文件与返回的内容一致
+        with open(output_path, "w", encoding="utf-8", newline="") as f:
+            if first_chunk:
+                f.write(first_chunk)
+                yield first_chunk.encode("utf-8")
+            async for chunk in chunks:
+                f.write(chunk)
+                yield chunk.encode("utf-8")
+
+        if cache_key is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, conversion_cache.store, cache_key, output_path, target_ext)
+        logger.info(f"Conversion completed: {output_path}")
+    except Exception as e:
+        # 响应头已发送，只能中断响应
+        logger.error(f"Streaming conversion failed: {str(e)}", exc_info=True)
+        raise
+    finally:
+        await chunks.aclose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def get_cache_stats():
+    """转换结果缓存统计"""
+    if conversion_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **conversion_cache.get_stats()}
+
+
 async def _perform_conversion(input_path: str, output_path: str, source_ext: str, target_ext: str):
     """
-    执行具体的文件格式转换（插件化）
+    执行具体的文件格式转换（插件化），转换函数在常驻进程池中执行
 
     Args:
         input_path: 输入文件路径
@@ -141,8 +378,11 @@ async def _perform_conversion(input_path: str, output_path: str, source_ext: str
 
         # 检查是否存在特定的转换函数
         if hasattr(converter_module, convert_func_name):
-            convert_func = getattr(converter_module, convert_func_name)
-            convert_func(input_path, output_path)
+            # 耗时在转换进程中计时，不含排队等待
+            seconds = await get_conversion_pool().run("conversion_planner", "timed_convert", converter_name, convert_func_name,
+                                                      input_path, output_path)
+            if conversion_planner is not None:
+                conversion_planner.record(source_ext, target_ext, seconds, os.path.getsize(input_path), os.path.getsize(output_path))
         else:
             # 如果没有特定函数，尝试使用通用转换方法
             logger.warning(f"未找到特定转换函数 {convert_func_name}，尝试通用转换方法")
@@ -159,6 +399,22 @@ async def _perform_conversion(input_path: str, output_path: str, source_ext: str
         raise e
 
 
+async def _perform_chain(input_path: str, output_path: str, route: Route):
+    """在转换进程中按转换链转换，并用每一步的实际耗时更新边的代价"""
+    logger.info(f"Performing conversion chain {' -> '.join(route.path)} (estimated {route.cost:.3f}s/MiB)")
+    timings = await get_conversion_pool().run("conversion_planner", "convert_chain", input_path, output_path, list(route.path))
+    for source_ext, target_ext, seconds, input_bytes, output_bytes in timings:
+        conversion_planner.record(source_ext, target_ext, seconds, input_bytes, output_bytes)
+    logger.info(f"Conversion completed: {output_path}")
+
+
+def get_planner_stats():
+    """转换路径规划中各转换的实测代价"""
+    if conversion_planner is None:
+        return {"enabled": False}
+    return {"enabled": True, "measured": conversion_planner.get_stats()}
+
+
 def _get_media_type(ext: str) -> str:
     """
     根据文件扩展名获取MIME类型
@@ -0,0 +1,501 @@
+"""
+统一文档模型
+各输入格式先解析为同一棵文档树（标题、段落、文本片段、表格、列表、代码块），再由渲染器输出为目标格式：
+1.转换器模块提供 build_document(input_path)，每次上传只解析一次，多个目标格式共用同一棵文档树；
+  转换器在NATIVE_TARGETS中列出的目标格式仍由其转换函数直接输出（如Markdown -> HTML）
+2.渲染器按目标扩展名注册（register_renderer），返回str（文本格式）或bytes（二进制格式）
+3.build_from_html按文档顺序单遍解析HTML（html_stream），HTML与Markdown输入共用；render_md的各块可流式输出（write_md）
+"""
+import html
+import importlib
+import io
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple, Union
+
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.html_stream",)
+
+
+# ==================== 文档树节点 ====================
+
+class Run(NamedTuple):
+    """格式相同的一段文本；image不为空时表示图片（text为替代文本），text中的\\n表示换行"""
+    text: str
+    bold: bool = False
+    italic: bool = False
+    underline: bool = False
+    code: bool = False
+    href: Optional[str] = None
+    image: Optional[str] = None
+
+
+class Heading(NamedTuple):
+    level: int
+    runs: List[Run]
+
+
+class Paragraph(NamedTuple):
+    runs: List[Run]
+
+
+class ListItem(NamedTuple):
+    runs: List[Run]
+    children: List["ListBlock"]
+
+
+class ListBlock(NamedTuple):
+    ordered: bool
+    items: List[ListItem]
+
+
+class Table(NamedTuple):
+    """rows为单元格文本，前header_rows行为表头"""
+    rows: List[List[str]]
+    header_rows: int = 0
+
+
+class CodeBlock(NamedTuple):
+    text: str
+    language: str = ""
+
+
+class Document(NamedTuple):
+    blocks: list
+    title: str = ""
+
+
+def runs_text(runs: List[Run]) -> str:
+    return ''.join(run.text for run in runs)
+
+
+def append_run(runs: List[Run], run: Run):
+    """追加文本片段，与前一个格式相同的片段合并"""
+    if not run.text and run.image is None:
+        return
+    if runs and run.image is None and runs[-1].image is None and runs[-1][1:] == run[1:]:
+        runs[-1] = runs[-1]._replace(text=runs[-1].text + run.text)
+    else:
+        runs.append(run)
+
+
+def strip_runs(runs: List[Run]) -> List[Run]:
+    """去掉首尾空白（图片片段保留）"""
+    runs = list(runs)
+    while runs and runs[0].image is None and not runs[0].text.strip():
+        runs.pop(0)
+    while runs and runs[-1].image is None and not runs[-1].text.strip():
+        runs.pop()
+    if runs and runs[0].image is None:
+        runs[0] = runs[0]._replace(text=runs[0].text.lstrip())
+    if runs and runs[-1].image is None:
+        runs[-1] = runs[-1]._replace(text=runs[-1].text.rstrip())
+    return runs
+
+
+def add_list_item(blocks: list, ordered: bool, depth: int, runs: List[Run]):
+    """追加列表项，depth为嵌套层级（从0开始），连续的列表项合并为同一列表"""
+    if not blocks or not isinstance(blocks[-1], ListBlock) or (depth == 0 and blocks[-1].ordered != ordered):
+        blocks.append(ListBlock(ordered, []))
+    block = blocks[-1]
+    for level in range(depth):
+        if not block.items:
+            block.items.append(ListItem([], []))
+        children = block.items[-1].children
+        if not children or (level == depth - 1 and children[-1].ordered != ordered):
+            children.append(ListBlock(ordered, []))
+        block = children[-1]
+    block.items.append(ListItem(runs, []))
+
+
+# ==================== HTML解析 ====================
+
+def build_from_html(html_content: str, parser: Optional[str] = None) -> Document:
+    """将HTML解析为文档树，保持元素在HTML中的顺序（单遍解析，见html_stream）"""
+    from Agents.FileConvertAgents import html_stream
+
+    return html_stream.parse_html(html_content, parser or html_stream.DEFAULT_PARSER)
+
+
+# ==================== 渲染器 ====================
+
+Renderer = Callable[[Document], Union[str, bytes]]
+RENDERERS: Dict[str, Renderer] = {}
+
+
+def register_renderer(target_ext: str, renderer: Renderer):
+    """注册目标格式的渲染器"""
+    RENDERERS[target_ext] = renderer
+
+
+def render_document(document: Document, target_ext: str) -> Union[str, bytes]:
+    renderer = RENDERERS.get(target_ext)
+    if renderer is None:
+        raise ValueError(f"文档模型不支持输出格式: {target_ext}")
+    return renderer(document)
+
+
+def write_document(document: Document, target_ext: str, output_path: str):
+    """渲染并写入文件"""
+    write_content(render_document(document, target_ext), output_path)
+
+
+def write_content(content: Union[str, bytes], output_path: str, newline: Optional[str] = None):
+    """写入渲染结果，文本按UTF-8编码"""
+    if isinstance(content, bytes):
+        with open(output_path, 'wb') as f:
+            f.write(content)
+    else:
+        with open(output_path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+
+
+def convert_to_targets(input_path: str, source_ext: str, outputs: List[Tuple[str, str]], converter_name: str):
+    """
+    一次上传转换为多个目标格式：转换器提供build_document且目标格式有渲染器时共用同一棵文档树，
+    其余目标格式（以及转换器NATIVE_TARGETS中的格式）调用转换器原有的转换函数
+
+    Args:
+        outputs: [(目标扩展名, 输出文件路径)]
+        converter_name: 源格式对应的转换器模块名
+    """
+    module = importlib.import_module(f"Agents.FileConvertAgents.{converter_name}")
+    native_targets = getattr(module, "NATIVE_TARGETS", ())
+    document = None
+    for target_ext, output_path in outputs:
+        if hasattr(module, "build_document") and target_ext in RENDERERS and target_ext not in native_targets:
+            if document is None:
+                document = module.build_document(input_path)
+            write_document(document, target_ext, output_path)
+        else:
+            getattr(module, f"convert_{source_ext[1:]}_to_{target_ext[1:]}")(input_path, output_path)
+
+
+# ---------- HTML ----------
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <style>
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            max-width: 800px;
+            margin: 0 auto;
+            padding: 20px;
+        }}
+        h1, h2, h3, h4, h5, h6 {{
+            margin-top: 24px;
+            margin-bottom: 16px;
+            font-weight: 600;
+            line-height: 1.25;
+        }}
+        h1 {{ font-size: 2em; border-bottom: 1px solid #eaecef; padding-bottom: 0.3em; }}
+        h2 {{ font-size: 1.5em; border-bottom: 1px solid #eaecef; padding-bottom: 0.3em; }}
+        p {{ margin-top: 0; margin-bottom: 16px; }}
+        a {{ color: #0366d6; text-decoration: none; }}
+        a:hover {{ text-decoration: underline; }}
+        code {{
+            padding: 0.2em 0.4em;
+            margin: 0;
+            font-size: 85%;
+            background-color: rgba(27,31,35,0.05);
+            border-radius: 3px;
+            font-family: 'SFMono-Regular', Consolas, 'Liberation Mono', Menlo, monospace;
+        }}
+        pre {{
+            padding: 16px;
+            overflow: auto;
+            font-size: 85%;
+            line-height: 1.45;
+            background-color: #f6f8fa;
+            border-radius: 3px;
+        }}
+        pre code {{
+            padding: 0;
+            margin: 0;
+            font-size: 100%;
+            background: transparent;
+            border: 0;
+        }}
+        blockquote {{
+            padding: 0 1em;
+            color: #6a737d;
+            border-left: 0.25em solid #dfe2e5;
+            margin: 0 0 16px 0;
+        }}
+        table {{
+            display: block;
+            width: 100%;
+            overflow: auto;
+            border-collapse: collapse;
+        }}
+        table th, table td {{
+            padding: 6px 13px;
+            border: 1px solid #dfe2e5;
+        }}
+        table tr:nth-child(2n) {{
+            background-color: #f6f8fa;
+        }}
+        ul, ol {{
+            padding-left: 2em;
+            margin-top: 0;
+            margin-bottom: 16px;
+        }}
+        li {{
+            margin-bottom: 0.25em;
+        }}
+        img {{
+            max-width: 100%;
+            box-sizing: content-box;
+        }}
+    </style>
+</head>
+<body>
+{body}
+</body>
+</html>"""
+
+
+def _html_inline(runs: List[Run]) -> str:
+    parts = []
+    for run in runs:
+        if run.image is not None:
+            parts.append(f'<img src="{html.escape(run.image)}" alt="{html.escape(run.text)}">')
+            continue
+        text = html.escape(run.text, quote=False).replace('\n', '<br>\n')
+        if run.code:
+            text = f'<code>{text}</code>'
+        if run.bold:
+            text = f'<strong>{text}</strong>'
+        if run.italic:
+            text = f'<em>{text}</em>'
+        if run.underline:
+            text = f'<u>{text}</u>'
+        if run.href:
+            text = f'<a href="{html.escape(run.href)}">{text}</a>'
+        parts.append(text)
+    return ''.join(parts)
+
+
+def _html_list(block: ListBlock) -> str:
+    tag = "ol" if block.ordered else "ul"
+    parts = [f'<{tag}>\n']
+    for item in block.items:
+        parts.append(f'<li>{_html_inline(item.runs)}')
+        if item.children:
+            parts.append('\n' + ''.join(_html_list(child) for child in item.children))
+        parts.append('</li>\n')
+    parts.append(f'</{tag}>\n')
+    return ''.join(parts)
+
+
+def render_html(document: Document) -> str:
+    parts = []
+    for block in document.blocks:
+        if isinstance(block, Heading):
+            parts.append(f'<h{block.level}>{_html_inline(block.runs)}</h{block.level}>\n')
+        elif isinstance(block, Paragraph):
+            parts.append(f'<p>{_html_inline(block.runs)}</p>\n')
+        elif isinstance(block, ListBlock):
+            parts.append(_html_list(block))
+        elif isinstance(block, Table):
+            parts.append('<table>\n')
+            for index, row in enumerate(block.rows):
+                tag = "th" if index < block.header_rows else "td"
+                cells = ''.join(f'<{tag}>{html.escape(cell, quote=False)}</{tag}>' for cell in row)
+                parts.append(f'<tr>{cells}</tr>\n')
+            parts.append('</table>\n')
+        elif isinstance(block, CodeBlock):
+            language = f' class="language-{html.escape(block.language)}"' if block.language else ''
+            parts.append(f'<pre><code{language}>{html.escape(block.text, quote=False)}</code></pre>\n')
+    return HTML_TEMPLATE.format(title=html.escape(document.title or "Converted Document"), body=''.join(parts).rstrip('\n'))
+
+
+# ---------- Markdown ----------
+
+def md_emphasis(text: str, marker: str) -> str:
+    """强调标记不能紧贴空白，首尾空白放到标记外"""
+    core = text.strip()
+    if not core:
+        return text
+    start = text.index(core)
+    return f'{text[:start]}{marker}{core}{marker}{text[start + len(core):]}'
+
+
+# 换行（<br>、DOCX中的换行符）：段内单独的换行在Markdown中是软换行，渲染为空格，
+# 需要在行尾加两个空格作为硬换行（反斜杠写法python-markdown不支持）
+MD_LINE_BREAK = '  \n'
+
+
+def _md_run(text: str, run: Run) -> str:
+    if not text:
+        return text
+    if run.code:
+        text = md_emphasis(text, '`')
+    elif run.bold and run.italic:
+        text = md_emphasis(text, '***')
+    elif run.bold:
+        text = md_emphasis(text, '**')
+    elif run.italic:
+        text = md_emphasis(text, '*')
+    if run.href:
+        text = f'[{text}]({run.href})'
+    return text
+
+
+def _md_inline(runs: List[Run], line_break: str = MD_LINE_BREAK) -> str:
+    """
+    Args:
+        line_break: run中换行的写法，标题、列表项中不能换行时传入空格
+    """
+    parts = []
+    for run in runs:
+        if run.image is not None:
+            parts.append(f'![{run.text}]({run.image})')
+            continue
+        # 按换行拆开后分别加标记，行内代码中不能包含硬换行
+        parts.append(line_break.join(_md_run(line, run) for line in run.text.split('\n')))
+    return ''.join(parts)
+
+
+def _md_list(block: ListBlock, depth: int, lines: List[str]):
+    for number, item in enumerate(block.items, 1):
+        marker = f'{number}. ' if block.ordered else '- '
+        lines.append('   ' * depth + marker + _md_inline(item.runs, ' '))
+        for child in item.children:
+            _md_list(child, depth + 1, lines)
+
+
+def _md_cell(text: str) -> str:
+    return text.replace('|', '\\|').replace('\n', ' ')
+
+
+def _md_block(block) -> Optional[str]:
+    if isinstance(block, Heading):
+        return f'{"#" * block.level} {_md_inline(block.runs, " ")}'
+    if isinstance(block, Paragraph):
+        return _md_inline(block.runs)
+    if isinstance(block, ListBlock):
+        lines = []
+        _md_list(block, 0, lines)
+        return '\n'.join(lines)
+    if isinstance(block, Table):
+        width = max(len(row) for row in block.rows)
+        rows = [row + [''] * (width - len(row)) for row in block.rows]
+        lines = ['| ' + ' | '.join(_md_cell(cell) for cell in rows[0]) + ' |',
+                 '| ' + ' | '.join(['---'] * width) + ' |']
+        lines.extend('| ' + ' | '.join(_md_cell(cell) for cell in row) + ' |' for row in rows[1:])
+        return '\n'.join(lines)
+    if isinstance(block, CodeBlock):
+        fence = '````' if '```' in block.text else '```'
+        return f'{fence}{block.language}\n{block.text}\n{fence}'
+    return None
+
+
+def render_md(document: Document) -> str:
+    parts = [part for part in map(_md_block, document.blocks) if part is not None]
+    return '\n\n'.join(parts) + '\n' if parts else ''
+
+
+def write_md(blocks: Iterable, output: TextIO):
+    """逐块渲染并写入文本文件，输出与render_md相同，用于流式转换（块可以是边解析边产出的迭代器）"""
+    first = True
+    for block in blocks:
+        part = _md_block(block)
+        if part is None:
+            continue
+        if not first:
+            output.write('\n\n')
+        output.write(part)
+        first = False
+    if not first:
+        output.write('\n')
+
+
+# ---------- 纯文本 ----------
+
+def _txt_list(block: ListBlock, depth: int, lines: List[str]):
+    for number, item in enumerate(block.items, 1):
+        marker = f'{number}. ' if block.ordered else '- '
+        lines.append('  ' * depth + marker + runs_text(item.runs).replace('\n', ' '))
+        for child in item.children:
+            _txt_list(child, depth + 1, lines)
+
+
+def render_txt(document: Document) -> str:
+    lines = []
+    for block in document.blocks:
+        if isinstance(block, (Heading, Paragraph)):
+            lines.extend(runs_text(block.runs).split('\n'))
+        elif isinstance(block, ListBlock):
+            _txt_list(block, 0, lines)
+        elif isinstance(block, Table):
+            lines.extend('\t'.join(row) for row in block.rows)
+        elif isinstance(block, CodeBlock):
+            lines.extend(block.text.split('\n'))
+    # 与原先的纯文本输出一致：去掉首尾空白并省略空行
+    return '\n'.join(line.strip() for line in lines if line.strip())
+
+
+# ---------- Word ----------
+
+def _docx_runs(paragraph, runs: List[Run]):
+    for run in runs:
+        # 图片只保留替代文本
+        if not run.text:
+            continue
+        docx_run = paragraph.add_run(run.text)
+        docx_run.bold = run.bold or None
+        docx_run.italic = run.italic or None
+        docx_run.underline = (run.underline or bool(run.href)) or None
+        if run.code:
+            docx_run.font.name = 'Consolas'
+
+
+def _docx_list(doc, block: ListBlock, depth: int):
+    style = ('List Number' if block.ordered else 'List Bullet') + (f' {min(depth, 2) + 1}' if depth else '')
+    for item in block.items:
+        _docx_runs(doc.add_paragraph(style=style), item.runs)
+        for child in item.children:
+            _docx_list(doc, child, depth + 1)
+
+
+def render_docx(document: Document) -> bytes:
+    from docx import Document as DocxDocument
+
+    doc = DocxDocument()
+    if document.title:
+        doc.core_properties.title = document.title
+    for block in document.blocks:
+        if isinstance(block, Heading):
+            _docx_runs(doc.add_heading(level=min(block.level, 9)), block.runs)
+        elif isinstance(block, Paragraph):
+            _docx_runs(doc.add_paragraph(), block.runs)
+        elif isinstance(block, ListBlock):
+            _docx_list(doc, block, 0)
+        elif isinstance(block, Table):
+            width = max(len(row) for row in block.rows)
+            table = doc.add_table(rows=len(block.rows), cols=width)
+            table.style = 'Table Grid'
+            for row_index, row in enumerate(block.rows):
+                for column, text in enumerate(row):
+                    cell = table.cell(row_index, column)
+                    cell.text = text
+                    if row_index < block.header_rows:
+                        for run in cell.paragraphs[0].runs:
+                            run.bold = True
+        elif isinstance(block, CodeBlock):
+            run = doc.add_paragraph().add_run(block.text)
+            run.font.name = 'Consolas'
+
+    output = io.BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+register_renderer(".html", render_html)
+register_renderer(".md", render_md)
+register_renderer(".txt", render_txt)
+register_renderer(".docx", render_docx)
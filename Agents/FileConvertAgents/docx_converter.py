@@ -1,150 +1,125 @@
 """
 Word文档转换代理
 处理DOCX到其他格式的转换
+DOCX先解析为统一文档模型（build_document），再渲染为HTML、Markdown、纯文本；PDF由aspose.words渲染（docx_renderer）
 """
 
 from docx import Document
-from typing import Dict,Any
+from docx.table import Table
+from docx.text.hyperlink import Hyperlink
+from typing import Dict,Any,List,Optional,Tuple
+import re
+
+from Agents.FileConvertAgents import document_model
+from Agents.FileConvertAgents.docx_renderer import docx_pdf_renderer
+
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.document_model", "Agents.FileConvertAgents.docx_renderer")
+
+_HEADING_STYLE_PATTERN = re.compile(r'(?:heading|标题)\s*([1-9])')
+_LIST_STYLE_PATTERN = re.compile(r'^list (bullet|number)(?: (\d))?')
+
+
+def style_name(paragraph, cache: Optional[Dict[Any, str]] = None) -> str:
+    """段落样式名（小写）；python-docx每次解析样式都会遍历样式表，传入cache时按样式ID缓存"""
+    if cache is None:
+        return paragraph.style.name.lower() if paragraph.style else ""
+    style_id = paragraph._p.style
+    name = cache.get(style_id)
+    if name is None:
+        name = cache[style_id] = paragraph.style.name.lower() if paragraph.style else ""
+    return name
+
+
+def heading_level(paragraph, cache: Optional[Dict[Any, str]] = None) -> int:
+    """根据段落样式判断标题级别（样式名包含 heading N 或 标题 N，Title样式视为一级标题），非标题返回0"""
+    name = style_name(paragraph, cache)
+    if name == 'title':
+        return 1
+    match = _HEADING_STYLE_PATTERN.search(name)
+    return int(match.group(1)) if match else 0
+
+
+def _list_info(paragraph, cache: Dict[Any, str]) -> Optional[Tuple[bool, int]]:
+    """列表段落返回 (是否有序, 嵌套层级)，否则返回None"""
+    match = _LIST_STYLE_PATTERN.match(style_name(paragraph, cache))
+    if match:
+        return match.group(1) == 'number', int(match.group(2)) - 1 if match.group(2) else 0
+    p_pr = paragraph._p.pPr
+    if p_pr is not None and p_pr.numPr is not None:
+        ilvl = p_pr.numPr.ilvl
+        return False, ilvl.val if ilvl is not None else 0
+    return None
+
+
+def _paragraph_runs(paragraph) -> List[document_model.Run]:
+    runs = []
+    for item in paragraph.iter_inner_content():
+        if isinstance(item, Hyperlink):
+            href = item.url or None
+            for run in item.runs:
+                document_model.append_run(runs, document_model.Run(run.text, bool(run.bold), bool(run.italic), bool(run.underline), href=href))
+        else:
+            document_model.append_run(runs, document_model.Run(item.text, bool(item.bold), bool(item.italic), bool(item.underline)))
+    return document_model.strip_runs(runs)
 
 
-def convert_docx_to_txt(input_path: str, output_path: str):
-    """将Word文档转换为纯文本"""
+def build_document(input_path: str) -> document_model.Document:
+    """将Word文档解析为统一文档模型，段落、列表和表格保持正文中的顺序"""
     doc = Document(input_path)
-    text_content = '\n'.join([para.text for para in doc.paragraphs])
-
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(text_content)
-
-
-def convert_docx_to_html(input_path: str, output_path: str):
-    """将Word文档转换为HTML，保留基本格式"""
-    doc = Document(input_path)
-    html_content = """<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Converted Document</title>
-    <style>
-        body { font-family: Arial, sans-serif; }
-        h1, h2, h3, h4, h5, h6 { margin-top: 1em; margin-bottom: 0.5em; }
-        p { margin-top: 0.5em; margin-bottom: 0.5em; }
-        ul, ol { margin-top: 0.5em; margin-bottom: 0.5em; }
-        li { margin-bottom: 0.2em; }
-    </style>
-</head>
-<body>
-"""
+    blocks = []
+    style_cache = {}
+
+    for item in doc.iter_inner_content():
+        if isinstance(item, Table):
+            rows = [[cell.text for cell in row.cells] for row in item.rows]
+            if rows:
+                # 第一行作为表头
+                blocks.append(document_model.Table(rows, 1))
+            continue
+
+        runs = _paragraph_runs(item)
+        if not runs:
+            continue
+        level = heading_level(item, style_cache)
+        if level:
+            blocks.append(document_model.Heading(level, runs))
+            continue
+        list_info = _list_info(item, style_cache)
+        if list_info:
+            document_model.add_list_item(blocks, list_info[0], list_info[1], runs)
+        else:
+            blocks.append(document_model.Paragraph(runs))
 
-    for para in doc.paragraphs:
-        # 根据段落样式确定HTML标签
-        style_name = para.style.name.lower() if para.style else ""
+    return document_model.Document(blocks, doc.core_properties.title or "")
 
-        if 'heading 1' in style_name or '标题 1' in style_name:
-            html_content += f"<h1>{para.text}</h1>\n"
-        elif 'heading 2' in style_name or '标题 2' in style_name:
-            html_content += f"<h2>{para.text}</h2>\n"
-        elif 'heading 3' in style_name or '标题 3' in style_name:
-            html_content += f"<h3>{para.text}</h3>\n"
-        elif 'heading 4' in style_name or '标题 4' in style_name:
-            html_content += f"<h4>{para.text}</h4>\n"
-        elif 'heading 5' in style_name or '标题 5' in style_name:
-            html_content += f"<h5>{para.text}</h5>\n"
-        elif 'heading 6' in style_name or '标题 6' in style_name:
-            html_content += f"<h6>{para.text}</h6>\n"
-        else:
-            # 普通段落
-            if para.text.strip():  # 非空段落
-                html_content += f"<p>{para.text}</p>\n"
-            else:  # 空段落
-                html_content += "<br>\n"
 
-    # 处理表格
-    for table in doc.tables:
-        html_content += "<table border='1' cellspacing='0' cellpadding='5'>\n"
-        for row in table.rows:
-            html_content += "<tr>\n"
-            for cell in row.cells:
-                html_content += f"<td>{cell.text}</td>\n"
-            html_content += "</tr>\n"
-        html_content += "</table>\n"
+def convert_docx_to_txt(input_path: str, output_path: str):
+    """将Word文档转换为纯文本"""
+    document_model.write_document(build_document(input_path), ".txt", output_path)
 
-    html_content += "</body>\n</html>"
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+def convert_docx_to_html(input_path: str, output_path: str):
+    """将Word文档转换为HTML，保留基本格式"""
+    document_model.write_document(build_document(input_path), ".html", output_path)
 
 
 def convert_docx_to_md(input_path: str, output_path: str):
     """将Word文档转换为Markdown，保留基本格式"""
-    doc = Document(input_path)
-    md_content = ""
+    document_model.write_document(build_document(input_path), ".md", output_path)
 
-    for para in doc.paragraphs:
-        # 根据段落样式确定Markdown格式
-        style_name = para.style.name.lower() if para.style else ""
 
-        if 'heading 1' in style_name or '标题 1' in style_name:
-            md_content += f"# {para.text}\n\n"
-        elif 'heading 2' in style_name or '标题 2' in style_name:
-            md_content += f"## {para.text}\n\n"
-        elif 'heading 3' in style_name or '标题 3' in style_name:
-            md_content += f"### {para.text}\n\n"
-        elif 'heading 4' in style_name or '标题 4' in style_name:
-            md_content += f"#### {para.text}\n\n"
-        elif 'heading 5' in style_name or '标题 5' in style_name:
-            md_content += f"##### {para.text}\n\n"
-        elif 'heading 6' in style_name or '标题 6' in style_name:
-            md_content += f"###### {para.text}\n\n"
-        else:
-            # 普通段落
-            if para.text.strip():  # 非空段落
-                # 简单处理粗体和斜体（需要更复杂的实现来处理run级别格式）
-                md_content += f"{para.text}\n\n"
-            else:  # 空段落
-                md_content += "\n"
-
-    # 处理表格
-    for i, table in enumerate(doc.tables):
-        if i > 0:
-            md_content += "\n"
-        # 创建表头
-        if table.rows:
-            header_row = table.rows[0]
-            # 计算每列的最大宽度
-            col_widths = []
-            for cell in header_row.cells:
-                col_widths.append(max(len(cell.text), 3))  # 最小宽度为3
-
-            # 输出表头
-            header_line = "|"
-            separator_line = "|"
-            for j, cell in enumerate(header_row.cells):
-                width = col_widths[j]
-                header_line += f" {cell.text.ljust(width)} |"
-                separator_line += f" {'-' * width} |"
-
-            md_content += header_line + "\n"
-            md_content += separator_line + "\n"
-
-            # 输出数据行
-            for row in table.rows[1:]:
-                data_line = "|"
-                for j, cell in enumerate(row.cells):
-                    width = col_widths[j]
-                    data_line += f" {cell.text.ljust(width)} |"
-                md_content += data_line + "\n"
-
-        md_content += "\n"
-
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(md_content)
+def warm_up():
+    """转换进程启动时调用，预先初始化PDF渲染引擎"""
+    docx_pdf_renderer.warm_up()
 
 
 def convert_docx_to_pdf(input_path: str, output_path: str):
-    """将Word文档转换为PDF（使用docx2pdf）"""
+    """将Word文档转换为PDF（aspose.words渲染，需要许可证）；页数超过上限时抛出ValueError"""
     try:
-        from docx2pdf import convert
-        convert(input_path, output_path)
+        docx_pdf_renderer.render(input_path, output_path)
+    except ValueError:
+        raise
     except Exception as e:
         raise Exception(f"转换为PDF失败: {str(e)}")
 
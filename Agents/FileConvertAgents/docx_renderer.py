@@ -0,0 +1,158 @@
+"""
+DOCX -> PDF渲染
+使用aspose.words在进程内排版并输出PDF，不依赖Microsoft Word（docx2pdf只能在安装了Word的Windows、macOS上使用）：
+0.需要aspose.words许可证（配置pdfRendering.licensePath）：未授权的评估模式会截断文档并添加水印，
+  此时拒绝渲染（配置加载时也已从conversion_map中去掉 .docx -> .pdf），评估模式的输出不会产生或进入缓存
+1.转换进程启动时调用warm_up()：加载.NET运行时、许可证和字体设置，并渲染一个空白文档，
+  字体缓存和排版引擎在进程内只初始化一次（首次渲染约2秒，预热后的小文档约0.1秒）
+2.加载和排版过程中的回调检查耗时和页数，超过timeoutSeconds或页数超过maxPages时中止渲染，
+  进程保持预热状态继续处理后续请求；转换进程池的超时和内存限制仍作为最后的保障
+"""
+import io
+import logging
+import os
+import time
+from typing import List, Optional
+
+from Configs.FileConvertConfig.convert_config_init import conversion_config
+
+try:
+    import aspose.words as aw
+except ImportError:
+    aw = None
+
+logger = logging.getLogger("convert_run")
+
+
+class RenderTimeoutError(Exception):
+    """渲染超过时间上限"""
+
+
+class _RenderBudget:
+    """单次渲染的时间和页数上限，超出时记录原因并抛出异常中止aspose.words的加载或排版"""
+
+    def __init__(self, timeout_seconds: float, max_pages: int):
+        self.timeout_seconds = timeout_seconds
+        self.max_pages = max_pages
+        self.deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+        # 中止原因，回调中的异常经.NET包装后只剩文本，渲染结束后按原类型重新抛出
+        self.reason = None
+
+    def check(self, page_index: int = -1):
+        if self.max_pages and page_index >= self.max_pages:
+            self.reason = ValueError(f"文档页数超过上限（{self.max_pages}页）")
+            raise self.reason
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = RenderTimeoutError(f"渲染PDF超时（超过{self.timeout_seconds}秒）")
+            raise self.reason
+
+
+if aw is not None:
+    class _LoadingCallback(aw.loading.IDocumentLoadingCallback):
+        def __init__(self, budget: _RenderBudget):
+            aw.loading.IDocumentLoadingCallback.__init__(self)
+            self.budget = budget
+
+        def notify(self, args):
+            self.budget.check()
+
+    class _LayoutCallback(aw.layout.IPageLayoutCallback):
+        """排版过程中频繁回调（page_index为正在排版的页，从0开始），页数超限时不必排完整个文档"""
+
+        def __init__(self, budget: _RenderBudget):
+            aw.layout.IPageLayoutCallback.__init__(self)
+            self.budget = budget
+
+        def notify(self, args):
+            self.budget.check(args.page_index)
+
+
+class DocxPdfRenderer:
+    """DOCX -> PDF渲染器，每个转换进程一个实例"""
+
+    def __init__(self, timeout_seconds: float = 120, max_pages: int = 500, font_folders: Optional[List[str]] = None,
+                 license_path: str = "", warm_up: bool = True):
+        self.timeout_seconds = timeout_seconds
+        self.max_pages = max_pages
+        self.font_folders = font_folders or []
+        self.license_path = license_path
+        self.warm_up_enabled = warm_up
+        self._initialized = False
+
+    def _initialize(self):
+        """
+        许可证和字体目录对进程内所有文档生效，只设置一次
+
+        Raises:
+            Exception: 未安装aspose.words、未配置许可证或许可证无效（不以评估模式渲染）
+        """
+        if self._initialized:
+            return
+        if aw is None:
+            raise Exception("未安装aspose.words，无法将DOCX转换为PDF")
+        if not self.license_path or not os.path.isfile(self.license_path):
+            raise Exception("未配置aspose.words许可证（pdfRendering.licensePath），评估模式会截断文档并添加水印，已禁用DOCX转PDF")
+        try:
+            aw.License().set_license(self.license_path)
+        except Exception as e:
+            raise Exception(f"aspose.words许可证无效，已禁用DOCX转PDF: {e}")
+        if self.font_folders:
+            # 保留系统字体，配置的目录作为补充（如中文字体）
+            aw.fonts.FontSettings.default_instance.set_fonts_folders(self.font_folders, True)
+        self._initialized = True
+
+    def warm_up(self):
+        """转换进程启动时调用：初始化运行时并渲染一个空白文档，加载字体缓存"""
+        if aw is None or not self.warm_up_enabled:
+            return
+        start = time.perf_counter()
+        try:
+            self._initialize()
+        except Exception as e:
+            logger.warning(f"PDF renderer not warmed up, DOCX -> PDF is unavailable: {e}")
+            return
+        document = aw.Document()
+        aw.DocumentBuilder(document).writeln("warm up")
+        document.save(io.BytesIO(), aw.SaveFormat.PDF)
+        logger.info(f"PDF renderer warmed up in {time.perf_counter() - start:.2f}s")
+
+    def render(self, input_path: str, output_path: str):
+        """
+        将DOCX渲染为PDF
+
+        Raises:
+            ValueError: 页数超过上限
+            RenderTimeoutError: 渲染超时
+            Exception: 未授权（见_initialize）
+        """
+        self._initialize()
+        budget = _RenderBudget(self.timeout_seconds, self.max_pages)
+        guarded = bool(self.timeout_seconds or self.max_pages)
+        try:
+            if guarded:
+                load_options = aw.loading.LoadOptions()
+                load_options.progress_callback = _LoadingCallback(budget)
+                document = aw.Document(input_path, load_options)
+                document.layout_options.callback = _LayoutCallback(budget)
+            else:
+                document = aw.Document(input_path)
+            # 访问页数时完成排版，页数超限时不再输出
+            page_count = document.page_count
+            if self.max_pages and page_count > self.max_pages:
+                raise ValueError(f"文档页数超过上限（{page_count}页，最多{self.max_pages}页）")
+            document.save(output_path, aw.saving.PdfSaveOptions())
+        except Exception:
+            if budget.reason is not None:
+                raise budget.reason from None
+            raise
+
+
+_rendering_config = conversion_config.get("pdfRendering", {})
+# 创建全局PDF渲染实例
+docx_pdf_renderer = DocxPdfRenderer(
+    timeout_seconds=_rendering_config.get("timeoutSeconds", 120),
+    max_pages=_rendering_config.get("maxPages", 500),
+    font_folders=_rendering_config.get("fontFolders", []),
+    license_path=_rendering_config.get("licensePath", ""),
+    warm_up=_rendering_config.get("warmUp", True)
+)
@@ -0,0 +1,480 @@
+"""
+HTML单遍解析
+解析器按文档顺序产生开始标签、结束标签和文本事件，逐个事件构建文档模型的块（标题、段落、列表、表格、代码块），
+不构建整棵HTML树，块完成后即可取出渲染，内存占用只取决于当前未完成的块，与页面大小无关：
+1.安装了lxml时使用libxml2的HTML解析器（C实现），否则使用标准库html.parser（按BeautifulSoup的规则配对标签）
+2.块的划分和行内格式与按文档顺序遍历BeautifulSoup树的结果一致；格式错误的HTML（未闭合的p、li等）
+  由libxml2按浏览器的规则补全，结果可能与html.parser不同
+"""
+import html.parser
+import re
+from typing import Dict, Iterator, List, NamedTuple, TextIO
+
+from Agents.FileConvertAgents.document_model import (CodeBlock, Document, Heading, Paragraph, Run, Table, add_list_item,
+                                                     append_run, strip_runs)
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.document_model",)
+
+# 已安装的解析器后端，按优先级排列
+PARSERS = ("lxml", "html.parser") if etree is not None else ("html.parser",)
+DEFAULT_PARSER = PARSERS[0]
+# 流式读取时每次读取的字符数
+CHUNK_SIZE = 1024 * 1024
+
+_SKIPPED_TAGS = {"script", "style", "head", "title", "meta", "link", "noscript", "template"}
+_HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_PARAGRAPH_TAGS = {"p", "dt", "dd", "figcaption", "caption", "address"}
+_INLINE_FORMATS = {"b": "bold", "strong": "bold", "i": "italic", "em": "italic", "u": "underline", "ins": "underline",
+                   "code": "code", "kbd": "code", "samp": "code", "tt": "code"}
+_INLINE_TAGS = set(_INLINE_FORMATS) | {"a", "br", "img", "span", "abbr", "small", "big", "sub", "sup", "mark", "label",
+                                         "cite", "q", "s", "strike", "del", "font", "time", "var"}
+# 其中的文本不是正文（脚本、样式、模板、注音），提取单元格、代码块文本时也忽略
+_NON_CONTENT_TAGS = {"script", "style", "template", "rt", "rp"}
+# 没有结束标签的元素（html.parser的事件中不会结束，与BeautifulSoup相同的列表）
+_VOID_TAGS = {"area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr", "image", "img",
+              "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid", "param", "source", "spacer", "track",
+              "wbr"}
+# 其中只有空白的文本保持原样
+_PRESERVE_TAGS = {"pre", "textarea"}
+_WHITESPACE = re.compile(r'\s+')
+_LINE_BREAK_SPACES = re.compile(r' *\n *')
+_EMPTY_STYLE = Run("")
+
+# 元素的处理方式：块级容器、行内内容、列表、列表项、表格、表格行、代码块、忽略
+_CONTAINER, _INLINE, _LIST, _ITEM, _TABLE, _ROW, _PRE, _IGNORE = range(8)
+
+
+class _ListState(NamedTuple):
+    ordered: bool
+    items: list
+
+
+class _ItemState(NamedTuple):
+    runs: List[Run]
+    nested: List[_ListState]
+
+
+class _RowState(NamedTuple):
+    in_head: bool
+    cells: list
+
+
+class _PreState(NamedTuple):
+    text: List[str]
+    classes: List[str]
+    code_classes: list
+
+
+class _Frame:
+    """
+    已开始、未结束的元素
+    target、style为行内内容追加的位置和格式；state为所属的块（列表、表格、代码块等）；
+    cells为包含该元素的单元格（文本追加到每个单元格）；on_end在元素结束时生成块
+    """
+    __slots__ = ("mode", "tag", "target", "style", "state", "cells", "content", "on_end")
+
+    def __init__(self, mode, tag, target=None, style=_EMPTY_STYLE, state=None, cells=(), content=True, on_end=None):
+        self.mode = mode
+        self.tag = tag
+        self.target = target
+        self.style = style
+        self.state = state
+        self.cells = cells
+        self.content = content
+        self.on_end = on_end
+
+
+def _clean_line_breaks(runs: List[Run]) -> List[Run]:
+    """去掉换行两侧由源码换行产生的空格"""
+    cleaned = []
+    for run in strip_runs(runs):
+        if run.image is None and '\n' in run.text:
+            run = run._replace(text=_LINE_BREAK_SPACES.sub('\n', run.text))
+        cleaned.append(run)
+    return cleaned
+
+
+def _cell_text(parts: List[str]) -> str:
+    return _WHITESPACE.sub(' ', ''.join(parts)).strip()
+
+
+class HtmlBlockParser:
+    """
+    增量HTML解析：feed() 传入HTML文本，返回已完成的块；close() 返回其余的块
+    有body时只输出body中的内容（body之前的块在遇到body时丢弃），没有body时close()才输出全部块；
+    最后一个块可能是仍在合并列表项的列表，到下一个块出现或close()时才输出
+    """
+
+    def __init__(self, parser: str = DEFAULT_PARSER):
+        if parser not in PARSERS:
+            raise ValueError(f"不支持的HTML解析器: {parser}，可用: {', '.join(PARSERS)}")
+        if parser == "lxml":
+            self._parser = etree.HTMLParser(target=_LxmlTarget(self), encoding="utf-8")
+            self._encode = True
+        else:
+            self._parser = _StdlibParser(self)
+            self._encode = False
+        self._blocks = []
+        self._pending = []
+        self._text = []
+        self._stack = [_Frame(_CONTAINER, None)]
+        self._body_seen = False
+        self._done = False
+        self._title_parts = None
+        self._title_depth = 0
+        # 未结束的pre、textarea个数，其中只有空白的文本保持原样
+        self._preserve = 0
+
+    @property
+    def title(self) -> str:
+        """第一个title元素的文本"""
+        return ''.join(self._title_parts).strip() if self._title_parts else ""
+
+    def feed(self, content: str) -> list:
+        self._parser.feed(content.encode("utf-8") if self._encode else content)
+        if not self._body_seen or len(self._blocks) < 2:
+            return []
+        blocks = self._blocks[:-1]
+        del self._blocks[:-1]
+        return blocks
+
+    def close(self) -> list:
+        self._parser.close()
+        self._flush_text()
+        if not self._done:
+            self._flush_pending()
+        blocks = self._blocks
+        self._blocks = []
+        return blocks
+
+    # ---------- 解析事件 ----------
+
+    def _start(self, tag: str, attrs: Dict[str, str]):
+        self._flush_text()
+        parent = self._stack[-1]
+        if tag == "title" and self._title_parts is None:
+            self._title_parts = []
+            self._title_depth = len(self._stack) + 1
+        if tag == "body" and not self._body_seen:
+            # 只转换body中的内容，之前的块丢弃
+            self._body_seen = True
+            self._blocks = []
+            self._pending = []
+            self._stack.append(_Frame(_CONTAINER, tag, content=parent.content, on_end=self._end_body))
+            return
+        frame = self._child_frame(parent, tag, attrs)
+        frame.content = parent.content and tag not in _NON_CONTENT_TAGS
+        self._stack.append(frame)
+        if tag in _PRESERVE_TAGS:
+            self._preserve += 1
+
+    def _end(self):
+        self._flush_text()
+        frame = self._stack.pop()
+        if frame.tag in _PRESERVE_TAGS:
+            self._preserve -= 1
+        if len(self._stack) < self._title_depth:
+            self._title_depth = 0
+        if frame.on_end is not None and not self._done:
+            frame.on_end(frame)
+
+    def _data(self, text: str):
+        self._text.append(text)
+
+    def _cdata(self, text: str):
+        """CDATA不是正文，只计入单元格、代码块和标题的文本"""
+        self._flush_text()
+        frame = self._stack[-1]
+        if self._title_depth:
+            self._title_parts.append(text)
+        if self._done:
+            return
+        if frame.mode == _PRE:
+            frame.state.text.append(text)
+        elif frame.mode in (_TABLE, _ROW):
+            for cell in frame.cells:
+                cell.append(text)
+
+    def _boundary(self):
+        """注释、声明等：不产生内容，但分隔前后的文本"""
+        self._flush_text()
+
+    def _flush_text(self):
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text = []
+        frame = self._stack[-1]
+        if not frame.content:
+            return
+        if self._title_depth:
+            # 与BeautifulSoup相同，pre、textarea之外只有空白的文本按是否包含换行记为"\n"或" "
+            if not self._preserve and not text.strip():
+                text = "\n" if "\n" in text else " "
+            self._title_parts.append(text)
+        if self._done:
+            return
+        mode = frame.mode
+        if mode == _CONTAINER:
+            append_run(self._pending, Run(_WHITESPACE.sub(' ', text)))
+        elif mode == _INLINE or mode == _ITEM:
+            append_run(frame.target, Run(_WHITESPACE.sub(' ', text), *frame.style[1:]))
+        elif mode == _PRE:
+            frame.state.text.append(text)
+        elif mode == _TABLE or mode == _ROW:
+            for cell in frame.cells:
+                cell.append(text)
+
+    # ---------- 块的构建 ----------
+
+    def _child_frame(self, parent: _Frame, tag: str, attrs: Dict[str, str]) -> _Frame:
+        mode = parent.mode
+        if self._done or mode == _IGNORE:
+            return _Frame(_IGNORE, tag)
+        if mode == _CONTAINER:
+            return self._container_child(tag, attrs)
+        if mode == _INLINE:
+            return self._inline_child(parent.target, parent.style, tag, attrs)
+        if mode == _ITEM:
+            if tag in ("ul", "ol"):
+                state = _ListState(tag == "ol", [])
+                parent.state.nested.append(state)
+                return _Frame(_LIST, tag, state=state)
+            return self._inline_child(parent.target, _EMPTY_STYLE, tag, attrs)
+        if mode == _LIST:
+            if tag == "li":
+                state = _ItemState([], [])
+                parent.state.items.append(state)
+                return _Frame(_ITEM, tag, target=state.runs, state=state)
+            return _Frame(_IGNORE, tag)
+        if mode == _PRE:
+            if tag == "code" and parent.state.code_classes == [None]:
+                parent.state.code_classes[0] = attrs.get("class", "").split()
+            return _Frame(_PRE, tag, state=parent.state)
+        return self._table_child(parent, tag)
+
+    def _container_child(self, tag: str, attrs: Dict[str, str]) -> _Frame:
+        if tag in _SKIPPED_TAGS:
+            return _Frame(_IGNORE, tag)
+        if tag in _INLINE_TAGS:
+            return self._inline_child(self._pending, _EMPTY_STYLE, tag, attrs)
+        self._flush_pending()
+        if tag in _HEADING_TAGS:
+            return _Frame(_INLINE, tag, target=[], on_end=self._end_heading)
+        if tag in _PARAGRAPH_TAGS:
+            return _Frame(_INLINE, tag, target=[], on_end=self._end_paragraph)
+        if tag in ("ul", "ol"):
+            return _Frame(_LIST, tag, state=_ListState(tag == "ol", []), on_end=self._end_list)
+        if tag == "table":
+            return _Frame(_TABLE, tag, state=[], on_end=self._end_table)
+        if tag == "pre":
+            state = _PreState([], attrs.get("class", "").split(), [None])
+            return _Frame(_PRE, tag, state=state, on_end=self._end_pre)
+        if tag == "hr":
+            return _Frame(_IGNORE, tag)
+        # div、section、blockquote等容器元素：继续处理子元素
+        return _Frame(_CONTAINER, tag)
+
+    @staticmethod
+    def _inline_child(target: List[Run], style: Run, tag: str, attrs: Dict[str, str]) -> _Frame:
+        """行内内容；遇到的嵌套块级元素按行内文本处理"""
+        if tag in _SKIPPED_TAGS:
+            return _Frame(_IGNORE, tag)
+        if tag == "br":
+            append_run(target, style._replace(text="\n"))
+            return _Frame(_IGNORE, tag)
+        if tag == "img":
+            if attrs.get("src"):
+                target.append(Run(attrs.get("alt", ""), image=attrs["src"]))
+            return _Frame(_IGNORE, tag)
+        if tag in _INLINE_FORMATS:
+            style = style._replace(**{_INLINE_FORMATS[tag]: True})
+        elif tag == "a" and attrs.get("href"):
+            style = style._replace(href=attrs["href"])
+        return _Frame(_INLINE, tag, target=target, style=style)
+
+    @staticmethod
+    def _table_child(parent: _Frame, tag: str) -> _Frame:
+        """表格中的元素：state为所属表格的行（嵌套表格中为None），表格行的target为该行；只有所属表格的行和行中直接的单元格计入"""
+        rows = parent.state
+        if tag == "table":
+            return _Frame(_TABLE, tag, state=None, cells=parent.cells)
+        if tag == "tr" and rows is not None:
+            row = _RowState(parent.tag == "thead", [])
+            rows.append(row)
+            return _Frame(_ROW, tag, target=row, state=rows, cells=parent.cells)
+        if tag in ("td", "th") and parent.mode == _ROW:
+            text = []
+            parent.target.cells.append((tag, text))
+            return _Frame(_TABLE, tag, state=rows, cells=parent.cells + (text,))
+        return _Frame(_TABLE, tag, state=rows, cells=parent.cells)
+
+    def _flush_pending(self):
+        runs = _clean_line_breaks(self._pending)
+        if runs:
+            self._blocks.append(Paragraph(runs))
+        self._pending = []
+
+    def _end_body(self, frame: _Frame):
+        self._flush_pending()
+        self._done = True
+
+    def _end_heading(self, frame: _Frame):
+        runs = _clean_line_breaks(frame.target)
+        if runs:
+            self._blocks.append(Heading(_HEADING_TAGS[frame.tag], runs))
+
+    def _end_paragraph(self, frame: _Frame):
+        runs = _clean_line_breaks(frame.target)
+        if runs:
+            self._blocks.append(Paragraph(runs))
+
+    def _end_list(self, frame: _Frame):
+        self._add_list(frame.state, 0)
+
+    def _add_list(self, state: _ListState, depth: int):
+        for item in state.items:
+            add_list_item(self._blocks, state.ordered, depth, _clean_line_breaks(item.runs))
+            for nested in item.nested:
+                self._add_list(nested, depth + 1)
+
+    def _end_table(self, frame: _Frame):
+        rows = []
+        header_rows = 0
+        for in_head, cells in frame.state:
+            if not cells:
+                continue
+            # thead中的行、或全部为th且位于表格开头的行作为表头
+            if (in_head or all(tag == "th" for tag, _ in cells)) and header_rows == len(rows):
+                header_rows += 1
+            rows.append([_cell_text(text) for _, text in cells])
+        if rows:
+            self._blocks.append(Table(rows, header_rows))
+
+    def _end_pre(self, frame: _Frame):
+        state = frame.state
+        text = ''.join(state.text)
+        if text.strip():
+            self._blocks.append(CodeBlock(text.strip('\n'), _code_language((state.code_classes[0] or []) + state.classes)))
+
+
+def _code_language(classes: List[str]) -> str:
+    for class_name in classes:
+        if class_name.startswith("language-"):
+            return class_name[len("language-"):]
+    return ""
+
+
+# ==================== 解析器后端 ====================
+
+class _LxmlTarget:
+    """libxml2解析器的事件接收对象，标签由解析器配对和补全"""
+
+    def __init__(self, builder: HtmlBlockParser):
+        self._builder = builder
+
+    def start(self, tag, attrib):
+        self._builder._start(tag, dict(attrib))
+
+    def end(self, tag):
+        self._builder._end()
+
+    def data(self, data):
+        self._builder._data(data)
+
+    def comment(self, text):
+        self._builder._boundary()
+
+    def pi(self, target, data=None):
+        self._builder._boundary()
+
+    def close(self):
+        return None
+
+
+class _StdlibParser(html.parser.HTMLParser):
+    """
+    标准库html.parser的事件按BeautifulSoup的规则配对：空元素开始后立即结束，
+    结束标签同时结束其中未闭合的元素，没有对应开始标签的结束标签只分隔前后的文本，文档结束时结束所有未闭合的元素
+    """
+
+    def __init__(self, builder: HtmlBlockParser):
+        super().__init__(convert_charrefs=True)
+        self._builder = builder
+        self._open = []
+        # 已结束的空元素 -> 个数，之后出现的同名结束标签（如<br></br>）忽略
+        self._closed_void = {}
+
+    def handle_starttag(self, tag, attrs):
+        self._builder._start(tag, {name: value or "" for name, value in attrs})
+        if tag in _VOID_TAGS:
+            self._builder._end()
+            self._closed_void[tag] = self._closed_void.get(tag, 0) + 1
+        else:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._builder._start(tag, {name: value or "" for name, value in attrs})
+        self._builder._end()
+
+    def handle_endtag(self, tag):
+        if self._closed_void.get(tag):
+            self._closed_void[tag] -= 1
+            return
+        if tag not in self._open:
+            self._builder._boundary()
+            return
+        while self._open.pop() != tag:
+            self._builder._end()
+        self._builder._end()
+
+    def handle_data(self, data):
+        self._builder._data(data)
+
+    def handle_comment(self, data):
+        self._builder._boundary()
+
+    def handle_decl(self, decl):
+        self._builder._boundary()
+
+    def handle_pi(self, data):
+        self._builder._boundary()
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            self._builder._cdata(data[len("CDATA["):])
+        else:
+            self._builder._boundary()
+
+    def close(self):
+        super().close()
+        while self._open:
+            self._open.pop()
+            self._builder._end()
+
+
+# ==================== 入口 ====================
+
+def parse_html(html_content: str, parser: str = DEFAULT_PARSER) -> Document:
+    """将HTML文本解析为文档树"""
+    block_parser = HtmlBlockParser(parser)
+    blocks = block_parser.feed(html_content)
+    blocks.extend(block_parser.close())
+    return Document(blocks, block_parser.title)
+
+
+def iter_blocks(file: TextIO, parser: str = DEFAULT_PARSER, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """按块读取HTML文件，逐个产出已完成的块"""
+    block_parser = HtmlBlockParser(parser)
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        yield from block_parser.feed(chunk)
+    yield from block_parser.close()
@@ -1,131 +1,351 @@
 """
 JSON文件转换代理
 处理JSON到其他格式的转换
+读取（load_data、parse_data）与生成目标格式（dump_json_to_*）分开，转换链中可直接处理内存中的JSON文本
+输入文件较大时CSV、HTML、YAML、XML转换改为流式：增量解析顶层数组（json_stream），逐条写入输出，内存占用与文件大小无关
+生成YAML和缩进的JSON使用serialization模块（安装了libyaml、orjson时使用加速实现）；解析使用标准库json
 """
 
+import functools
+import io
+import itertools
 import json
-import yaml
-from typing import Dict, Any, Union
+import logging
+import os
+import re
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import csv
-from xml.etree import ElementTree as ET
-from xml.dom import minidom
 
+from Agents.FileConvertAgents.json_stream import JsonStreamReader
+from Agents.serialization import json_dumps, yaml_dump
 
-def convert_json_to_yaml(input_path: str, output_path: str):
-    """将JSON转换为YAML"""
-    try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.json_stream", "Agents.serialization")
+
+logger = logging.getLogger("convert_run")
+
+# 输入文件不小于该大小（字节）时流式转换
+STREAM_MIN_BYTES = 16 * 1024 * 1024
+# 流式转换时按前多少条记录推断字段（CSV、HTML表头）
+SCHEMA_SAMPLE_SIZE = 1000
+# 为True时流式转换前先完整扫描一遍收集字段；为False时按样本推断，样本之后出现新字段时自动改为完整扫描后重新输出
+FULL_SCHEMA_SCAN = False
+# 流式转换YAML时每批序列化的元素数
+YAML_BATCH_SIZE = 256
+# 流式转换XML时累计多少个片段后写入文件
+XML_FLUSH_PARTS = 65536
+
+# XML元素名允许的字符（XML 1.0 Name，不含冒号，避免被解析为命名空间前缀）
+_XML_NAME_START_CHARS = (
+    "A-Z_a-z\u00C0-\u00D6\u00D8-\u00F6\u00F8-\u02FF\u0370-\u037D\u037F-\u1FFF\u200C-\u200D"
+    "\u2070-\u218F\u2C00-\u2FEF\u3001-\uD7FF\uF900-\uFDCF\uFDF0-\uFFFD\U00010000-\U000EFFFF"
+)
+_XML_NAME_START_CHAR = re.compile(f"[{_XML_NAME_START_CHARS}]")
+_XML_INVALID_NAME_CHARS = re.compile(f"[^{_XML_NAME_START_CHARS}\\-.0-9\u00B7\u0300-\u036F\u203F-\u2040]")
+# 元素文本中需要转义、替换或删除的字符
+_XML_TEXT_SPECIAL = re.compile('[&<>"\r\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+_XML_TEXT_REPLACEMENTS = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "\r": "\n"}
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            yaml.dump(json_data, f, allow_unicode=True, default_flow_style=False, indent=2)
+
+def load_data(input_path: str) -> Any:
+    """读取JSON文件"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parse_data(json_content: str) -> Any:
+    """解析JSON文本（转换链中上一步在内存中的输出）"""
+    return json.loads(json_content)
+
+
+@contextmanager
+def _conversion_errors():
+    """统一转换错误信息"""
+    try:
+        yield
     except json.JSONDecodeError as e:
         raise Exception(f"JSON格式错误: {str(e)}")
     except Exception as e:
         raise Exception(f"转换失败: {str(e)}")
 
 
-def convert_json_to_txt(input_path: str, output_path: str):
-    """将JSON转换为纯文本"""
-    try:
+def _convert(input_path: str, output_path: str, dump, newline: str = None):
+    """读取JSON文件，按dump函数生成目标格式内容并写入"""
+    with _conversion_errors():
+        content = dump(load_data(input_path))
+
+        with open(output_path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+
+
+def _should_stream(input_path: str, stream: Optional[bool]) -> bool:
+    """stream为None时按文件大小决定是否流式转换"""
+    return os.path.getsize(input_path) >= STREAM_MIN_BYTES if stream is None else stream
+
+
+class _NewFieldError(Exception):
+    """按样本推断字段后，后续记录出现了样本中没有的字段"""
+
+
+def _record_fields(records) -> List[str]:
+    fieldnames = set()
+    for item in records:
+        if isinstance(item, dict):
+            fieldnames.update(item.keys())
+    return sorted(fieldnames)
+
+
+_EMPTY = object()
+
+
+def _stream_records(reader: JsonStreamReader, input_path: str, full_scan: bool) -> Tuple[List[str], Iterator[Any], bool]:
+    """
+    增量读取顶层数组的记录并确定字段（已排序）
+
+    Returns:
+        (字段名, 记录迭代器, 数组是否非空)；按样本推断字段时，样本之后出现新字段则迭代器抛出_NewFieldError
+    """
+    items = reader.iter_array()
+    if full_scan:
         with open(input_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+            scan = JsonStreamReader(f).iter_array()
+            first = next(scan, _EMPTY)
+            fieldnames = _record_fields(itertools.chain(() if first is _EMPTY else (first,), scan))
+        return fieldnames, items, first is not _EMPTY
 
-        txt_content = json.dumps(json_data, indent=2, ensure_ascii=False)
+    sample = list(itertools.islice(items, SCHEMA_SAMPLE_SIZE))
+    fieldnames = _record_fields(sample)
+    known = frozenset(fieldnames)
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(txt_content)
-    except json.JSONDecodeError as e:
-        raise Exception(f"JSON格式错误: {str(e)}")
-    except Exception as e:
-        raise Exception(f"转换失败: {str(e)}")
+    def records():
+        yield from sample
+        for item in items:
+            if isinstance(item, dict) and not item.keys() <= known:
+                raise _NewFieldError()
+            yield item
+
+    return fieldnames, records(), bool(sample)
 
 
-def convert_json_to_csv(input_path: str, output_path: str):
-    """将JSON数组转换为CSV"""
+def _with_schema_fallback(convert, input_path: str, output_path: str, full_scan: bool):
+    """按样本推断字段的流式转换遇到新字段时，改为完整扫描后重新输出"""
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        convert(input_path, output_path, full_scan)
+    except _NewFieldError:
+        logger.info(f"New fields after the first {SCHEMA_SAMPLE_SIZE} records, rescanning {input_path}")
+        convert(input_path, output_path, True)
+
+
+def convert_json_to_yaml(input_path: str, output_path: str, stream: Optional[bool] = None):
+    """将JSON转换为YAML"""
+    if _should_stream(input_path, stream):
+        with _conversion_errors():
+            _stream_json_to_yaml(input_path, output_path)
+    else:
+        _convert(input_path, output_path, dump_json_to_yaml)
+
+
+def dump_json_to_yaml(json_data: Any) -> str:
+    return yaml_dump(json_data, allow_unicode=True, default_flow_style=False, indent=2)
+
+
+def _stream_json_to_yaml(input_path: str, output_path: str):
+    """
+    顶层数组按批序列化（各元素的YAML相互独立，结果与整体序列化一致）；
+    顶层为对象时序列化需对键排序，仍整体读取
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        reader = JsonStreamReader(f)
+        if reader.kind() != "array":
+            content = dump_json_to_yaml(reader.value())
+            with open(output_path, 'w', encoding='utf-8') as out:
+                out.write(content)
+            return
+
+        items = reader.iter_array()
+        with open(output_path, 'w', encoding='utf-8') as out:
+            batch = list(itertools.islice(items, YAML_BATCH_SIZE))
+            if not batch:
+                out.write(dump_json_to_yaml([]))
+            while batch:
+                out.write(dump_json_to_yaml(batch))
+                batch = list(itertools.islice(items, YAML_BATCH_SIZE))
+
+
+# .yml与.yaml使用相同的转换
+def convert_json_to_yml(input_path: str, output_path: str, stream: Optional[bool] = None):
+    """将JSON转换为YAML（.yml）"""
+    convert_json_to_yaml(input_path, output_path, stream)
+
+
+dump_json_to_yml = dump_json_to_yaml
 
-        # 检查数据是否为数组
-        if not isinstance(json_data, list):
-            raise Exception("JSON数据必须是数组格式才能转换为CSV")
 
-        if not json_data:
+def convert_json_to_txt(input_path: str, output_path: str):
+    """将JSON转换为纯文本"""
+    _convert(input_path, output_path, dump_json_to_txt)
+
+
+def dump_json_to_txt(json_data: Any) -> str:
+    return json_dumps(json_data, pretty=True)
+
+
+def convert_json_to_csv(input_path: str, output_path: str, stream: Optional[bool] = None, full_scan: bool = FULL_SCHEMA_SCAN):
+    """
+    将JSON数组转换为CSV
+
+    Args:
+        stream: 是否流式转换，为None时按文件大小决定
+        full_scan: 流式转换时先完整扫描一遍收集字段
+    """
+    if _should_stream(input_path, stream):
+        with _conversion_errors():
+            _with_schema_fallback(_stream_json_to_csv, input_path, output_path, full_scan)
+    else:
+        _convert(input_path, output_path, dump_json_to_csv, newline='')
+
+
+def _csv_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    """处理嵌套对象，将其转换为字符串"""
+    processed_item = {}
+    for key, value in item.items():
+        if isinstance(value, (dict, list)):
+            processed_item[key] = json.dumps(value, ensure_ascii=False)
+        else:
+            processed_item[key] = value
+    return processed_item
+
+
+def _write_csv(output, fieldnames: List[str], records):
+    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer.writeheader()
+    for item in records:
+        if isinstance(item, dict):
+            writer.writerow(_csv_row(item))
+
+
+def dump_json_to_csv(json_data: Any) -> str:
+    # 检查数据是否为数组
+    if not isinstance(json_data, list):
+        raise Exception("JSON数据必须是数组格式才能转换为CSV")
+
+    if not json_data:
+        raise Exception("JSON数组为空")
+
+    output = io.StringIO(newline='')
+    _write_csv(output, _record_fields(json_data), json_data)
+    return output.getvalue()
+
+
+def _stream_json_to_csv(input_path: str, output_path: str, full_scan: bool):
+    with open(input_path, 'r', encoding='utf-8') as f:
+        reader = JsonStreamReader(f)
+        if reader.kind() != "array":
+            raise Exception("JSON数据必须是数组格式才能转换为CSV")
+        fieldnames, records, non_empty = _stream_records(reader, input_path, full_scan)
+        if not non_empty:
             raise Exception("JSON数组为空")
 
-        # 获取所有可能的字段名
-        fieldnames = set()
-        for item in json_data:
-            if isinstance(item, dict):
-                fieldnames.update(item.keys())
-
-        fieldnames = sorted(list(fieldnames))
-
-        # 写入CSV文件
-        with open(output_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for item in json_data:
-                if isinstance(item, dict):
-                    # 处理嵌套对象，将其转换为字符串
-                    processed_item = {}
-                    for key, value in item.items():
-                        if isinstance(value, (dict, list)):
-                            processed_item[key] = json.dumps(value, ensure_ascii=False)
-                        else:
-                            processed_item[key] = value
-                    writer.writerow(processed_item)
-    except json.JSONDecodeError as e:
-        raise Exception(f"JSON格式错误: {str(e)}")
-    except Exception as e:
-        raise Exception(f"转换失败: {str(e)}")
+        with open(output_path, 'w', encoding='utf-8', newline='') as out:
+            _write_csv(out, fieldnames, records)
 
 
-def convert_json_to_xml(input_path: str, output_path: str):
-    """将JSON转换为XML"""
-    try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+def convert_json_to_xml(input_path: str, output_path: str, stream: Optional[bool] = None):
+    """
+    将JSON转换为XML
 
-        # 创建根元素
-        root = ET.Element("root")
+    Args:
+        stream: 是否流式转换，为None时按文件大小决定
+    """
+    if _should_stream(input_path, stream):
+        with _conversion_errors():
+            _stream_json_to_xml(input_path, output_path)
+    else:
+        _convert(input_path, output_path, dump_json_to_xml)
 
-        # 递归转换JSON到XML
-        _dict_to_xml(json_data, root)
 
-        # 格式化XML
-        rough_string = ET.tostring(root, encoding='utf-8')
-        reparsed = minidom.parseString(rough_string)
-        xml_content = reparsed.toprettyxml(indent="  ", encoding='utf-8').decode('utf-8')
+def dump_json_to_xml(json_data: Any) -> str:
+    parts = []
+    _append_xml(parts, json_data, "root", "item", "")
+    return ''.join(parts)
 
-        # 移除XML声明中的版本信息（如果不需要）
-        lines = xml_content.split('\n')
-        if lines and '<?xml' in lines[0]:
-            lines = lines[1:]
-        xml_content = '\n'.join(lines)
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(xml_content)
-    except json.JSONDecodeError as e:
-        raise Exception(f"JSON格式错误: {str(e)}")
-    except Exception as e:
-        raise Exception(f"转换失败: {str(e)}")
+@functools.lru_cache(maxsize=4096)
+def _xml_name(key: str) -> str:
+    """将键转换为合法的XML元素名：不允许的字符替换为下划线，不能作为开头的字符（数字、连字符等）前加下划线"""
+    name = _XML_INVALID_NAME_CHARS.sub("_", key)
+    if not _XML_NAME_START_CHAR.match(name):
+        name = "_" + name
+    return name
+
+
+def _xml_text(value: Any) -> str:
+    """元素文本：与minidom一致转义 & < " >，统一换行符，删除XML不允许的控制字符"""
+    if not isinstance(value, str):
+        return str(value)
+    if _XML_TEXT_SPECIAL.search(value) is None:
+        return value
+    value = value.replace("\r\n", "\n")
+    return _XML_TEXT_SPECIAL.sub(lambda match: _XML_TEXT_REPLACEMENTS.get(match.group(), ""), value)
 
 
-def _dict_to_xml(data: Union[Dict, Any], parent: ET.Element, key: str = "item"):
-    """递归将字典转换为XML元素"""
+def _append_xml(parts: List[str], data: Any, tag: str, item_tag: str, indent: str):
+    """
+    递归追加元素 <tag> 的XML片段，格式与 minidom.toprettyxml(indent="  ") 一致：
+    对象的每个键一个子元素；数组的每个元素一个名为item_tag的子元素（顶层数组及数组中的数组为item，对象中的数组沿用键名）；
+    简单值与标签在同一行，空字符串、空对象、空数组为自闭合标签
+    """
     if isinstance(data, dict):
-        for k, v in data.items():
-            element = ET.SubElement(parent, k)
-            _dict_to_xml(v, element, k)
+        if not data:
+            parts.append(f"{indent}<{tag}/>\n")
+            return
+        parts.append(f"{indent}<{tag}>\n")
+        child_indent = indent + "  "
+        for key, value in data.items():
+            name = _xml_name(key)
+            _append_xml(parts, value, name, name, child_indent)
+        parts.append(f"{indent}</{tag}>\n")
     elif isinstance(data, list):
+        if not data:
+            parts.append(f"{indent}<{tag}/>\n")
+            return
+        parts.append(f"{indent}<{tag}>\n")
+        child_indent = indent + "  "
         for item in data:
-            element = ET.SubElement(parent, key)
-            _dict_to_xml(item, element, "item")
+            _append_xml(parts, item, item_tag, "item", child_indent)
+        parts.append(f"{indent}</{tag}>\n")
     else:
-        parent.text = str(data)
+        text = _xml_text(data)
+        parts.append(f"{indent}<{tag}>{text}</{tag}>\n" if text else f"{indent}<{tag}/>\n")
+
+
+def _stream_json_to_xml(input_path: str, output_path: str):
+    """增量读取顶层数组的元素（或顶层对象的成员），逐个生成子元素写入输出，不构建整个文档"""
+    with open(input_path, 'r', encoding='utf-8') as f, open(output_path, 'w', encoding='utf-8') as out:
+        reader = JsonStreamReader(f)
+        kind = reader.kind()
+        if kind == "array":
+            children = (("item", item) for item in reader.iter_array())
+        elif kind == "object":
+            children = ((_xml_name(key), value) for key, value in reader.iter_object())
+        else:
+            out.write(dump_json_to_xml(reader.value()))
+            return
+
+        first = next(children, _EMPTY)
+        if first is _EMPTY:
+            out.write("<root/>\n")
+            return
+        out.write("<root>\n")
+        parts = []
+        for tag, value in itertools.chain((first,), children):
+            _append_xml(parts, value, tag, tag, "  ")
+            if len(parts) >= XML_FLUSH_PARTS:
+                out.writelines(parts)
+                parts.clear()
+        parts.append("</root>\n")
+        out.writelines(parts)
 
 
 def validate_json(input_path: str) -> Dict[str, Any]:
@@ -163,13 +383,22 @@ def validate_json(input_path: str) -> Dict[str, Any]:
         }
 
 
-def convert_json_to_html(input_path: str, output_path: str):
-    """将JSON转换为HTML表格展示"""
-    try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+def convert_json_to_html(input_path: str, output_path: str, stream: Optional[bool] = None, full_scan: bool = FULL_SCHEMA_SCAN):
+    """
+    将JSON转换为HTML表格展示
+
+    Args:
+        stream: 是否流式转换，为None时按文件大小决定
+        full_scan: 流式转换时先完整扫描一遍收集字段
+    """
+    if _should_stream(input_path, stream):
+        with _conversion_errors():
+            _with_schema_fallback(_stream_json_to_html, input_path, output_path, full_scan)
+    else:
+        _convert(input_path, output_path, dump_json_to_html)
 
-        html_content = """<!DOCTYPE html>
+
+_HTML_HEAD = """<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
@@ -184,72 +413,77 @@ def convert_json_to_html(input_path: str, output_path: str):
 </head>
 <body>
 """
+_HTML_TAIL = "</body>\n</html>"
 
-        if isinstance(json_data, list) and json_data:
-            # 处理数组数据
-            html_content += "<h1>JSON Array Data</h1>\n"
-
-            # 获取所有字段名
-            fieldnames = set()
-            for item in json_data:
-                if isinstance(item, dict):
-                    fieldnames.update(item.keys())
 
-            fieldnames = sorted(list(fieldnames))
+def _html_array_parts(fieldnames: List[str], records) -> Iterator[str]:
+    """数组数据：每条记录一行"""
+    yield "<h1>JSON Array Data</h1>\n"
 
-            # 创建表格
-            html_content += "<table>\n"
-            html_content += "<thead>\n<tr>\n"
+    # 创建表格
+    yield "<table>\n<thead>\n<tr>\n"
+    yield ''.join(f"<th>{field}</th>\n" for field in fieldnames)
+    yield "</tr>\n</thead>\n<tbody>\n"
+    for item in records:
+        row = ["<tr>\n"]
+        if isinstance(item, dict):
             for field in fieldnames:
-                html_content += f"<th>{field}</th>\n"
-            html_content += "</tr>\n</thead>\n"
-
-            html_content += "<tbody>\n"
-            for item in json_data:
-                html_content += "<tr>\n"
-                if isinstance(item, dict):
-                    for field in fieldnames:
-                        value = item.get(field, "")
-                        # 处理嵌套对象
-                        if isinstance(value, (dict, list)):
-                            value = json.dumps(value, ensure_ascii=False)
-                        html_content += f"<td>{value}</td>\n"
-                else:
-                    html_content += f"<td>{item}</td>\n"
-                html_content += "</tr>\n"
-            html_content += "</tbody>\n"
-            html_content += "</table>\n"
-
-        elif isinstance(json_data, dict):
-            # 处理对象数据
-            html_content += "<h1>JSON Object Data</h1>\n"
-            html_content += "<table>\n"
-            html_content += "<thead>\n<tr>\n<th>Key</th>\n<th>Value</th>\n</tr>\n</thead>\n"
-            html_content += "<tbody>\n"
-
-            for key, value in json_data.items():
-                html_content += "<tr>\n"
-                html_content += f"<td>{key}</td>\n"
+                value = item.get(field, "")
                 # 处理嵌套对象
                 if isinstance(value, (dict, list)):
-                    value_str = json.dumps(value, ensure_ascii=False, indent=2)
-                    html_content += f"<td><pre>{value_str}</pre></td>\n"
-                else:
-                    html_content += f"<td>{value}</td>\n"
-                html_content += "</tr>\n"
-
-            html_content += "</tbody>\n"
-            html_content += "</table>\n"
+                    value = json.dumps(value, ensure_ascii=False)
+                row.append(f"<td>{value}</td>\n")
+        else:
+            row.append(f"<td>{item}</td>\n")
+        row.append("</tr>\n")
+        yield ''.join(row)
+    yield "</tbody>\n</table>\n"
+
+
+def _html_object_parts(members) -> Iterator[str]:
+    """对象数据：每个键一行"""
+    yield "<h1>JSON Object Data</h1>\n"
+    yield "<table>\n<thead>\n<tr>\n<th>Key</th>\n<th>Value</th>\n</tr>\n</thead>\n<tbody>\n"
+    for key, value in members:
+        # 处理嵌套对象
+        if isinstance(value, (dict, list)):
+            value_str = json_dumps(value, pretty=True)
+            yield f"<tr>\n<td>{key}</td>\n<td><pre>{value_str}</pre></td>\n</tr>\n"
         else:
-            # 处理简单值
-            html_content += f"<h1>JSON Value</h1>\n<p>{json_data}</p>\n"
+            yield f"<tr>\n<td>{key}</td>\n<td>{value}</td>\n</tr>\n"
+    yield "</tbody>\n</table>\n"
 
-        html_content += "</body>\n</html>"
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+def _html_value_part(value: Any) -> str:
+    """简单值"""
+    return f"<h1>JSON Value</h1>\n<p>{value}</p>\n"
 
-    except json.JSONDecodeError as e:
-        raise Exception(f"JSON格式错误: {str(e)}")
-    except Exception as e:
-        raise Exception(f"转换失败: {str(e)}")
\ No newline at end of file
+
+def dump_json_to_html(json_data: Any) -> str:
+    parts = [_HTML_HEAD]
+    if isinstance(json_data, list) and json_data:
+        parts.extend(_html_array_parts(_record_fields(json_data), json_data))
+    elif isinstance(json_data, dict):
+        parts.extend(_html_object_parts(json_data.items()))
+    else:
+        parts.append(_html_value_part(json_data))
+    parts.append(_HTML_TAIL)
+    return ''.join(parts)
+
+
+def _stream_json_to_html(input_path: str, output_path: str, full_scan: bool):
+    with open(input_path, 'r', encoding='utf-8') as f, open(output_path, 'w', encoding='utf-8') as out:
+        reader = JsonStreamReader(f)
+        kind = reader.kind()
+        out.write(_HTML_HEAD)
+        if kind == "array":
+            fieldnames, records, non_empty = _stream_records(reader, input_path, full_scan)
+            if non_empty:
+                out.writelines(_html_array_parts(fieldnames, records))
+            else:
+                out.write(_html_value_part([]))
+        elif kind == "object":
+            out.writelines(_html_object_parts(reader.iter_object()))
+        else:
+            out.write(_html_value_part(reader.value()))
+        out.write(_HTML_TAIL)
@@ -0,0 +1,168 @@
+"""
+JSON增量解析
+按块读取文件，用json.JSONDecoder.raw_decode（C实现的扫描器）逐个解析顶层数组的元素或顶层对象的成员，
+已解析的内容随即丢弃，内存占用只取决于单个元素的大小，与文件大小无关
+"""
+import json
+from json.decoder import WHITESPACE
+from typing import Any, Iterator, TextIO, Tuple
+
+# 每次读取的字符数
+CHUNK_SIZE = 1024 * 1024
+# 解析错误或字面量的结尾位于缓冲区末尾这么多字符以内时，视为值可能被块边界截断（如 "tr|ue"、"1e|5"），读取更多内容后重试
+_TRUNCATION_MARGIN = 16
+
+
+class JsonStreamError(json.JSONDecodeError):
+    """增量解析错误，行号、列号、字符位置均相对整个文件"""
+
+    def __init__(self, msg: str, lineno: int, colno: int, pos: int):
+        ValueError.__init__(self, f"{msg}: line {lineno} column {colno} (char {pos})")
+        self.msg = msg
+        self.doc = None
+        self.pos = pos
+        self.lineno = lineno
+        self.colno = colno
+
+    def __reduce__(self):
+        return self.__class__, (self.msg, self.lineno, self.colno, self.pos)
+
+
+class JsonStreamReader:
+    """
+    顶层JSON值的增量读取器：
+    kind() 返回顶层值类型，随后按类型调用 iter_array()、iter_object() 或 value()，各只能调用一次
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        # 已丢弃内容的字符数、行数和当前行起始位置，用于报告错误位置
+        self._offset = 0
+        self._line = 1
+        self._line_start = 0
+
+    def _read(self, size: int) -> bool:
+        """丢弃已解析的内容并读取更多字符，已到文件末尾时返回False"""
+        if self._eof:
+            return False
+        chunk = self._file.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        consumed = self._buffer[:self._pos]
+        newlines = consumed.count("\n")
+        if newlines:
+            self._line += newlines
+            self._line_start = self._offset + consumed.rfind("\n") + 1
+        self._offset += self._pos
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _error(self, msg: str, pos: int) -> JsonStreamError:
+        newlines = self._buffer.count("\n", 0, pos)
+        lineno = self._line + newlines
+        if newlines:
+            colno = pos - self._buffer.rfind("\n", 0, pos)
+        else:
+            colno = self._offset + pos - self._line_start + 1
+        return JsonStreamError(msg, lineno, colno, self._offset + pos)
+
+    def _peek(self) -> str:
+        """跳过空白，返回下一个字符；文件结束时返回空字符串"""
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read(self._chunk_size):
+                return ""
+
+    def _decode(self) -> Any:
+        """解析当前位置的一个完整JSON值；值跨越块边界时按倍增的大小读取更多内容"""
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                truncated = e.pos >= len(self._buffer) - _TRUNCATION_MARGIN or e.msg.startswith("Unterminated string")
+                if truncated and self._read(size):
+                    size *= 2
+                    continue
+                raise self._error(e.msg, e.pos)
+            # 数字、true等字面量在缓冲区末尾附近结束时可能被截断（如 "1.|5" 会被解析为1），需读取更多内容确认
+            if end > len(self._buffer) - _TRUNCATION_MARGIN and self._buffer[end - 1] not in '"]}' and self._read(size):
+                size *= 2
+                continue
+            self._pos = end
+            return value
+
+    def _expect_end(self):
+        if self._peek():
+            raise self._error("Extra data", self._pos)
+
+    def kind(self) -> str:
+        """顶层值类型："array"、"object" 或 "value"（字符串、数字等）"""
+        char = self._peek()
+        if char == "[":
+            return "array"
+        if char == "{":
+            return "object"
+        if not char:
+            raise self._error("Expecting value", self._pos)
+        return "value"
+
+    def value(self) -> Any:
+        """读取完整的顶层值"""
+        self._peek()
+        value = self._decode()
+        self._expect_end()
+        return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """逐个产出顶层数组的元素"""
+        if self._peek() != "[":
+            raise self._error("Expecting '['", self._pos)
+        self._pos += 1
+        if self._peek() == "]":
+            self._pos += 1
+        else:
+            while True:
+                self._peek()
+                yield self._decode()
+                char = self._peek()
+                self._pos += 1
+                if char == "]":
+                    break
+                if char != ",":
+                    raise self._error("Expecting ',' delimiter", self._pos - 1)
+        self._expect_end()
+
+    def iter_object(self) -> Iterator[Tuple[str, Any]]:
+        """逐个产出顶层对象的 (键, 值)，重复的键按出现顺序全部产出"""
+        if self._peek() != "{":
+            raise self._error("Expecting '{'", self._pos)
+        self._pos += 1
+        if self._peek() == "}":
+            self._pos += 1
+        else:
+            while True:
+                if self._peek() != '"':
+                    raise self._error("Expecting property name enclosed in double quotes", self._pos)
+                key = self._decode()
+                if self._peek() != ":":
+                    raise self._error("Expecting ':' delimiter", self._pos)
+                self._pos += 1
+                self._peek()
+                yield key, self._decode()
+                char = self._peek()
+                self._pos += 1
+                if char == "}":
+                    break
+                if char != ",":
+                    raise self._error("Expecting ',' delimiter", self._pos - 1)
+        self._expect_end()
@@ -1,14 +1,53 @@
 """
 PDF文件转换代理
 处理PDF到其他格式的转换，保留字体样式和颜色
+HTML和Markdown共用一次版面分析：analyze_pdf_layout遍历一遍页面，同时统计字号并提取带格式的文本片段，
+结果以紧凑结构（格式表+按页的文本块）按文件内容缓存，渲染时不再重复执行pdfminer版面分析
+页数较多时按页码区间分片，在进程池中并行分析，再按页序合并（字号统计为各分片直方图之和）；
+分片进程池以spawn方式创建，CPU核数按转换进程数平分，每个分片同样限制CPU时间，分片进程异常退出后重新创建进程池
+stream_pdf_to_*生成器逐页产出转换结果，供接口边转换边返回
 """
 
 import PyPDF2
+from pdfminer.converter import PDFPageAggregator, TextConverter
 from pdfminer.high_level import extract_pages, extract_text
 from pdfminer.layout import LAParams, LTTextContainer, LTChar, LTTextLine
-from typing import Dict, Any, List
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+from io import StringIO
+from concurrent.futures.process import BrokenProcessPool
+import concurrent.futures
+import hashlib
+import multiprocessing
 import os
 import re
+from Agents.FileConvertAgents.conversion_pool import limit_cpu_time
+from Agents.FileConvertAgents.document_model import md_emphasis
+from Configs.FileConvertConfig.convert_config_init import conversion_config
+
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.document_model",)
+
+# HTML、Markdown转换使用的版面分析参数
+LAYOUT_PARAMS = dict(
+    line_margin=0.5,
+    word_margin=0.1,
+    char_margin=2.0,
+    detect_vertical=True
+)
+# 版面分析结果缓存（按文件内容哈希），同一文件转换为多种格式时只分析一次
+_LAYOUT_CACHE_SIZE = 8
+_layout_cache = OrderedDict()
+# 页数达到该值且每个转换进程可分到多个CPU核时启用分页并行
+PARALLEL_MIN_PAGES = 64
+# 每个分片的最少页数，避免分片过碎
+SHARD_MIN_PAGES = 16
+_shard_pool = None
+_pool_config = conversion_config.get("pool", {})
+# 流式转换预扫描时最多保留的字符数：保留的页面直接做版面分析，超出部分的页面重新解析
+STREAM_RETAIN_MAX_CHARS = 200000
 
 
 # ==================== 工具函数（被转换函数调用） ====================
@@ -172,217 +211,553 @@ def format_text_to_html(item: Dict[str, Any]) -> str:
     return text
 
 
-# ==================== 转换函数（被 convert_run.py 调用） ====================
+# ==================== 版面分析（HTML、Markdown共用） ====================
 
-def convert_pdf_to_txt(input_path: str, output_path: str):
+def _file_digest(input_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(input_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def analyze_pdf_layout(input_path: str, page_numbers: Optional[List[int]] = None) -> Dict[str, Any]:
     """
-    将PDF转换为纯文本，保留段落结构
+    一次遍历完成版面分析：提取带格式的文本片段，同时统计字号
 
     Args:
-        input_path: 输入PDF文件路径
-        output_path: 输出TXT文件路径
+        input_path: PDF文件路径
+        page_numbers: 只分析指定页（从0开始），None表示全部页面
+
+    Returns:
+        {
+            "formats": 格式表（formats[0]为空格式）,
+            "pages": [[文本块]]，文本块为 [(文本, 格式下标)]，与get_text_formatting的结果一一对应,
+            "size_sum": 字符高度之和, "size_count": 字符数,
+            "size_histogram": {字号(保留1位小数): 字符数}
+        }
     """
-    try:
-        laparams = LAParams(
-            line_margin=0.5,
-            word_margin=0.1,
-            char_margin=2.0,
-            detect_vertical=True
-        )
+    layout = _empty_layout()
+    format_ids = {}
+    for page_layout in extract_pages(input_path, laparams=LAParams(**LAYOUT_PARAMS), page_numbers=page_numbers):
+        layout["pages"].append(_extract_page_blocks(page_layout, layout, format_ids))
+    return layout
 
-        text = extract_text(input_path, laparams=laparams)
 
-        # 智能清理文本，保留段落
-        paragraphs = []
-        current_paragraph = []
+def _empty_layout() -> Dict[str, Any]:
+    return {"formats": [{}], "pages": [], "size_sum": 0.0, "size_count": 0, "size_histogram": {}}
+
 
-        for line in text.splitlines():
-            line = line.strip()
-            if not line:
-                if current_paragraph:
-                    paragraphs.append(' '.join(current_paragraph))
-                    current_paragraph = []
+def _extract_page_blocks(page_layout, layout: Dict[str, Any], format_ids: Dict[tuple, int]) -> List[list]:
+    """提取单页的文本块；新出现的格式追加到layout的格式表，字号计入layout的统计"""
+    formats = layout["formats"]
+    size_histogram = layout["size_histogram"]
+    size_sum = layout["size_sum"]
+    size_count = layout["size_count"]
+    blocks = []
+
+    for element in page_layout:
+        if not isinstance(element, LTTextContainer):
+            continue
+        runs = []
+        for text_line in element:
+            if not isinstance(text_line, LTTextLine):
+                continue
+            current_format = None
+            current_text = ""
+            for char in text_line:
+                if isinstance(char, LTChar):
+                    height = char.height
+                    size_sum += height
+                    size_count += 1
+                    size = round(height, 1)
+                    size_histogram[size] = size_histogram.get(size, 0) + 1
+                    fontname = char.fontname
+                    char_format = (fontname, size, get_color_from_char(char), is_bold(fontname), is_italic(fontname))
+                    if current_format is not None and current_format != char_format:
+                        if current_text.strip():
+                            runs.append((current_text, current_format))
+                        current_text = char.get_text()
+                    else:
+                        current_text += char.get_text()
+                    current_format = char_format
+                else:
+                    current_text += char.get_text()
+            if current_text.strip():
+                runs.append((current_text, current_format))
+
+        if not runs:
+            continue
+        block = []
+        for text, char_format in runs:
+            if char_format is None:
+                format_id = 0
             else:
-                current_paragraph.append(line)
+                format_id = format_ids.get(char_format)
+                if format_id is None:
+                    format_id = format_ids[char_format] = len(formats)
+                    font, size, color, bold, italic = char_format
+                    formats.append({'font': font, 'size': size, 'color': color, 'bold': bold, 'italic': italic})
+            block.append((text, format_id))
+        blocks.append(block)
 
-        if current_paragraph:
-            paragraphs.append(' '.join(current_paragraph))
+    layout["size_sum"] = size_sum
+    layout["size_count"] = size_count
+    return blocks
 
-        cleaned_text = '\n\n'.join(paragraphs)
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(cleaned_text)
+def get_page_count(input_path: str) -> int:
+    """读取PDF页数（只解析页面树，不做版面分析）"""
+    with open(input_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
 
-    except Exception as e:
-        raise Exception(f"PDF转换为TXT失败: {str(e)}")
 
+def _shard_worker_count() -> int:
+    """每个转换进程的分片进程数：CPU核数按转换进程数平分，所有转换进程同时分片时进程总数不超过CPU核数"""
+    cpu_count = os.cpu_count() or 1
+    return max(1, cpu_count // (_pool_config.get("workers", 0) or cpu_count))
 
-def convert_pdf_to_html(input_path: str, output_path: str):
-    """
-    将PDF转换为HTML，保留字体样式和颜色
 
-    Args:
-        input_path: 输入PDF文件路径
-        output_path: 输出HTML文件路径
+def _get_shard_pool():
     """
-    try:
-        laparams = LAParams(
-            line_margin=0.5,
-            word_margin=0.1,
-            char_margin=2.0,
-            detect_vertical=True
+    分页并行使用的进程池，首次使用或进程池损坏后创建
+    使用spawn：转换进程中可能已加载.NET运行时（aspose.words）等不能安全fork的状态
+    """
+    global _shard_pool
+    if _shard_pool is None:
+        _shard_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=_shard_worker_count(), mp_context=multiprocessing.get_context("spawn")
         )
+    return _shard_pool
 
-        avg_font_size = calculate_average_font_size(input_path)
-        html_parts = []
 
-        for page_num, page_layout in enumerate(extract_pages(input_path, laparams=laparams), 1):
-            page_html = f'<div class="page" data-page="{page_num}">\n'
-
-            for element in page_layout:
-                if isinstance(element, LTTextContainer):
-                    formatted_texts = get_text_formatting(element)
-
-                    if not formatted_texts:
-                        continue
+def _shard_results(pool, futures) -> Iterator[Any]:
+    """按提交顺序产出分片结果；分片进程异常退出（如超出CPU时间限制）时丢弃进程池，下次使用时重新创建"""
+    global _shard_pool
+    try:
+        for future in futures:
+            yield future.result()
+    except BrokenProcessPool:
+        if pool is _shard_pool:
+            _shard_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+        raise Exception("分页并行转换的进程异常退出，可能超出CPU时间限制")
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _page_shards(page_count: int, workers: int) -> List[range]:
+    """将页码（从0开始）切分为连续区间，分片数约为进程数的2倍以平衡各页耗时差异"""
+    shard_count = max(1, min(workers * 2, page_count // SHARD_MIN_PAGES))
+    size = -(-page_count // shard_count)
+    return [range(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _should_parallelize(page_count: int) -> bool:
+    return page_count >= PARALLEL_MIN_PAGES and _shard_worker_count() > 1
+
+
+def _analyze_shard(input_path: str, start: int, stop: int) -> Dict[str, Any]:
+    # 分片进程常驻复用，每个分片在已用CPU时间基础上放宽限制（与转换进程相同）
+    limit_cpu_time(_pool_config.get("cpuSecondsLimit", 120))
+    return analyze_pdf_layout(input_path, page_numbers=list(range(start, stop)))
+
+
+def _merge_layout(layout: Dict[str, Any], format_ids: Dict[tuple, int], shard: Dict[str, Any]) -> List[list]:
+    """将一个分片的结果按页序并入layout（重新编号格式表，字号统计求和），返回该分片的页面"""
+    formats = layout["formats"]
+    remap = [0]
+    for format_info in shard["formats"][1:]:
+        key = tuple(format_info.values())
+        if key not in format_ids:
+            format_ids[key] = len(formats)
+            formats.append(format_info)
+        remap.append(format_ids[key])
+    pages = [[[(text, remap[format_id]) for text, format_id in block] for block in blocks] for blocks in shard["pages"]]
+    layout["pages"].extend(pages)
+    layout["size_sum"] += shard["size_sum"]
+    layout["size_count"] += shard["size_count"]
+    size_histogram = layout["size_histogram"]
+    for size, count in shard["size_histogram"].items():
+        size_histogram[size] = size_histogram.get(size, 0) + count
+    return pages
+
+
+def merge_layouts(layouts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """按页序合并各分片的版面分析结果"""
+    layout = _empty_layout()
+    format_ids = {}
+    for shard in layouts:
+        _merge_layout(layout, format_ids, shard)
+    return layout
+
+
+def analyze_pdf_layout_parallel(input_path: str, page_count: Optional[int] = None, pool=None) -> Dict[str, Any]:
+    """按页码区间分片并行执行版面分析，结果与analyze_pdf_layout一致"""
+    page_count = get_page_count(input_path) if page_count is None else page_count
+    pool = pool or _get_shard_pool()
+    shards = _page_shards(page_count, pool._max_workers)
+    futures = [pool.submit(_analyze_shard, input_path, shard.start, shard.stop) for shard in shards]
+    return merge_layouts(list(_shard_results(pool, futures)))
+
+
+def get_pdf_layout(input_path: str) -> Dict[str, Any]:
+    """获取PDF版面分析结果，同一文件内容只分析一次；页数较多时分页并行分析"""
+    key = _file_digest(input_path)
+    layout = _layout_cache.get(key)
+    if layout is None:
+        page_count = get_page_count(input_path)
+        if _should_parallelize(page_count):
+            layout = analyze_pdf_layout_parallel(input_path, page_count)
+        else:
+            layout = analyze_pdf_layout(input_path)
+        _cache_layout(key, layout)
+    else:
+        _layout_cache.move_to_end(key)
+    return layout
+
+
+def _cache_layout(key: str, layout: Dict[str, Any]):
+    _layout_cache[key] = layout
+    while len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+        _layout_cache.popitem(last=False)
+
+
+def _font_size_prepass(input_path: str, retain_max_chars: int) -> Tuple[float, int, int, list]:
+    """
+    只解释页面内容、不做版面分析，统计字号（流式输出前需先确定全文平均字号）
+    字符数不超过retain_max_chars的前若干页保留未分析的页面对象，之后可直接做版面分析而无需重新解释
 
-                    first_format = formatted_texts[0].get('format', {})
-                    heading_level = is_heading(first_format, avg_font_size)
+    Returns:
+        (字符高度之和, 字符数, 总页数, 保留的页面列表)
+    """
+    rsrcmgr = PDFResourceManager()
+    device = PDFPageAggregator(rsrcmgr, laparams=None)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    size_sum = 0.0
+    size_count = 0
+    page_count = 0
+    retained = []
+    retaining = retain_max_chars > 0
+
+    with open(input_path, 'rb') as fp:
+        for page in PDFPage.get_pages(fp):
+            interpreter.process_page(page)
+            page_layout = device.get_result()
+            page_count += 1
+            # 不做版面分析时文本字符直接位于页面下（图形内的字符不参与统计，与版面分析结果一致）
+            for item in page_layout:
+                if isinstance(item, LTChar):
+                    size_sum += item.height
+                    size_count += 1
+            if retaining and size_count <= retain_max_chars:
+                retained.append(page_layout)
+            else:
+                retaining = False
 
-                    if heading_level > 0:
-                        page_html += f'<h{heading_level}>'
-                        for item in formatted_texts:
-                            page_html += format_text_to_html(item)
-                        page_html += f'</h{heading_level}>\n'
-                    else:
-                        page_html += '<p>'
-                        for item in formatted_texts:
-                            page_html += format_text_to_html(item)
-                        page_html += '</p>\n'
+    return size_sum, size_count, page_count, retained
 
-            page_html += '</div>\n'
-            html_parts.append(page_html)
 
-        full_html = f"""<!DOCTYPE html>
+def _iter_layout_pages(input_path: str) -> Iterator[Tuple[list, List[Dict[str, Any]], float]]:
+    """
+    逐页产出 (文本块, 格式表, 平均字号)
+    版面分析结果已缓存时直接产出；否则先预扫描字号，再边分析边产出，全部产出后写入缓存
+    """
+    key = _file_digest(input_path)
+    layout = _layout_cache.get(key)
+    if layout is not None:
+        _layout_cache.move_to_end(key)
+        avg_font_size = layout_average_font_size(layout)
+        for blocks in layout["pages"]:
+            yield blocks, layout["formats"], avg_font_size
+        return
+
+    layout = _empty_layout()
+    format_ids = {}
+    page_count = get_page_count(input_path)
+
+    if _should_parallelize(page_count):
+        # 先提交各分片，进程池分析的同时本进程预扫描字号，再按页序产出已完成的分片
+        pool = _get_shard_pool()
+        futures = [pool.submit(_analyze_shard, input_path, shard.start, shard.stop)
+                   for shard in _page_shards(page_count, pool._max_workers)]
+        results = _shard_results(pool, futures)
+        try:
+            size_sum, size_count, _, _ = _font_size_prepass(input_path, 0)
+            avg_font_size = size_sum / size_count if size_count else 12.0
+            for shard in results:
+                for blocks in _merge_layout(layout, format_ids, shard):
+                    yield blocks, layout["formats"], avg_font_size
+        finally:
+            results.close()
+            for future in futures:
+                future.cancel()
+    else:
+        size_sum, size_count, page_count, retained = _font_size_prepass(input_path, STREAM_RETAIN_MAX_CHARS)
+        avg_font_size = size_sum / size_count if size_count else 12.0
+        laparams = LAParams(**LAYOUT_PARAMS)
+        retained_count = len(retained)
+        for index in range(retained_count):
+            page_layout, retained[index] = retained[index], None
+            page_layout.analyze(laparams)
+            blocks = _extract_page_blocks(page_layout, layout, format_ids)
+            layout["pages"].append(blocks)
+            yield blocks, layout["formats"], avg_font_size
+        if retained_count < page_count:
+            for page_layout in extract_pages(input_path, laparams=laparams, page_numbers=range(retained_count, page_count)):
+                blocks = _extract_page_blocks(page_layout, layout, format_ids)
+                layout["pages"].append(blocks)
+                yield blocks, layout["formats"], avg_font_size
+
+    _cache_layout(key, layout)
+
+
+def _iter_page_texts(input_path: str) -> Iterator[str]:
+    """逐页产出extract_text的结果（每页以换页符结尾）；页数较多时按分片并行提取，按页序产出"""
+    page_count = get_page_count(input_path)
+    if _should_parallelize(page_count):
+        pool = _get_shard_pool()
+        futures = [pool.submit(_extract_text_shard, input_path, shard.start, shard.stop)
+                   for shard in _page_shards(page_count, pool._max_workers)]
+        yield from _shard_results(pool, futures)
+        return
+
+    # 与extract_text相同的处理流程，每处理完一页取出该页文本
+    rsrcmgr = PDFResourceManager(caching=True)
+    with open(input_path, 'rb') as fp, StringIO() as output:
+        device = TextConverter(rsrcmgr, output, codec='utf-8', laparams=LAParams(**LAYOUT_PARAMS))
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for page in PDFPage.get_pages(fp, caching=True):
+            interpreter.process_page(page)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+
+
+def _collapse_blank_lines(chunks: Iterator[str]) -> Iterator[str]:
+    """流式版本的 re.sub(r'\n{3,}', '\n\n', text)：每段末尾的换行留到下一段一起处理，跨段的连续空行也能正确合并"""
+    pending = ''
+    for chunk in chunks:
+        chunk = pending + chunk
+        body = chunk.rstrip('\n')
+        pending = chunk[len(body):]
+        if body:
+            yield re.sub(r'\n{3,}', '\n\n', body)
+    if pending:
+        yield re.sub(r'\n{3,}', '\n\n', pending)
+
+
+def layout_average_font_size(layout: Dict[str, Any]) -> float:
+    """由版面分析的字号统计计算平均字体大小（与calculate_average_font_size结果一致）"""
+    return layout["size_sum"] / layout["size_count"] if layout["size_count"] else 12.0
+
+
+def render_page_html(blocks: List[list], formats: List[Dict[str, Any]], avg_font_size: float, page_num: int) -> str:
+    """将单页文本块渲染为HTML页面片段"""
+    page_html = [f'<div class="page" data-page="{page_num}">\n']
+    for block in blocks:
+        heading_level = is_heading(formats[block[0][1]], avg_font_size)
+        tag = f'h{heading_level}' if heading_level > 0 else 'p'
+        page_html.append(f'<{tag}>')
+        for text, format_id in block:
+            page_html.append(format_text_to_html({'text': text, 'format': formats[format_id]}))
+        page_html.append(f'</{tag}>\n')
+    page_html.append('</div>\n')
+    return ''.join(page_html)
+
+
+def render_layout_html(layout: Dict[str, Any]) -> str:
+    """将版面分析结果渲染为HTML页面片段"""
+    avg_font_size = layout_average_font_size(layout)
+    return ''.join(render_page_html(blocks, layout["formats"], avg_font_size, page_num)
+                   for page_num, blocks in enumerate(layout["pages"], 1))
+
+
+def render_page_md(blocks: List[list], formats: List[Dict[str, Any]], avg_font_size: float, page_num: int) -> str:
+    """将单页文本块渲染为Markdown（未合并连续空行）"""
+    md_content = []
+    if page_num > 1:
+        md_content.append('\n---\n')
+
+    for block in blocks:
+        heading_level = is_heading(formats[block[0][1]], avg_font_size)
+
+        text_parts = []
+        for text, format_id in block:
+            format_info = formats[format_id]
+            if format_info.get('bold', False) and format_info.get('italic', False):
+                text = md_emphasis(text, '***')
+            elif format_info.get('bold', False):
+                text = md_emphasis(text, '**')
+            elif format_info.get('italic', False):
+                text = md_emphasis(text, '*')
+            text_parts.append(text)
+
+        full_text = ''.join(text_parts).strip()
+        if not full_text:
+            continue
+
+        if heading_level > 0:
+            md_content.append(f'\n{"#" * heading_level} {full_text}\n')
+        else:
+            md_content.append(f'{full_text}\n')
+
+        md_content.append('\n')
+
+    return ''.join(md_content)
+
+
+def render_layout_md(layout: Dict[str, Any]) -> str:
+    """将版面分析结果渲染为Markdown"""
+    avg_font_size = layout_average_font_size(layout)
+    md_content = ''.join(render_page_md(blocks, layout["formats"], avg_font_size, page_num)
+                         for page_num, blocks in enumerate(layout["pages"], 1))
+    return re.sub(r'\n{3,}', '\n\n', md_content)
+
+
+# HTML输出的页面框架，页面内容位于两者之间
+_HTML_HEAD = """<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
     <title>Converted PDF Document</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             margin: 0;
             padding: 20px;
             background-color: #f5f5f5;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 900px;
             margin: 0 auto;
             background-color: white;
             padding: 40px;
             box-shadow: 0 0 10px rgba(0,0,0,0.1);
-        }}
-        .page {{
+        }
+        .page {
             margin-bottom: 40px;
             padding-bottom: 40px;
             border-bottom: 2px solid #eee;
-        }}
-        .page:last-child {{
+        }
+        .page:last-child {
             border-bottom: none;
-        }}
-        h1, h2, h3, h4, h5, h6 {{
+        }
+        h1, h2, h3, h4, h5, h6 {
             margin-top: 20px;
             margin-bottom: 10px;
             line-height: 1.3;
-        }}
-        p {{
+        }
+        p {
             margin: 10px 0;
             line-height: 1.6;
             text-align: justify;
-        }}
-        .bold {{
+        }
+        .bold {
             font-weight: bold;
-        }}
-        .italic {{
+        }
+        .italic {
             font-style: italic;
-        }}
+        }
     </style>
 </head>
 <body>
 <div class="container">
-{''.join(html_parts)}
+"""
+_HTML_TAIL = """
 </div>
 </body>
 </html>"""
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(full_html)
 
-    except Exception as e:
-        raise Exception(f"PDF转换为HTML失败: {str(e)}")
+# ==================== 转换函数（被 convert_run.py 调用） ====================
 
+def convert_pdf_to_txt(input_path: str, output_path: str):
+    """
+    将PDF转换为纯文本，保留段落结构
 
-def convert_pdf_to_md(input_path: str, output_path: str):
+    Args:
+        input_path: 输入PDF文件路径
+        output_path: 输出TXT文件路径
     """
-    将PDF转换为Markdown，保留基本格式
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for chunk in stream_pdf_to_txt(input_path):
+            f.write(chunk)
+
+
+def stream_pdf_to_txt(input_path: str) -> Iterator[str]:
+    """
+    流式将PDF转换为纯文本，逐页产出已完整的段落，拼接结果与convert_pdf_to_txt一致
 
     Args:
         input_path: 输入PDF文件路径
-        output_path: 输出MD文件路径
     """
     try:
-        laparams = LAParams(
-            line_margin=0.5,
-            word_margin=0.1,
-            char_margin=2.0,
-            detect_vertical=True
-        )
+        # 智能清理文本，保留段落（段落可跨页，未结束的段落留到后续页面）
+        current_paragraph = []
+        separator = ''
+
+        # 每页文本以换页符结尾，逐页splitlines与整体splitlines结果一致
+        for page_text in _iter_page_texts(input_path):
+            paragraphs = []
+            for line in page_text.splitlines():
+                line = line.strip()
+                if not line:
+                    if current_paragraph:
+                        paragraphs.append(' '.join(current_paragraph))
+                        current_paragraph = []
+                else:
+                    current_paragraph.append(line)
+            if paragraphs:
+                yield separator + '\n\n'.join(paragraphs)
+                separator = '\n\n'
 
-        avg_font_size = calculate_average_font_size(input_path)
-        md_content = []
+        if current_paragraph:
+            yield separator + ' '.join(current_paragraph)
 
-        for page_num, page_layout in enumerate(extract_pages(input_path, laparams=laparams), 1):
-            if page_num > 1:
-                md_content.append('\n---\n')
+    except Exception as e:
+        raise Exception(f"PDF转换为TXT失败: {str(e)}")
 
-            for element in page_layout:
-                if isinstance(element, LTTextContainer):
-                    formatted_texts = get_text_formatting(element)
 
-                    if not formatted_texts:
-                        continue
+def _extract_text_shard(input_path: str, start: int, stop: int) -> str:
+    limit_cpu_time(_pool_config.get("cpuSecondsLimit", 120))
+    return extract_text(input_path, laparams=LAParams(**LAYOUT_PARAMS), page_numbers=list(range(start, stop)))
 
-                    first_format = formatted_texts[0].get('format', {})
-                    heading_level = is_heading(first_format, avg_font_size)
 
-                    text_parts = []
-                    for item in formatted_texts:
-                        text = item.get('text', '')
-                        format_info = item.get('format', {})
+def convert_pdf_to_html(input_path: str, output_path: str):
+    """
+    将PDF转换为HTML，保留字体样式和颜色
 
-                        if format_info.get('bold', False) and format_info.get('italic', False):
-                            text = f'***{text}***'
-                        elif format_info.get('bold', False):
-                            text = f'**{text}**'
-                        elif format_info.get('italic', False):
-                            text = f'*{text}*'
+    Args:
+        input_path: 输入PDF文件路径
+        output_path: 输出HTML文件路径
+    """
+    try:
+        # 一次版面分析同时得到字号统计和格式化文本
+        layout = get_pdf_layout(input_path)
+        html_body = render_layout_html(layout)
 
-                        text_parts.append(text)
+        full_html = _HTML_HEAD + html_body + _HTML_TAIL
 
-                    full_text = ''.join(text_parts).strip()
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(full_html)
 
-                    if not full_text:
-                        continue
+    except Exception as e:
+        raise Exception(f"PDF转换为HTML失败: {str(e)}")
 
-                    if heading_level > 0:
-                        md_content.append(f'\n{"#" * heading_level} {full_text}\n')
-                    else:
-                        md_content.append(f'{full_text}\n')
 
-                    md_content.append('\n')
+def convert_pdf_to_md(input_path: str, output_path: str):
+    """
+    将PDF转换为Markdown，保留基本格式
 
-        final_content = ''.join(md_content)
-        final_content = re.sub(r'\n{3,}', '\n\n', final_content)
+    Args:
+        input_path: 输入PDF文件路径
+        output_path: 输出MD文件路径
+    """
+    try:
+        # 一次版面分析同时得到字号统计和格式化文本
+        final_content = render_layout_md(get_pdf_layout(input_path))
 
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(final_content)
@@ -391,6 +766,41 @@ def convert_pdf_to_md(input_path: str, output_path: str):
         raise Exception(f"PDF转换为Markdown失败: {str(e)}")
 
 
+def stream_pdf_to_html(input_path: str) -> Iterator[str]:
+    """
+    流式将PDF转换为HTML，逐页产出，拼接结果与convert_pdf_to_html一致
+
+    Args:
+        input_path: 输入PDF文件路径
+    """
+    try:
+        # 页面框架随第一页一起产出，转换失败时不会先返回残缺的页面
+        prefix = _HTML_HEAD
+        for page_num, (blocks, formats, avg_font_size) in enumerate(_iter_layout_pages(input_path), 1):
+            yield prefix + render_page_html(blocks, formats, avg_font_size, page_num)
+            prefix = ''
+        yield prefix + _HTML_TAIL
+
+    except Exception as e:
+        raise Exception(f"PDF转换为HTML失败: {str(e)}")
+
+
+def stream_pdf_to_md(input_path: str) -> Iterator[str]:
+    """
+    流式将PDF转换为Markdown，逐页产出，拼接结果与convert_pdf_to_md一致
+
+    Args:
+        input_path: 输入PDF文件路径
+    """
+    try:
+        pages = (render_page_md(blocks, formats, avg_font_size, page_num)
+                 for page_num, (blocks, formats, avg_font_size) in enumerate(_iter_layout_pages(input_path), 1))
+        yield from _collapse_blank_lines(pages)
+
+    except Exception as e:
+        raise Exception(f"PDF转换为Markdown失败: {str(e)}")
+
+
 # ==================== 辅助功能函数（可选，供其他模块调用） ====================
 
 def get_pdf_info(input_path: str) -> Dict[str, Any]:
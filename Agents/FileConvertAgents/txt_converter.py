@@ -1,30 +1,38 @@
 """
 纯文本文件转换代理
 处理TXT到其他格式的转换
+TXT按空行分段解析为统一文档模型（build_document），再渲染为目标格式
 """
 
+import re
 
+from Agents.FileConvertAgents import document_model
 
-def convert_txt_to_md(input_path: str, output_path: str):
-    """将纯文本转换为Markdown"""
-    with open(input_path, 'r', encoding='utf-8') as f:
-        txt_content = f.read()
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.FileConvertAgents.document_model",)
 
-    # 简单处理，将文本包装在Markdown中
-    md_content = txt_content
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(md_content)
+def build_document(input_path: str) -> document_model.Document:
+    """将纯文本文件解析为统一文档模型"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        return parse_document(f.read())
 
 
-def convert_txt_to_html(input_path: str, output_path: str):
-    """将纯文本转换为HTML"""
-    with open(input_path, 'r', encoding='utf-8') as f:
-        txt_content = f.read()
+def parse_document(txt_content: str) -> document_model.Document:
+    """将纯文本解析为统一文档模型，空行分隔段落，段内换行保留"""
+    blocks = []
+    for paragraph in re.split(r'\n[ \t]*\n', txt_content):
+        paragraph = paragraph.strip('\n')
+        if paragraph.strip():
+            blocks.append(document_model.Paragraph([document_model.Run(paragraph)]))
+    return document_model.Document(blocks)
+
 
-    # 简单处理，将文本包装在HTML中
-    html_content = f"<html><body><pre>{txt_content}</pre></body></html>"
+def convert_txt_to_md(input_path: str, output_path: str):
+    """将纯文本转换为Markdown"""
+    document_model.write_document(build_document(input_path), ".md", output_path)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
 
+def convert_txt_to_html(input_path: str, output_path: str):
+    """将纯文本转换为HTML"""
+    document_model.write_document(build_document(input_path), ".html", output_path)
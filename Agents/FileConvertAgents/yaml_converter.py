@@ -1,28 +1,50 @@
 """
 YAML文件转换代理
 处理YAML到其他格式的转换
+读取（load_data、parse_data）与生成目标格式（dump_yaml_to_*）分开，转换链中可直接处理内存中的YAML文本
+解析、序列化使用serialization模块（安装了libyaml、orjson时使用加速实现）
 """
 
-import yaml
-import json
+from typing import Any
+
+from Agents.serialization import json_dump, json_dumps, yaml_dump, yaml_load
+
+# 影响转换结果的其他模块，其源码计入转换缓存的版本（conversion_cache.converter_version）
+CACHE_DEPENDENCIES = ("Agents.serialization",)
+
+
+def load_data(input_path: str) -> Any:
+    """读取YAML文件"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        return yaml_load(f.read())
+
+
+def parse_data(yaml_content: str) -> Any:
+    """解析YAML文本（转换链中上一步在内存中的输出）"""
+    return yaml_load(yaml_content)
 
 
 def convert_yaml_to_json(input_path: str, output_path: str):
     """将YAML转换为JSON"""
-    with open(input_path, 'r', encoding='utf-8') as f:
-        yaml_data = yaml.safe_load(f)
+    json_dump(load_data(input_path), output_path, pretty=True)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(yaml_data, f, indent=2, ensure_ascii=False)
+
+def dump_yaml_to_json(yaml_data: Any) -> str:
+    return json_dumps(yaml_data, pretty=True)
 
 
 def convert_yaml_to_txt(input_path: str, output_path: str):
     """将YAML转换为纯文本"""
-    with open(input_path, 'r', encoding='utf-8') as f:
-        yaml_data = yaml.safe_load(f)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(dump_yaml_to_txt(load_data(input_path)))
 
-    txt_content = yaml.dump(yaml_data, allow_unicode=True, default_flow_style=False)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(txt_content)
+def dump_yaml_to_txt(yaml_data: Any) -> str:
+    return yaml_dump(yaml_data, allow_unicode=True, default_flow_style=False)
+
 
+# .yml与.yaml使用相同的转换
+convert_yml_to_json = convert_yaml_to_json
+convert_yml_to_txt = convert_yaml_to_txt
+dump_yml_to_json = dump_yaml_to_json
+dump_yml_to_txt = dump_yaml_to_txt
@@ -0,0 +1,169 @@
+"""
+批量文件审核
+1.文档提取（python-docx解析、样式提取、分块）在常驻进程池中并行执行，进程启动时预先导入解析库；
+  提取进程异常退出时丢弃进程池，下次批量审核时重新创建
+2.批内所有文件的语法审核请求共享同一个并发额度，避免多个文件同时审核时超出大模型限流
+3.每个文件审核完成即以NDJSON产出结果，最后产出汇总报告（含每分钟处理文档数）
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from Agents.FileReviewAgents.agent_run_f import extract_review_content, plan_grammar_blocks, start_local_checks, check_grammar_block, save_result, save_review_snapshot, _ndjson
+from Agents.FileReviewAgents.agent_format import group_format_violations
+from Models.FileReviewModels.ApiModels.file_review_api_models import FileReviewResult
+
+logger = logging.getLogger("file_review")
+
+# 文档提取进程池，首次批量审核时创建，服务关闭时释放
+_extraction_pool = None
+_extraction_workers = 0
+
+
+def _warm_up_worker():
+    """进程启动时预先导入解析库，避免第一个文档承担导入耗时"""
+    import docx  # noqa: F401
+    try:
+        import aspose.words  # noqa: F401
+    except Exception as e:
+        logger.warning(f"Failed to preload aspose.words in extraction worker: {e}")
+
+
+def _get_extraction_pool(workers=0):
+    """获取常驻的文档提取进程池；进程数配置变化时重建"""
+    global _extraction_pool, _extraction_workers
+    workers = workers or os.cpu_count()
+    if _extraction_pool is None or _extraction_workers != workers:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False)
+        _extraction_pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_warm_up_worker)
+        _extraction_workers = workers
+    return _extraction_pool
+
+
+def shutdown_extraction_pool():
+    """关闭文档提取进程池（服务关闭时调用）"""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(cancel_futures=True)
+        _extraction_pool = None
+
+
+async def _extract(pool, file_path):
+    """在提取进程池中解析文档；提取进程异常退出（如内存不足被终止）时丢弃进程池，下次批量审核时重新创建"""
+    global _extraction_pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, extract_review_content, file_path)
+    except BrokenProcessPool:
+        if pool is _extraction_pool:
+            _extraction_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+        raise Exception("文档提取进程异常退出，可能内存不足或文档已损坏")
+
+
+async def _review_one(item, result_path, pool, semaphore, term_bank_path, client, model_name, format_standards, chunking, prefilter, review_id):
+    """审核批内单个文件，返回(FileReviewResult, 耗时)"""
+    start = time.perf_counter()
+    content = await _extract(pool, item["file_path"])
+    # 分块规划依赖本进程内的限流余量和已审核段落，放在主进程执行
+    planned = plan_grammar_blocks(content["text"], model_name, chunking, prefilter)
+
+    grammar_task = asyncio.gather(*[
+        check_grammar_block(block, client, model_name, semaphore) for block in planned["grammar_blocks"]
+    ])
+    term_task, format_task = start_local_checks(content["text_blocks"], content["blocks"], term_bank_path, format_standards)
+    grammar_results, term_errors, format_violations = await asyncio.gather(grammar_task, term_task, format_task)
+
+    result = FileReviewResult(
+        review_id=review_id,
+        grammar_errors=planned["local_grammar_errors"] + [error for block_errors in grammar_results for error in block_errors],
+        term_errors=term_errors,
+        format_errors=group_format_violations(format_violations),
+        chunk_report=planned["chunk_report"],
+        prefilter_report=planned["prefilter_report"]
+    )
+    save_result(result, result_path)
+    save_review_snapshot(review_id, content, planned, grammar_results, term_errors, format_violations, result_path)
+    return result, time.perf_counter() - start
+
+
+async def agent_batch_review_stream(files, result_paths, term_bank_path, client, model_name, format_standards, chunking=None, prefilter=None, batch=None, batch_id=None):
+    """
+    批量审核，逐条产出NDJSON记录:
+        {"type": "file_result", "index": i, "name": 文件名, "review_id", "elapsed_seconds", "result": {...}}  每个文件完成时产出
+        {"type": "file_error", "index": i, "name": 文件名, "detail": 错误信息}
+        {"type": "batch_summary", ...}  最后一条，包含各文件错误数、合计、总耗时和每分钟处理文档数
+
+    Args:
+        files: create_batch_job返回的文件列表
+        result_paths: 与files一一对应的结果文件路径
+        batch: 批量审核配置（BatchConfig）
+        batch_id: 批量任务ID，单个文件的review_id为 {batch_id}_{序号}
+    """
+    logger.info(f"Starting batch review: {len(files)} files")
+    start = time.perf_counter()
+    pool = _get_extraction_pool(batch.extraction_workers if batch else 0)
+    semaphore = asyncio.Semaphore(batch.max_concurrent_requests if batch else 8)
+
+    async def indexed_review(index, item):
+        try:
+            return index, await _review_one(
+                item, result_paths[index], pool, semaphore, term_bank_path, client, model_name,
+                format_standards, chunking, prefilter, f"{batch_id}_{index}"
+            ), None
+        except Exception as e:
+            logger.error(f"Batch review failed for {item['name']}: {e}", exc_info=True)
+            return index, None, str(e)
+
+    tasks = [asyncio.create_task(indexed_review(index, item)) for index, item in enumerate(files)]
+    documents = []
+    totals = {"grammar_error_count": 0, "term_error_count": 0, "format_error_count": 0, "llm_calls": 0}
+    try:
+        for finished in asyncio.as_completed(tasks):
+            index, reviewed, error = await finished
+            name = files[index]["name"]
+            if reviewed is None:
+                documents.append({"index": index, "name": name, "status": "failed", "detail": error})
+                yield _ndjson({"type": "file_error", "index": index, "name": name, "detail": error})
+                continue
+
+            result, elapsed = reviewed
+            counts = {
+                "grammar_error_count": len(result.grammar_errors),
+                "term_error_count": len(result.term_errors),
+                "format_error_count": len(result.format_errors),
+                "llm_calls": result.prefilter_report.llm_calls if result.prefilter_report else 0
+            }
+            for key, value in counts.items():
+                totals[key] += value
+            documents.append({"index": index, "name": name, "status": "succeeded", "elapsed_seconds": round(elapsed, 3), **counts})
+            yield _ndjson({
+                "type": "file_result",
+                "index": index,
+                "name": name,
+                "review_id": result.review_id,
+                "elapsed_seconds": round(elapsed, 3),
+                "result": result.model_dump()
+            })
+    finally:
+        # 客户端中途断开时取消尚未完成的文件
+        for task in tasks:
+            task.cancel()
+
+    elapsed = time.perf_counter() - start
+    succeeded = sum(1 for document in documents if document["status"] == "succeeded")
+    logger.info(f"Batch review completed: {succeeded}/{len(files)} files in {elapsed:.2f}s")
+    yield _ndjson({
+        "type": "batch_summary",
+        "batch_id": batch_id,
+        "file_count": len(files),
+        "succeeded": succeeded,
+        "failed": len(files) - succeeded,
+        "totals": totals,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_minute": round(succeeded / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "documents": sorted(documents, key=lambda document: document["index"])
+    })
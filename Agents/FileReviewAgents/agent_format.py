@@ -1,14 +1,31 @@
 """
 对docx文件的字体、字体大小、字体颜色按不同标准（标题 1\2\3，正文）进行审核
 格式审核不设计外部API调用，保留同步逻辑，不使用异步处理
+1.compile_format_standards:将格式标准预编译为FormatRule，每份配置只需解析一次
+2.find_format_violations:合并同一段落内相邻同样式run后按样式签名检查，返回未聚合的违规列表
+3.group_format_violations:同类错误聚合为一条并记录次数和位置
+4.check_format_errors:find_format_violations + group_format_violations
 """
 import ast
+from functools import lru_cache
+from typing import NamedTuple, FrozenSet, Tuple
 from Models.FileReviewModels.DomainModels.file_review_domain_models import FormatError
 
-def determine_section_type(style_item):
-    """根据格式特征判断段落类型"""
-    # 优先使用段落样式判断
-    style_name = style_item.get("style_name", "")
+
+class FormatRule(NamedTuple):
+    """预编译的格式标准"""
+    section_type: str
+    allowed_fonts: FrozenSet[str]
+    allowed_fonts_text: str
+    font_size: float
+    font_color: Tuple[int, ...]
+    font_color_hex: str
+
+
+@lru_cache(maxsize=256)
+def determine_section_type(style_name):
+    """根据段落样式名判断段落类型（结果按样式名缓存）"""
+    style_name = style_name or ""
     # 匹配常见标题样式命名规则
     if 'Heading 1' in style_name or '标题 1' in style_name:
         return 'Heading 1'
@@ -22,53 +39,127 @@ def determine_section_type(style_item):
         return '正文'
 
 
-def check_format_errors(blocks, format_standards):
-    """检查格式规范"""
-    format_errors = []
+def compile_format_standards(format_standards):
+    """将格式标准字典编译为 {段落类型: FormatRule}，已编译的直接返回"""
+    compiled = {}
+    for section_type, standard in format_standards.items():
+        if isinstance(standard, FormatRule):
+            compiled[section_type] = standard
+            continue
+        allowed_fonts = standard["allowed_fonts"]
+        if isinstance(allowed_fonts, str):
+            allowed_fonts = [allowed_fonts]
+        font_color = tuple(ast.literal_eval(standard["font_color"]))
+        compiled[section_type] = FormatRule(
+            section_type=section_type,
+            allowed_fonts=frozenset(allowed_fonts),
+            allowed_fonts_text="、".join(allowed_fonts),
+            font_size=standard["font_size"],
+            font_color=font_color,
+            font_color_hex=rgb_to_hex(font_color)
+        )
+    return compiled
+
+
+def _coalesce_runs(blocks):
+    """
+    将同一段落内相邻且样式签名相同的run合并为一段
 
+    Returns:
+        [(样式签名, 首个run序号, 合并run数, 首个run文本, 段落序号)] 列表，run序号从0开始
+    """
+    segments = []
+    run_index = 0
     for block in blocks:
         for style in block["styles"]:
-            # 确定当前段落类型
-            section_type = determine_section_type(style)
-            standard = format_standards[section_type]
-            
-            # 检查字体
-            if style.get("font_name") and style["font_name"] not in standard["allowed_fonts"]:
-                # noinspection PyArgumentList
-                format_errors.append(FormatError(
-                    type_of_error=f"{section_type}字体异常",
-                    current_value=style["font_name"],
-                    expected_value=standard["allowed_fonts"],
-                    text_snippet=style["text"][:50]  # 截取片段
-                ))
-
-            # 检查字号
-            if style.get("font_size") and style["font_size"] != standard["font_size"]:
-                # noinspection PyArgumentList
-                format_errors.append(FormatError(
-                    type_of_error=f"{section_type}字体大小异常",
-                    current_value=f"{style['font_size']}pt",
-                    expected_value=f"{standard['font_size']}pt",
-                    text_snippet=style["text"][:50]  # 截取片段
-                ))
-
-            # 检查字体颜色
-            if isinstance(style.get("font_color"), tuple) and style["font_color"] != ast.literal_eval(standard["font_color"]):
-                # noinspection PyArgumentList
-                format_errors.append(FormatError(
-                    type_of_error=f"{section_type}字体颜色异常",
-                    current_value=rgb_to_hex(style["font_color"]),
-                    expected_value=rgb_to_hex(ast.literal_eval(standard["font_color"])),
-                    text_snippet=style["text"][:50]
-                ))
-
-    print(f"格式检查完成，找到 {len(format_errors)} 个错误")
+            font_color = style.get("font_color")
+            signature = (
+                determine_section_type(style.get("style_name")),
+                style.get("font_name"),
+                style.get("font_size"),
+                tuple(font_color) if isinstance(font_color, (tuple, list)) else None
+            )
+            paragraph_index = style.get("paragraph_index")
+            if segments and segments[-1][0] == signature and segments[-1][4] == paragraph_index:
+                segments[-1][2] += 1
+            else:
+                segments.append([signature, run_index, 1, style["text"], paragraph_index])
+            run_index += 1
+    return segments
+
+
+def _check_signature(signature, rules):
+    """检查单个样式签名，返回 [(错误类型, 当前值, 规定值)]"""
+    section_type, font_name, font_size, font_color = signature
+    rule = rules[section_type]
+    violations = []
+
+    # 检查字体
+    if font_name and font_name not in rule.allowed_fonts:
+        violations.append((f"{section_type}字体异常", font_name, rule.allowed_fonts_text))
+
+    # 检查字号
+    if font_size and font_size != rule.font_size:
+        violations.append((f"{section_type}字体大小异常", f"{font_size}pt", f"{rule.font_size}pt"))
+
+    # 检查字体颜色
+    if font_color is not None and font_color != rule.font_color:
+        violations.append((f"{section_type}字体颜色异常", rgb_to_hex(font_color), rule.font_color_hex))
+
+    return violations
+
+
+def find_format_violations(blocks, format_standards):
+    """
+    检查格式规范，返回未聚合的违规列表
+
+    Returns:
+        [(错误类型, 当前值, 规定值, 片段文本, 首个run序号, run数)]，按run序号排列
+    """
+    rules = compile_format_standards(format_standards)
+    # 每种样式签名只检查一次
+    signature_violations = {}
+    violations = []
+    for signature, first_run, run_count, text, _ in _coalesce_runs(blocks):
+        if signature not in signature_violations:
+            signature_violations[signature] = _check_signature(signature, rules)
+        for type_of_error, current_value, expected_value in signature_violations[signature]:
+            violations.append((type_of_error, current_value, expected_value, text[:50], first_run, run_count))  # 截取片段
+    return violations
+
+
+def group_format_violations(violations):
+    """同类错误（错误类型+当前值）聚合为一条FormatError，记录run总数和各片段位置"""
+    # {key: [规定值, 首个片段, run总数, 位置列表]}
+    grouped = {}
+    for type_of_error, current_value, expected_value, text_snippet, first_run, run_count in violations:
+        key = (type_of_error, current_value)
+        if key not in grouped:
+            grouped[key] = [expected_value, text_snippet, 0, []]
+        grouped[key][2] += run_count
+        grouped[key][3].append(first_run)
+
+    format_errors = []
+    for (type_of_error, current_value), (expected_value, text_snippet, occurrences, locations) in grouped.items():
+        # noinspection PyArgumentList
+        format_errors.append(FormatError(
+            type_of_error=type_of_error,
+            current_value=current_value,
+            expected_value=expected_value,
+            text_snippet=text_snippet,
+            occurrences=occurrences,
+            locations=locations
+        ))
+
+    print(f"格式检查完成，{len(violations)} 处违规聚合为 {len(format_errors)} 类错误")
     return format_errors
 
 
+def check_format_errors(blocks, format_standards):
+    """检查格式规范"""
+    return group_format_violations(find_format_violations(blocks, format_standards))
+
+
 def rgb_to_hex(rgb):
     """将RGB元组转换为十六进制"""
     return "#{:02x}{:02x}{:02x}".format(*rgb[:3]) # 只取前三个通道
-
-
-
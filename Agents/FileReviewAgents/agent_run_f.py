@@ -3,68 +3,328 @@
      agent_语法审核
      agent_术语审核
      agent_格式审核
+agent_file_review_run:全部审核完成后一次性返回结果
+agent_file_review_stream:以NDJSON记录流式返回，术语、格式结果先行，语法结果按块陆续返回
+每次审核同时保存按段落的审核快照；传入基线快照时只审核新增或修改的段落，其余段落沿用基线结果
 """
 import os
-import json
 import logging
 from Agents.FileReviewAgents.content_extraction import extract_docx_styles
-from Agents.FileReviewAgents.text_segmentation import split_into_blocks,split_into_textblocks
-from Agents.FileReviewAgents.agent_syntax import check_grammar_errors
+from Agents.FileReviewAgents.text_segmentation import split_into_blocks,split_paragraphs_into_textblocks,split_into_token_blocks,estimate_tokens,choose_block_tokens,build_chunk_report
+from Agents.FileReviewAgents.agent_syntax import check_block_grammar,get_remaining_tokens,GRAMMAR_SYSTEM_PROMPT,GRAMMAR_PROMPT_VERSION
 from Agents.FileReviewAgents.agent_terminology import check_term_errors
-from Agents.FileReviewAgents.agent_format import check_format_errors
+from Agents.FileReviewAgents.agent_format import find_format_violations, group_format_violations
+from Agents.FileReviewAgents.grammar_prefilter import prefilter_paragraphs, mark_approved
+from Agents.FileReviewAgents.result_encoding import encode_compact
+from Agents.serialization import json_dump, json_dumps
+from Agents.FileReviewAgents.review_snapshot import (paragraph_key, group_format_units, collect_paragraph_results, collect_unit_results,
+                                                     assemble_errors, build_snapshot, save_snapshot)
 from Models.FileReviewModels.ApiModels.file_review_api_models import FileReviewResult
+from Models.FileReviewModels.DomainModels.file_review_domain_models import ChunkingConfig, PrefilterConfig
 from docx import Document
 import asyncio
 import functools
 
 logger = logging.getLogger("file_review")
 
-async def agent_file_review_run(file_path,term_bank_path,file_review_result_path,client,model_name,format_standards):
+
+def extract_review_content(file_path):
+    """
+    提取docx内容并生成格式审核块、术语审核块（纯CPU操作，可在进程池中执行）
+
+    Returns:
+        {"text": 全文, "paragraphs": 非空段落, "blocks": 格式审核块, "text_blocks": 术语审核块, "block_paragraphs": 术语审核块所属段落}
+    """
+    logger.debug("Processing DOCX file")
+    doc=Document(file_path)
+    text = '\n'.join([para.text for para in doc.paragraphs])
+    styled_content = extract_docx_styles(file_path)
+    # 分块处理
+    logger.info("Chunk the text...")
+    print("正在对文本分块处理...")
+    blocks = split_into_blocks(styled_content, 50)
+    # 术语审核不调用大模型，保留按句子的短块，便于定位错误语句；文本块不跨段落，结果可按段落复用
+    paragraphs = [para.strip() for para in text.split('\n') if para.strip()]
+    text_blocks, block_paragraphs = split_paragraphs_into_textblocks(paragraphs, max_length=50)
+    return {"text": text, "paragraphs": paragraphs, "blocks": blocks, "text_blocks": text_blocks, "block_paragraphs": block_paragraphs}
+
+
+def plan_grammar_blocks(text, model_name, chunking, prefilter):
+    """
+    本地预检后按token预算生成语法审核块
+
+    Returns:
+        {"grammar_blocks": 语法审核块, "local_grammar_errors": 本地预检发现的语法错误, "chunk_report", "prefilter_report"}
+    """
+    # 语法审核按token预算分块，块大小由模型上下文和当前限流余量决定
+    chunking = chunking or ChunkingConfig()
+    prompt_tokens = estimate_tokens(GRAMMAR_SYSTEM_PROMPT)
+    block_tokens = choose_block_tokens(chunking, prompt_tokens, get_remaining_tokens(model_name))
+    # 本地预检：跳过无需大模型审核的段落，机械性错误直接在本地给出
+    paragraphs = [para.strip() for para in text.split('\n') if para.strip()]
+    kept_paragraphs, local_grammar_errors, prefilter_report = prefilter_paragraphs(
+        paragraphs, prefilter or PrefilterConfig(), model_name, GRAMMAR_PROMPT_VERSION
+    )
+    grammar_blocks = split_into_token_blocks('\n'.join(kept_paragraphs), max_tokens=block_tokens)
+    llm_calls_without_prefilter = len(split_into_token_blocks(text, max_tokens=block_tokens))
+    prefilter_report["llm_calls"] = len(grammar_blocks)
+    prefilter_report["llm_calls_without_prefilter"] = llm_calls_without_prefilter
+    prefilter_report["avoided_ratio"] = round(1 - len(grammar_blocks) / llm_calls_without_prefilter, 4) if llm_calls_without_prefilter else 0.0
+    chunk_report = build_chunk_report(grammar_blocks, prompt_tokens, block_tokens)
+    logger.info(f"Block finish: {chunk_report}, prefilter: {prefilter_report}")
+    return {
+        "grammar_blocks": grammar_blocks,
+        "local_grammar_errors": local_grammar_errors,
+        "chunk_report": chunk_report,
+        "prefilter_report": prefilter_report
+    }
+
+
+def start_local_checks(text_blocks, blocks, term_bank_path, format_standards):
+    """术语和格式检查保持同步，放入线程池执行；格式检查返回未聚合的违规列表，由调用方聚合"""
+    loop = asyncio.get_event_loop()
+    term_task = loop.run_in_executor(
+        None,
+        functools.partial(check_term_errors, text_blocks, term_bank_path)
+    )
+    format_task = loop.run_in_executor(
+        None,
+        functools.partial(find_format_violations, blocks, format_standards)
+    )
+    return term_task, format_task
+
+
+async def check_grammar_block(text_block, client, model_name, semaphore=None):
+    """检查单个语法块；大模型确认无错误的段落记为已审核通过，失败时返回空列表。传入semaphore时与其他任务共享并发额度"""
+    if semaphore is not None:
+        async with semaphore:
+            block_errors = await check_block_grammar(text_block, client, model_name)
+    else:
+        block_errors = await check_block_grammar(text_block, client, model_name)
+    if block_errors is None:
+        return []
+    if not block_errors:
+        mark_approved(text_block.split('\n'), model_name, GRAMMAR_PROMPT_VERSION)
+    return block_errors
+
+
+def save_result(errors, file_review_result_path):
+    """保存审核结果"""
+    json_dump(errors.model_dump(), file_review_result_path, pretty=True)
+    print(f"文件审核结果已保存到：{file_review_result_path}")
+    logger.info(f"File review completed. Results saved to: {file_review_result_path}")
+
+
+def save_review_snapshot(review_id, content, planned, grammar_results, term_errors, format_violations, file_review_result_path):
+    """将本次全量审核的结果按段落归属后保存为快照，供后续修订版本增量审核"""
+    paragraph_results, _ = collect_paragraph_results(
+        content["paragraphs"], planned["grammar_blocks"], grammar_results, planned["local_grammar_errors"],
+        content["text_blocks"], content["block_paragraphs"], term_errors
+    )
+    unit_results = collect_unit_results(group_format_units(content["blocks"]), format_violations)
+    save_snapshot(build_snapshot(review_id, paragraph_results, unit_results), file_review_result_path)
+
+
+def _check_format_units(units, format_standards):
+    """逐段落检查格式，返回 {段落格式哈希: [段内相对位置的违规]}"""
+    return collect_unit_results(units, [
+        violation for unit in units
+        for violation in _shift_violations(find_format_violations([{"styles": unit["runs"]}], format_standards), unit["offset"])
+    ])
+
+
+def _shift_violations(violations, offset):
+    return [(*violation[:4], violation[4] + offset, violation[5]) for violation in violations]
+
+
+async def _review_incremental(content, baseline, term_bank_path, client, model_name, format_standards, chunking, prefilter, review_id, semaphore=None):
+    """
+    增量审核：段落内容哈希不在基线快照中的段落（新增或修改）重新执行语法、术语审核，
+    段落格式哈希不在基线中的段落重新执行格式审核，其余沿用基线结果并换算为新文档中的位置
+
+    Returns:
+        (FileReviewResult, 新快照)
+    """
+    paragraphs = content["paragraphs"]
+    keys = [paragraph_key(paragraph) for paragraph in paragraphs]
+    baseline_paragraphs = baseline["paragraphs"]
+    baseline_units = baseline["format_units"]
+
+    # 相同内容的段落只审核一次
+    changed = list(dict.fromkeys(paragraph for paragraph, key in zip(paragraphs, keys) if key not in baseline_paragraphs))
+    units = group_format_units(content["blocks"])
+    changed_units = list({unit["key"]: unit for unit in units if unit["key"] not in baseline_units}.values())
+    logger.info(f"Incremental review against {baseline['review_id']}: {len(changed)}/{len(paragraphs)} paragraphs, "
+                f"{len(changed_units)}/{len(units)} format units to review")
+
+    planned = plan_grammar_blocks('\n'.join(changed), model_name, chunking, prefilter)
+    changed_text_blocks, changed_block_paragraphs = split_paragraphs_into_textblocks(changed, max_length=50)
+    loop = asyncio.get_event_loop()
+    grammar_task = asyncio.gather(*[
+        check_grammar_block(block, client, model_name, semaphore) for block in planned["grammar_blocks"]
+    ])
+    term_task = loop.run_in_executor(None, functools.partial(check_term_errors, changed_text_blocks, term_bank_path))
+    format_task = loop.run_in_executor(None, functools.partial(_check_format_units, changed_units, format_standards))
+    grammar_results, term_errors, changed_unit_results = await asyncio.gather(grammar_task, term_task, format_task)
+
+    paragraph_results = {key: baseline_paragraphs[key] for key in keys if key in baseline_paragraphs}
+    changed_results, unattributed = collect_paragraph_results(
+        changed, planned["grammar_blocks"], grammar_results, planned["local_grammar_errors"],
+        changed_text_blocks, changed_block_paragraphs, term_errors
+    )
+    paragraph_results.update(changed_results)
+    unit_results = {unit["key"]: baseline_units[unit["key"]] for unit in units if unit["key"] in baseline_units}
+    unit_results.update(changed_unit_results)
+
+    grammar_errors, term_errors, format_violations = assemble_errors(
+        paragraphs, content["text_blocks"], content["block_paragraphs"], units, paragraph_results, unit_results
+    )
+    # 无法归属到段落的错误不在快照中，直接输出
+    grammar_errors.extend(unattributed)
+    total_chars = sum(len(paragraph) for paragraph in paragraphs)
+    reviewed_chars = sum(len(paragraph) for paragraph in changed)
+    result = FileReviewResult(
+        review_id=review_id,
+        grammar_errors=grammar_errors,
+        term_errors=term_errors,
+        format_errors=group_format_violations(format_violations),
+        chunk_report=planned["chunk_report"],
+        prefilter_report=planned["prefilter_report"],
+        incremental_report={
+            "baseline_review_id": baseline["review_id"],
+            "paragraph_count": len(paragraphs),
+            "reviewed_paragraphs": len(changed),
+            "reused_paragraphs": sum(1 for key in keys if key in baseline_paragraphs),
+            "removed_paragraphs": len(set(baseline_paragraphs) - set(keys)),
+            "format_unit_count": len(units),
+            "reviewed_format_units": len(changed_units),
+            "reviewed_ratio": round(reviewed_chars / total_chars, 4) if total_chars else 0.0
+        }
+    )
+    return result, build_snapshot(review_id, paragraph_results, unit_results)
+
+
+async def agent_file_review_run(file_path,term_bank_path,file_review_result_path,client,model_name,format_standards,chunking=None,prefilter=None,review_id=None,compact=False,baseline=None):
     logger.info(f"Starting file review process for: {file_path}")
     print("提取文件信息...")
     _, ext = os.path.splitext(file_path)
 
     # 提取带格式的内容
     if ext == '.docx':
-        logger.debug("Processing DOCX file")
-        doc=Document(file_path)
-        text = '\n'.join([para.text for para in doc.paragraphs])
-        styled_content = extract_docx_styles(file_path)
-        # 分块处理
-        logger.info("Chunk the text...")
-        print("正在对文本分块处理...")
-        blocks = split_into_blocks(styled_content, 50)
-        text_blocks=split_into_textblocks(text,max_length=50)
-        logger.info(f"Block finish")
+        content = extract_review_content(file_path)
         print("正在执行语法、术语和格式审核...")
         logger.info("Start executing file review...")
-        # 语法检查使用异步
-        grammar_task = asyncio.create_task(check_grammar_errors(text_blocks, client, model_name))
-        # 术语和格式检查保持同步
-        term_task = asyncio.get_event_loop().run_in_executor(
-            None,
-            functools.partial(check_term_errors, text_blocks, term_bank_path)
-        )
-        format_task = asyncio.get_event_loop().run_in_executor(
-            None,
-            functools.partial(check_format_errors, blocks, format_standards)
-        )
-        #开始执行
-        grammar_errors, term_errors, format_errors = await asyncio.gather(grammar_task, term_task, format_task)
-
-        errors = FileReviewResult(
-            grammar_errors=grammar_errors,
-            term_errors=term_errors,
-            format_errors=format_errors
-        )
-        # 保存结果
-        with open(file_review_result_path, 'w', encoding='utf-8') as f:
-            json.dump(errors.model_dump(), f, ensure_ascii=False, indent=4)
-        print(f"文件审核结果已保存到：{file_review_result_path}")
-        logger.info(f"File review completed. Results saved to: {file_review_result_path}")
+        if baseline is not None:
+            # 增量审核：只审核相对基线新增或修改的段落
+            errors, snapshot = await _review_incremental(
+                content, baseline, term_bank_path, client, model_name, format_standards, chunking, prefilter, review_id
+            )
+            save_result(errors, file_review_result_path)
+            save_snapshot(snapshot, file_review_result_path)
+        else:
+            planned = plan_grammar_blocks(content["text"], model_name, chunking, prefilter)
+            # 语法检查使用异步
+            grammar_task = asyncio.gather(*[
+                check_grammar_block(block, client, model_name) for block in planned["grammar_blocks"]
+            ])
+            term_task, format_task = start_local_checks(content["text_blocks"], content["blocks"], term_bank_path, format_standards)
+            #开始执行
+            grammar_results, term_errors, format_violations = await asyncio.gather(grammar_task, term_task, format_task)
+            grammar_errors = planned["local_grammar_errors"] + [error for block_errors in grammar_results for error in block_errors]
+
+            errors = FileReviewResult(
+                review_id=review_id,
+                grammar_errors=grammar_errors,
+                term_errors=term_errors,
+                format_errors=group_format_violations(format_violations),
+                chunk_report=planned["chunk_report"],
+                prefilter_report=planned["prefilter_report"]
+            )
+            # 保存结果和按段落的审核快照
+            save_result(errors, file_review_result_path)
+            save_review_snapshot(review_id, content, planned, grammar_results, term_errors, format_violations, file_review_result_path)
+        print(f"语法检查完成，找到 {len(errors.grammar_errors)} 个错误")
 
+        # 紧凑编码：文本块去重引用、同类错误分组
+        if compact:
+            return encode_compact(errors)
         return errors.model_dump()
     else:
         logger.warning(f"Unsupported file format: {ext}")
         print("文件格式不合要求")
         return "文件格式不合要求"
+
+
+def _ndjson(record):
+    """序列化为一行NDJSON"""
+    return json_dumps(record) + "\n"
+
+
+async def agent_file_review_stream(file_path,term_bank_path,file_review_result_path,client,model_name,format_standards,chunking=None,prefilter=None,review_id=None):
+    """
+    流式执行文件审核，逐条产出NDJSON记录:
+        {"type": "local_grammar_errors", "data": [...]}  本地预检发现的机械性错误
+        {"type": "term_errors", "data": [...]}
+        {"type": "format_errors", "data": [...]}
+        {"type": "grammar_errors", "block_index": i, "data": [...]}  每个语法块完成时产出
+        {"type": "summary", ...}  最后一条，包含各类错误数、分块统计和预检统计
+    """
+    logger.info(f"Starting streaming file review for: {file_path}")
+    _, ext = os.path.splitext(file_path)
+    if ext != '.docx':
+        logger.warning(f"Unsupported file format: {ext}")
+        yield _ndjson({"type": "error", "detail": "文件格式不合要求"})
+        return
+
+    content = extract_review_content(file_path)
+    prepared = {**content, **plan_grammar_blocks(content["text"], model_name, chunking, prefilter)}
+    grammar_blocks = prepared["grammar_blocks"]
+    local_grammar_errors = prepared["local_grammar_errors"]
+
+    async def indexed_block(block_index, text_block):
+        return block_index, await check_grammar_block(text_block, client, model_name)
+
+    # 先启动所有语法检查，再等待较快的术语和格式检查
+    grammar_tasks = [asyncio.create_task(indexed_block(idx, block)) for idx, block in enumerate(grammar_blocks)]
+    try:
+        yield _ndjson({"type": "local_grammar_errors", "data": [error.model_dump() for error in local_grammar_errors]})
+        term_task, format_task = start_local_checks(prepared["text_blocks"], prepared["blocks"], term_bank_path, format_standards)
+        term_errors, format_violations = await asyncio.gather(term_task, format_task)
+        format_errors = group_format_violations(format_violations)
+        yield _ndjson({"type": "term_errors", "data": [error.model_dump() for error in term_errors]})
+        yield _ndjson({"type": "format_errors", "data": [error.model_dump() for error in format_errors]})
+
+        grammar_results = [[] for _ in grammar_blocks]
+        for finished in asyncio.as_completed(grammar_tasks):
+            block_index, block_errors = await finished
+            grammar_results[block_index] = block_errors
+            yield _ndjson({
+                "type": "grammar_errors",
+                "block_index": block_index,
+                "data": [error.model_dump() for error in block_errors]
+            })
+    finally:
+        # 客户端中途断开时取消尚未完成的语法检查
+        for task in grammar_tasks:
+            task.cancel()
+
+    errors = FileReviewResult(
+        review_id=review_id,
+        grammar_errors=local_grammar_errors + [error for block_errors in grammar_results for error in block_errors],
+        term_errors=term_errors,
+        format_errors=format_errors,
+        chunk_report=prepared["chunk_report"],
+        prefilter_report=prepared["prefilter_report"]
+    )
+    save_result(errors, file_review_result_path)
+    save_review_snapshot(review_id, content, prepared, grammar_results, term_errors, format_violations, file_review_result_path)
+
+    yield _ndjson({
+        "type": "summary",
+        "review_id": review_id,
+        "grammar_error_count": len(errors.grammar_errors),
+        "term_error_count": len(errors.term_errors),
+        "format_error_count": len(errors.format_errors),
+        "chunk_report": prepared["chunk_report"],
+        "prefilter_report": prepared["prefilter_report"]
+    })
@@ -3,13 +3,10 @@
 """
 from  Models.FileReviewModels.DomainModels.file_review_domain_models import GrammarError
 import asyncio
+import hashlib
 import json
 
-async def check_grammar_errors(text_blocks, client, model_name):
-    """并发处理语法检查"""
-
-    async def process_block(text_block):
-        system_prompt = """
+GRAMMAR_SYSTEM_PROMPT = """
         你是一名文档语法审核助手，用户将给你一些可能含有语法错误的文档，请你按json格式输出:
         1.请你找出里面的错误语句，
         2.说明错误原因，
@@ -17,11 +14,11 @@ async def check_grammar_errors(text_blocks, client, model_name):
         4.将有问题的句子分别输出
         5.输出格式为json格式
 
-        EXAMPLE INPUT: 
+        EXAMPLE INPUT:
         你们今天的装扮很好看我觉得。让人感觉很舒服今天的天气。
 
-        EXAMPLE JSON OUTPUT:    
-        [    
+        EXAMPLE JSON OUTPUT:
+        [
             {
             "errorStatement":"你们今天的装扮很好看我觉得。",
             "typeOfError":"语序混乱",
@@ -31,29 +28,57 @@ async def check_grammar_errors(text_blocks, client, model_name):
             "errorStatement":"让人感觉很舒服今天的天气",
             "typeOfError":"语序混乱",
             "revised":"今天的天气让人感觉很舒服"
-            }    
+            }
         ]
-        """  # 保持原有prompt内容不变
+        """
+# 提示词版本（内容哈希），修改提示词后此前大模型审核通过的段落需重新审核
+GRAMMAR_PROMPT_VERSION = hashlib.blake2b(GRAMMAR_SYSTEM_PROMPT.encode('utf-8'), digest_size=8).hexdigest()
+
+# 各模型最近一次响应头中的剩余token额度（x-ratelimit-remaining-tokens），供分块时参考
+rate_limit_remaining = {}
+
+
+def get_remaining_tokens(model_name):
+    """获取模型最近一次记录的剩余token额度，未知时返回None"""
+    return rate_limit_remaining.get(model_name)
 
-        messages = [{"role": "system", "content": system_prompt},
-                    {"role": "user", "content": text_block}]
+
+def _record_rate_limit(model_name, headers):
+    """从响应头记录限流余量"""
+    remaining = headers.get("x-ratelimit-remaining-tokens")
+    if remaining is not None:
         try:
-            response = await client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                response_format={
-                    "type": "json_object"
-                }
-            )
-            result = json.loads(response.choices[0].message.content)
-            # 转换为GrammarError对象列表
-            return [GrammarError(**item) for item in result]
-        except Exception as e:
-            print(f"处理block时出错: {str(e)}")
-            return []
+            rate_limit_remaining[model_name] = int(float(remaining))
+        except ValueError:
+            pass
+
+
+async def check_block_grammar(text_block, client, model_name):
+    """对单个文本块进行语法检查，调用或解析出错时返回None"""
+    messages = [{"role": "system", "content": GRAMMAR_SYSTEM_PROMPT},
+                {"role": "user", "content": text_block}]
+    try:
+        raw_response = await client.chat.completions.with_raw_response.create(
+            model=model_name,
+            messages=messages,
+            response_format={
+                "type": "json_object"
+            }
+        )
+        _record_rate_limit(model_name, raw_response.headers)
+        response = raw_response.parse()
+        result = json.loads(response.choices[0].message.content)
+        # 转换为GrammarError对象列表
+        return [GrammarError(**item) for item in result]
+    except Exception as e:
+        print(f"处理block时出错: {str(e)}")
+        return None
 
+
+async def check_grammar_errors(text_blocks, client, model_name):
+    """并发处理语法检查"""
     # 使用 asyncio.gather 并发处理
-    tasks = [process_block(block) for block in text_blocks]
+    tasks = [check_block_grammar(block, client, model_name) for block in text_blocks]
     results = await asyncio.gather(*tasks)
 
     grammar_errors = []
@@ -62,4 +87,4 @@ async def check_grammar_errors(text_blocks, client, model_name):
             grammar_errors.extend(result)
 
     print(f"语法检查完成，找到 {len(grammar_errors)} 个错误")
-    return grammar_errors
\ No newline at end of file
+    return grammar_errors
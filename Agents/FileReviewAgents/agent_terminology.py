@@ -1,11 +1,24 @@
 """
 对文件内容的用词术语准确度，和术语库进行比对审核
 术语检查不调用外部API，保持同步函数
+文本较大时按文本块分片，交由进程池并行扫描（每个工作进程缓存一份编译好的术语匹配器）
+术语库存在未过期的二进制镜像（见term_bank_image）时直接mmap加载，否则回退到解析JSON
 """
 from Models.FileReviewModels.DomainModels.file_review_domain_models import TermBank,TermError
+from Agents.FileReviewAgents.term_bank_image import open_term_bank_image, image_path_for
+import concurrent.futures
 import json
+import os
 import re
-import concurrent.futures
+
+# 文本总字符数超过该阈值时启用多进程分片扫描
+SHARD_THRESHOLD_CHARS = 1024 * 1024
+# 每个工作进程分到的分片数，分片更细便于负载均衡
+SHARDS_PER_WORKER = 4
+
+# 进程内缓存的术语匹配器：{(术语库路径, 修改时间): TermMatcher}
+_matcher_cache = {}
+_process_pool = None
 
 
 def load_terminology(term_bank_path):
@@ -21,73 +34,144 @@ def load_terminology(term_bank_path):
         return []
 
 
-def check_term_errors(text_blocks, term_bank_path):
-    terminology_db = load_terminology(term_bank_path)  # 现在获取的是term_bank数组
-
-    # 构建反向映射词典（错误形式 -> 正确术语）
-    reverse_terminology = {}
-    correct_terms = []  # 存储所有正确术语用于后续检查
-    for term_entry in terminology_db:
-        correct_term = term_entry.correct_term
-        correct_terms.append(correct_term)
-        for variant in term_entry.error_term:
-            reverse_terminology[variant.lower()] = correct_term
-
-    # 构建正则表达式匹配模式
-    terms_to_match = []
-    for term_entry in terminology_db:
-        terms_to_match.append(term_entry.correct_term)
-        terms_to_match.extend(term_entry.error_term)
-
-    pattern_str = '|'.join(r'{}'.format(re.escape(term)) for term in terms_to_match)
-    pattern = re.compile(pattern_str, flags=re.IGNORECASE)
-
-    # 处理单个文本块
-    def process_block(text_block):
+class TermMatcher:
+    """编译后的术语匹配器：正则模式 + 错误形式映射 + 正确术语映射"""
+
+    def __init__(self, terminology_db):
+        # 构建反向映射词典（错误形式 -> 正确术语）
+        self.reverse_terminology = {}
+        # 正确术语按小写归类（小写 -> [正确术语]），用于大小写检查
+        self.correct_by_lower = {}
+        terms_to_match = []
+        for term_entry in terminology_db:
+            correct_term = term_entry.correct_term
+            self.correct_by_lower.setdefault(correct_term.lower(), []).append(correct_term)
+            terms_to_match.append(correct_term)
+            terms_to_match.extend(term_entry.error_term)
+            for variant in term_entry.error_term:
+                self.reverse_terminology[variant.lower()] = correct_term
+
+        # 构建正则表达式匹配模式（长术语优先，重叠术语取最长匹配）
+        terms_to_match.sort(key=len, reverse=True)
+        pattern_str = '|'.join(re.escape(term) for term in terms_to_match if term)
+        self.pattern = re.compile(pattern_str, flags=re.IGNORECASE) if pattern_str else None
+
+    def scan(self, text_block):
+        """扫描单个文本块，返回 [(错误类型, 错误词, 正确术语, 块内偏移)]"""
         block_errors = []
-        text_block = text_block.strip()
-        matches = list(pattern.finditer(text_block))
+        if self.pattern is None:
+            return block_errors
 
-        for match in matches:
+        for match in self.pattern.finditer(text_block):
             matched_term = match.group()
             matched_lower = matched_term.lower()
 
             # 检查是否是正确术语本身
-            if matched_lower in [term.lower() for term in correct_terms]:
+            if matched_lower in self.correct_by_lower:
                 # 查找对应的正确术语
-                for correct_term in correct_terms:
-                    if correct_term.lower() == matched_lower and correct_term != matched_term:
-                        # noinspection PyArgumentList
-                        block_errors.append(TermError(
-                            error_statement=text_block,
-                            type_of_error="术语大小写不规范",
-                            error_word=matched_term,
-                            revised=correct_term
-                        ))
+                for correct_term in self.correct_by_lower[matched_lower]:
+                    if correct_term != matched_term:
+                        block_errors.append(("术语大小写不规范", matched_term, correct_term, match.start()))
                 continue
 
             # 检查是否是错误变体
-            if matched_lower in reverse_terminology:
-                correct_term = reverse_terminology[matched_lower]
-                # noinspection PyArgumentList
-                block_errors.append(TermError(
-                    error_statement=text_block,
-                    type_of_error="术语不规范",
-                    error_word=matched_term,
-                    revised=correct_term
-                ))
+            if matched_lower in self.reverse_terminology:
+                block_errors.append(("术语不规范", matched_term, self.reverse_terminology[matched_lower], match.start()))
 
         return block_errors
 
-    # 使用多线程并发处理
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [executor.submit(process_block, text_block) for text_block in text_blocks]
-        termErrors = []
-        for future in concurrent.futures.as_completed(futures):
-            block_errors = future.result()
-            if block_errors:
-                print(f"添加错误: {block_errors}")
-            termErrors.extend(block_errors)
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_term_matcher(term_bank_path):
+    """获取术语匹配器，术语库及其镜像未变化时复用当前进程内的缓存"""
+    key = (term_bank_path, _mtime(term_bank_path), _mtime(image_path_for(term_bank_path)))
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        _matcher_cache.clear()
+        matcher = open_term_bank_image(term_bank_path)
+        if matcher is None:
+            matcher = TermMatcher(load_terminology(term_bank_path))
+        _matcher_cache[key] = matcher
+    return matcher
+
+
+def _scan_shard(term_bank_path, start_index, text_blocks):
+    """扫描一个分片（在工作进程中执行），返回 [(文本块序号, 错误类型, 错误词, 正确术语, 块内偏移)]"""
+    matcher = get_term_matcher(term_bank_path)
+    shard_errors = []
+    for offset, text_block in enumerate(text_blocks):
+        for error in matcher.scan(text_block.strip()):
+            shard_errors.append((start_index + offset, *error))
+    return shard_errors
+
+
+def _get_process_pool():
+    """懒加载的常驻进程池"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """关闭术语扫描进程池（服务关闭时调用）"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+def _split_shards(text_blocks, shard_count):
+    """按字符数将连续的文本块均匀划分为若干分片，返回 [(起始序号, 文本块列表)]"""
+    total_chars = sum(len(text_block) for text_block in text_blocks)
+    target = max(total_chars // shard_count, 1)
+    shards = []
+    start = 0
+    size = 0
+    for idx, text_block in enumerate(text_blocks):
+        size += len(text_block)
+        if size >= target:
+            shards.append((start, text_blocks[start:idx + 1]))
+            start = idx + 1
+            size = 0
+    if start < len(text_blocks):
+        shards.append((start, text_blocks[start:]))
+    return shards
+
+
+def check_term_errors(text_blocks, term_bank_path):
+    total_chars = sum(len(text_block) for text_block in text_blocks)
+    worker_count = os.cpu_count() or 1
+
+    if total_chars < SHARD_THRESHOLD_CHARS or worker_count == 1:
+        raw_errors = _scan_shard(term_bank_path, 0, text_blocks)
+    else:
+        # 术语匹配只在文本块内部进行，按块边界分片不会产生跨片重复或遗漏
+        shards = _split_shards(text_blocks, worker_count * SHARDS_PER_WORKER)
+        print(f"术语检查启用多进程分片扫描：{len(shards)} 个分片，{worker_count} 个进程")
+        pool = _get_process_pool()
+        futures = [pool.submit(_scan_shard, term_bank_path, start, shard) for start, shard in shards]
+        raw_errors = []
+        for future in futures:
+            raw_errors.extend(future.result())
+
+    termErrors = []
+    for block_index, type_of_error, error_word, revised, offset in raw_errors:
+        # noinspection PyArgumentList
+        termErrors.append(TermError(
+            error_statement=text_blocks[block_index].strip(),
+            type_of_error=type_of_error,
+            error_word=error_word,
+            revised=revised,
+            block_index=block_index,
+            offset=offset
+        ))
 
     print(f"术语检查完成，找到 {len(termErrors)} 个错误")
-    return termErrors
\ No newline at end of file
+    return termErrors
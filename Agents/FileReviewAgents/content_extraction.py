@@ -116,7 +116,8 @@ def extract_docx_styles(file_review_result_path):
                     "font_color": font_color,
                     "font_name": font_name,
                     "style_name": style_name,
-                    "heading_level": heading_level
+                    "heading_level": heading_level,
+                    "paragraph_index": para_idx  # 所在段落，格式检查按段落合并run、增量审核按段落复用结果
                 })
 
         print(f"\n处理完成，共扫描 {para_count} 段落，{run_total} Runs")
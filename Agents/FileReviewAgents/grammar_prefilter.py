@@ -0,0 +1,147 @@
+"""
+语法审核本地预检
+在调用大模型前按段落做规则检查:
+1.可跳过的段落（过短、纯数字、代码/标识符、此前已由同一模型按同一提示词审核通过）不再发送给大模型
+2.机械性错误（英文重复单词、括号不匹配、中文语境中混用半角标点）在本地直接给出；
+  行首及分句首的编号（如“1)”“a）”）不视为括号不匹配；
+  中文相邻的相同单字（“对对方”“在在线”“和和平”）多为单字词与同字开头的词相连，无法按规则判断，交由大模型审核
+3.统计每个文档避免的大模型调用比例
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from Models.FileReviewModels.DomainModels.file_review_domain_models import GrammarError
+
+_CJK = re.compile(r'[一-鿿]')
+# 纯数字、编号、金额、百分比、日期等
+_NUMERIC = re.compile(r'^[\d\s.,:;%‰+\-−/\\()（）×xX*=<>≤≥~～#№°℃$¥￥]+$')
+# URL、路径、标识符、版本号等单个“词”
+_TOKEN_LIKE = re.compile(r'^(https?://\S+|[\w.\-/\\:@#]+)$')
+_CODE_SYMBOLS = set('{}[]();=<>&|$`\\')
+# 英文重复单词（“the the”）；“had had”“that that”是正常用法
+_DUPLICATED_WORD = re.compile(r'\b(?!(?:had|that)\b)([A-Za-z]+)\s+\1\b', re.IGNORECASE)
+# 紧邻中文字符的半角标点
+_HALF_WIDTH_PUNCT = re.compile(r'(?<=[一-鿿])[,;:?!]|[,;:?!](?=[一-鿿])')
+_FULL_WIDTH_MAP = {',': '，', ';': '；', ':': '：', '?': '？', '!': '！'}
+_BRACKET_PAIRS = {')': '(', '）': '（', ']': '[', '】': '【', '》': '《', '”': '“', '}': '{'}
+_OPEN_BRACKETS = set(_BRACKET_PAIRS.values())
+# 行首或分句首的编号：1) 2） a) iv) 一）等，只有右括号
+_ENUMERATOR = re.compile(r'(?:^|(?<=[\s，,；;：:。、]))(?:\d{1,3}|[A-Za-z]|[ivxIVX]{1,4}|[一二三四五六七八九十]{1,3})[)）]')
+
+# 进程内已审核通过的段落：(模型名, 提示词版本, 内容哈希)，按LRU淘汰
+_APPROVED_LIMIT = 100000
+_approved = OrderedDict()
+
+
+def _digest(paragraph):
+    return hashlib.blake2b(paragraph.encode('utf-8'), digest_size=16).digest()
+
+
+def mark_approved(paragraphs, model_name, prompt_version):
+    """记录大模型审核无错误的段落，后续文档中由同一模型、同一提示词审核的相同段落直接跳过"""
+    for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        key = (model_name, prompt_version, _digest(paragraph))
+        _approved[key] = True
+        _approved.move_to_end(key)
+    while len(_approved) > _APPROVED_LIMIT:
+        _approved.popitem(last=False)
+
+
+def _is_code_like(paragraph):
+    """无中文且为单个标识符/路径/URL，或代码符号占比较高"""
+    if _CJK.search(paragraph):
+        return False
+    if _TOKEN_LIKE.match(paragraph):
+        return True
+    symbol_count = sum(1 for char in paragraph if char in _CODE_SYMBOLS)
+    return symbol_count / len(paragraph) > 0.1
+
+
+def classify_paragraph(paragraph, min_chars, model_name=None, prompt_version=None):
+    """返回跳过原因（too_short/numeric/code_like/approved），需要大模型审核时返回None"""
+    if len(paragraph) < min_chars:
+        return "too_short"
+    if _NUMERIC.match(paragraph):
+        return "numeric"
+    if _is_code_like(paragraph):
+        return "code_like"
+    if (model_name, prompt_version, _digest(paragraph)) in _approved:
+        return "approved"
+    return None
+
+
+def _check_brackets(paragraph):
+    """检查括号、书名号、引号是否成对（编号后没有对应左括号的右括号不计入）"""
+    enumerators = {match.end() - 1 for match in _ENUMERATOR.finditer(paragraph)}
+    stack = []
+    for index, char in enumerate(paragraph):
+        if char in _OPEN_BRACKETS:
+            stack.append(char)
+        elif char in _BRACKET_PAIRS:
+            if not stack or stack[-1] != _BRACKET_PAIRS[char]:
+                if index in enumerators:
+                    continue
+                return False
+            stack.pop()
+    return not stack
+
+
+def check_mechanical_errors(paragraph):
+    """本地检查机械性错误，返回GrammarError列表"""
+    errors = []
+
+    if _DUPLICATED_WORD.search(paragraph):
+        # noinspection PyArgumentList
+        errors.append(GrammarError(error_statement=paragraph, type_of_error="重复字词", revised=_DUPLICATED_WORD.sub(r'\1', paragraph)))
+
+    if not _check_brackets(paragraph):
+        # noinspection PyArgumentList
+        errors.append(GrammarError(error_statement=paragraph, type_of_error="括号或引号不成对", revised="请补全或删除多余的括号、引号"))
+
+    if _HALF_WIDTH_PUNCT.search(paragraph):
+        revised = _HALF_WIDTH_PUNCT.sub(lambda m: _FULL_WIDTH_MAP[m.group()], paragraph)
+        # noinspection PyArgumentList
+        errors.append(GrammarError(error_statement=paragraph, type_of_error="全角半角标点混用", revised=revised))
+
+    return errors
+
+
+def prefilter_paragraphs(paragraphs, prefilter, model_name=None, prompt_version=None):
+    """
+    预检段落
+
+    Args:
+        paragraphs: 段落列表
+        prefilter: 预检配置（PrefilterConfig）
+        model_name / prompt_version: 语法审核使用的模型和提示词版本，只跳过由同一模型、同一提示词审核通过的段落
+
+    Returns:
+        (需要大模型审核的段落, 本地发现的语法错误, 统计信息)
+    """
+    report = {
+        "paragraph_count": len(paragraphs),
+        "skipped": {"too_short": 0, "numeric": 0, "code_like": 0, "approved": 0},
+        "local_error_count": 0
+    }
+    if not prefilter.enabled:
+        return paragraphs, [], report
+
+    kept = []
+    local_errors = []
+    for paragraph in paragraphs:
+        reason = classify_paragraph(paragraph, prefilter.min_chars, model_name, prompt_version)
+        if reason in ("too_short", "numeric", "code_like"):
+            report["skipped"][reason] += 1
+            continue
+        # 已审核通过的段落不再送大模型，但机械性检查仍需执行
+        local_errors.extend(check_mechanical_errors(paragraph))
+        if reason == "approved":
+            report["skipped"][reason] += 1
+            continue
+        kept.append(paragraph)
+
+    report["local_error_count"] = len(local_errors)
+    return kept, local_errors, report
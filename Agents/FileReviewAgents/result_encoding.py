@@ -0,0 +1,79 @@
+"""
+文件审核结果的紧凑编码
+常规结果中每条术语错误都复制整段文本块，每条格式错误都重复规定值；紧凑编码将其去重：
+    blocks:        出现术语错误的文本块，每段文本只保存一次，按下标引用
+    values:        格式错误的规定值表，按下标引用
+    term_errors:   按（错误类型, 错误词, 正确术语）分组，locations为 [文本块下标, 块内偏移] 列表
+    format_errors: expected_value替换为values下标
+    grammar_errors、chunk_report、prefilter_report、incremental_report、review_id保持不变
+序列化使用serialization模块（安装了orjson时使用orjson）
+"""
+from Agents.serialization import json_dumpb
+
+
+def encode_compact(result):
+    """
+    将FileReviewResult转换为紧凑结构
+
+    Args:
+        result: FileReviewResult对象
+
+    Returns:
+        紧凑结果字典
+    """
+    blocks = []
+    block_ids = {}  # 文本 -> 下标
+    term_groups = {}  # (错误类型, 错误词, 正确术语) -> 分组
+
+    for error in result.term_errors:
+        text = error.error_statement
+        if text not in block_ids:
+            block_ids[text] = len(blocks)
+            blocks.append(text)
+        offset = error.offset if error.offset is not None else text.find(error.error_word)
+
+        key = (error.type_of_error, error.error_word, error.revised)
+        group = term_groups.get(key)
+        if group is None:
+            group = term_groups[key] = {
+                "type_of_error": error.type_of_error,
+                "error_word": error.error_word,
+                "revised": error.revised,
+                "occurrences": 0,
+                "locations": []
+            }
+        group["occurrences"] += 1
+        group["locations"].append([block_ids[text], offset])
+
+    values = []
+    value_ids = {}
+    format_errors = []
+    for error in result.format_errors:
+        if error.expected_value not in value_ids:
+            value_ids[error.expected_value] = len(values)
+            values.append(error.expected_value)
+        format_errors.append({
+            "type_of_error": error.type_of_error,
+            "current_value": error.current_value,
+            "expected": value_ids[error.expected_value],
+            "text_snippet": error.text_snippet,
+            "occurrences": error.occurrences,
+            "locations": error.locations
+        })
+
+    return {
+        "review_id": result.review_id,
+        "blocks": blocks,
+        "values": values,
+        "grammar_errors": [error.model_dump() for error in result.grammar_errors],
+        "term_errors": list(term_groups.values()),
+        "format_errors": format_errors,
+        "chunk_report": result.chunk_report.model_dump() if result.chunk_report else None,
+        "prefilter_report": result.prefilter_report.model_dump() if result.prefilter_report else None,
+        "incremental_report": result.incremental_report.model_dump() if result.incremental_report else None
+    }
+
+
+def dumps(data):
+    """序列化为UTF-8 JSON字节"""
+    return json_dumpb(data)
@@ -0,0 +1,258 @@
+"""
+审核快照：按段落保存审核结果，供修订版本的增量审核复用
+快照与审核结果文件保存在同一目录，文件名为 {结果文件名去掉扩展名}.snapshot.json，随结果文件一起按保留时长清理
+    paragraphs:   {段落内容哈希: {"grammar": [语法错误], "terms": [[段内文本块序号, 错误类型, 错误词, 正确术语, 偏移]]}}
+    format_units: {段落格式哈希（文本+run样式）: [[错误类型, 当前值, 规定值, 片段, 段内首个run序号, run数]]}
+段落内的位置均为相对位置，复用时按新文档中的段落位置换算
+内容相同的段落共用一个哈希，只保存首次出现的段落的结果，组装时每次出现各输出一份
+大模型返回的错误语句无法唯一对应到所在语法块中的某个段落时不写入快照，该块的所有段落也不写入快照，
+增量审核时作为修改过的段落重新审核，避免把错误记在未出错的段落上并在修正后继续复用
+"""
+import bisect
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from Models.FileReviewModels.DomainModels.file_review_domain_models import GrammarError, TermError
+
+logger = logging.getLogger("file_review")
+
+SNAPSHOT_SUFFIX = ".snapshot.json"
+SNAPSHOT_VERSION = 3
+# review_id只允许任务ID中出现的字符，防止拼接路径时穿越目录
+_REVIEW_ID_PATTERN = re.compile(r'^[0-9A-Za-z_]+$')
+
+
+def paragraph_key(paragraph):
+    """段落内容哈希"""
+    return hashlib.blake2b(paragraph.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _format_unit_key(runs):
+    """段落格式哈希：文本和各run样式均相同时格式检查结果相同"""
+    payload = json.dumps([
+        [run.get("text"), run.get("style_name"), run.get("font_name"), run.get("font_size"), run.get("font_color")]
+        for run in runs
+    ], ensure_ascii=False, default=list)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def group_format_units(blocks):
+    """
+    将格式审核块中的run按所在段落分组
+
+    Returns:
+        [{"key": 段落格式哈希, "offset": 段落首个run的全局序号, "runs": [run]}]
+    """
+    units = []
+    run_index = 0
+    for block in blocks:
+        for style in block["styles"]:
+            paragraph_index = style.get("paragraph_index")
+            if not units or units[-1]["paragraph_index"] != paragraph_index:
+                units.append({"paragraph_index": paragraph_index, "offset": run_index, "runs": []})
+            units[-1]["runs"].append(style)
+            run_index += 1
+    for unit in units:
+        unit["key"] = _format_unit_key(unit["runs"])
+    return units
+
+
+def _find_owners(lines, paragraphs, positions, start):
+    """
+    按顺序找到语法块中每行所属的段落（段落过长时语法块中只包含段落的一部分）
+    语法块按段落顺序生成，只从上一行所属的段落开始向后查找，优先完全相同的段落
+
+    Args:
+        positions: {段落: [出现的下标]}
+
+    Returns:
+        (每行所属的段落，找不到时为None, 下一个语法块的查找起点)
+    """
+    owners = []
+    for line in lines:
+        indexes = positions.get(line, [])
+        found = bisect.bisect_left(indexes, start)
+        if found < len(indexes):
+            index = indexes[found]
+        else:
+            index = next((index for index in range(start, len(paragraphs)) if line in paragraphs[index]), None)
+        if index is None:
+            owners.append(None)
+            continue
+        owners.append(paragraphs[index])
+        start = index
+    return owners, start
+
+
+def collect_paragraph_results(paragraphs, grammar_blocks, grammar_results, local_grammar_errors, text_blocks, block_paragraphs, term_errors):
+    """
+    将语法错误、术语错误归属到段落
+
+    Args:
+        paragraphs: 本次审核的段落列表
+        grammar_blocks / grammar_results: 语法审核块及对应的错误列表
+        local_grammar_errors: 本地预检发现的语法错误（error_statement为整段）
+        text_blocks / block_paragraphs: 术语审核块及所属段落下标（split_paragraphs_into_textblocks的结果）
+        term_errors: 术语错误（block_index为text_blocks下标）
+
+    Returns:
+        ({段落内容哈希: {"grammar": [...], "terms": [...]}}, 无法归属到段落的语法错误)
+        无法归属的错误所在语法块的段落标记 "reusable": False，不写入快照
+    """
+    results = {paragraph_key(paragraph): {"grammar": [], "terms": []} for paragraph in paragraphs}
+    unattributed = []
+
+    def add_grammar(paragraph, error):
+        # 重复段落上的相同错误只记录一次（按首次出现的段落保存）
+        grammar = results[paragraph_key(paragraph)]["grammar"]
+        error = error.model_dump()
+        if error not in grammar:
+            grammar.append(error)
+
+    for error in local_grammar_errors:
+        add_grammar(error.error_statement, error)
+
+    positions = {}
+    for paragraph_index, paragraph in enumerate(paragraphs):
+        positions.setdefault(paragraph, []).append(paragraph_index)
+    start = 0
+    for grammar_block, block_errors in zip(grammar_blocks, grammar_results):
+        lines = [line.strip() for line in grammar_block.split('\n') if line.strip()]
+        owners, start = _find_owners(lines, paragraphs, positions, start)
+        candidates = list(dict.fromkeys(owner for owner in owners if owner is not None))
+        reusable = None not in owners
+        for error in block_errors:
+            statement = error.error_statement.strip()
+            # 错误语句只能归属到本语法块内与它完全相同的段落，或唯一包含它的段落
+            matched = [paragraph for paragraph in candidates if paragraph == statement] \
+                or [paragraph for paragraph in candidates if statement and statement in paragraph]
+            if len(matched) == 1:
+                add_grammar(matched[0], error)
+            else:
+                unattributed.append(error)
+                reusable = False
+        if not reusable:
+            for paragraph in candidates:
+                results[paragraph_key(paragraph)]["reusable"] = False
+
+    first_blocks = {}
+    for block_index, paragraph_index in enumerate(block_paragraphs):
+        first_blocks.setdefault(paragraph_index, block_index)
+    # 每个段落哈希首次出现的段落下标，重复段落的术语错误不再记录
+    first_occurrences = {}
+    for paragraph_index, paragraph in enumerate(paragraphs):
+        first_occurrences.setdefault(paragraph, paragraph_index)
+    for error in term_errors:
+        paragraph_index = block_paragraphs[error.block_index]
+        if first_occurrences[paragraphs[paragraph_index]] != paragraph_index:
+            continue
+        results[paragraph_key(paragraphs[paragraph_index])]["terms"].append([
+            error.block_index - first_blocks[paragraph_index],
+            error.type_of_error, error.error_word, error.revised, error.offset
+        ])
+    return results, unattributed
+
+
+def collect_unit_results(units, violations):
+    """
+    将格式违规（find_format_violations的结果，run序号为全局序号）归属到段落
+
+    Returns:
+        {段落格式哈希: [[错误类型, 当前值, 规定值, 片段, 段内首个run序号, run数]]}
+    """
+    results = {unit["key"]: [] for unit in units}
+    offsets = [unit["offset"] for unit in units]
+    # 每个段落格式哈希首次出现的段落，重复段落的违规不再记录
+    first_units = {}
+    for unit in units:
+        first_units.setdefault(unit["key"], unit["offset"])
+    for type_of_error, current_value, expected_value, text_snippet, first_run, run_count in violations:
+        unit = units[bisect.bisect_right(offsets, first_run) - 1]
+        if first_units[unit["key"]] != unit["offset"]:
+            continue
+        results[unit["key"]].append([type_of_error, current_value, expected_value, text_snippet, first_run - unit["offset"], run_count])
+    return results
+
+
+def assemble_errors(paragraphs, text_blocks, block_paragraphs, units, paragraph_results, unit_results):
+    """
+    按新文档的段落顺序组装审核结果，段内相对位置换算为全局位置
+
+    Returns:
+        (语法错误列表, 术语错误列表, 格式违规列表)
+    """
+    first_blocks = {}
+    for block_index, paragraph_index in enumerate(block_paragraphs):
+        first_blocks.setdefault(paragraph_index, block_index)
+
+    grammar_errors = []
+    term_errors = []
+    for paragraph_index, paragraph in enumerate(paragraphs):
+        result = paragraph_results[paragraph_key(paragraph)]
+        # noinspection PyArgumentList
+        grammar_errors.extend(GrammarError(**error) for error in result["grammar"])
+        for sentence_index, type_of_error, error_word, revised, offset in result["terms"]:
+            block_index = first_blocks[paragraph_index] + sentence_index
+            # noinspection PyArgumentList
+            term_errors.append(TermError(
+                error_statement=text_blocks[block_index].strip(),
+                type_of_error=type_of_error,
+                error_word=error_word,
+                revised=revised,
+                block_index=block_index,
+                offset=offset
+            ))
+
+    violations = []
+    for unit in units:
+        for type_of_error, current_value, expected_value, text_snippet, first_run, run_count in unit_results[unit["key"]]:
+            violations.append((type_of_error, current_value, expected_value, text_snippet, unit["offset"] + first_run, run_count))
+    return grammar_errors, term_errors, violations
+
+
+def build_snapshot(review_id, paragraph_results, unit_results):
+    """标记为不可复用的段落不写入快照，增量审核时重新审核"""
+    return {
+        "version": SNAPSHOT_VERSION,
+        "review_id": review_id,
+        "paragraphs": {key: result for key, result in paragraph_results.items() if result.get("reusable", True)},
+        "format_units": unit_results
+    }
+
+
+def snapshot_path_for(result_path):
+    """结果文件对应的快照路径"""
+    result = Path(result_path)
+    return str(result.parent / f"{result.stem}{SNAPSHOT_SUFFIX}")
+
+
+def save_snapshot(snapshot, result_path):
+    with open(snapshot_path_for(result_path), 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+
+
+def load_snapshot(configured_path, review_id):
+    """
+    按review_id查找并加载快照
+
+    Args:
+        configured_path: 配置中的结果文件路径（快照在其所在目录下）
+        review_id: 基线审核ID
+
+    Returns:
+        快照字典，不存在或版本不兼容时返回None
+    """
+    if not review_id or not _REVIEW_ID_PATTERN.match(review_id):
+        return None
+    configured = Path(configured_path)
+    if not configured.parent.is_dir():
+        return None
+    for path in configured.parent.glob(f"{configured.stem}_*_{review_id}{SNAPSHOT_SUFFIX}"):
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") == SNAPSHOT_VERSION and snapshot.get("review_id") == review_id:
+            return snapshot
+        logger.warning(f"Ignoring incompatible review snapshot: {path}")
+    return None
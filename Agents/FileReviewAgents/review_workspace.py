@@ -0,0 +1,219 @@
+"""
+文件审核任务工作区管理
+每次审核分配独立的任务目录和结果文件，避免并发审核同名文件时互相覆盖
+1.create_review_job:创建任务目录，边写入边计算上传文件的内容哈希
+2.build_result_path:按内容哈希和任务ID生成独立的结果文件路径
+3.cleanup_expired:按保留时长清理过期的任务目录和结果文件
+4.create_batch_job:批量审核任务，多个上传文件（或zip中的docx）保存到同一任务目录，
+  边保存边检查文件数和总大小，超出上限时立即中止并删除任务目录（防止zip炸弹写满磁盘）
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from pathlib import Path
+
+logger = logging.getLogger("file_review")
+
+UPLOAD_ROOT = "./Files/FileReviewUploads"
+
+# 清理操作的最小间隔（秒），避免每个请求都扫描目录
+_CLEANUP_INTERVAL = 600
+_last_cleanup = 0.0
+
+
+class BatchLimitError(Exception):
+    """批量审核的文件数或总大小超出上限"""
+
+
+def create_review_job(upload_file, upload_root=UPLOAD_ROOT, chunk_size=1024 * 1024):
+    """
+    创建审核任务：在独立目录中保存上传文件，同时计算SHA-256
+
+    Args:
+        upload_file: FastAPI的UploadFile对象
+        upload_root: 任务目录的根目录
+        chunk_size: 分块读取大小
+
+    Returns:
+        {"job_id", "job_dir", "file_path", "content_hash"}
+    """
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(upload_root, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+
+    # 仅保留文件名部分，防止路径穿越
+    file_path = os.path.join(job_dir, os.path.basename(upload_file.filename))
+    content_hash, _ = _save_stream(upload_file.file, file_path, chunk_size)
+
+    return {
+        "job_id": job_id,
+        "job_dir": job_dir,
+        "file_path": file_path,
+        "content_hash": content_hash
+    }
+
+
+def _save_stream(source, file_path, chunk_size=1024 * 1024, max_bytes=None):
+    """
+    分块写入文件，同时计算SHA-256
+
+    Returns:
+        (内容哈希, 写入的字节数)
+
+    Raises:
+        BatchLimitError: 写入的字节数超过max_bytes
+    """
+    digest = hashlib.sha256()
+    written = 0
+    with open(file_path, "wb") as buffer:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_bytes is not None and written > max_bytes:
+                raise BatchLimitError("文件总大小超出上限")
+            digest.update(chunk)
+            buffer.write(chunk)
+    return digest.hexdigest(), written
+
+
+def create_batch_job(upload_files, upload_root=UPLOAD_ROOT, allowed_ext=".docx", chunk_size=1024 * 1024, max_files=0, max_bytes=0):
+    """
+    创建批量审核任务：所有文件保存到同一任务目录，zip压缩包中符合扩展名的文件会被解压
+
+    Args:
+        upload_files: UploadFile对象列表（可以是多个docx，也可以是zip压缩包）
+        upload_root: 任务目录的根目录
+        allowed_ext: 参与审核的文件扩展名
+        chunk_size: 分块读取大小
+        max_files: 最多保存的文件数，0表示不限制
+        max_bytes: 保存（含解压）的文件总字节数上限，0表示不限制
+
+    Returns:
+        {"job_id", "job_dir", "files": [{"name", "file_path", "content_hash"}], "skipped": [不支持的文件名]}
+
+    Raises:
+        BatchLimitError: 文件数或总大小超出上限（任务目录已删除）
+    """
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(upload_root, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    files = []
+    skipped = []
+    total_bytes = 0
+
+    def add(name, source, declared_size=None):
+        nonlocal total_bytes
+        if max_files and len(files) >= max_files:
+            raise BatchLimitError(f"单次批量审核最多{max_files}个文件")
+        remaining = max_bytes - total_bytes if max_bytes else None
+        # zip成员先按声明的解压后大小检查，写入时再按实际字节数检查（声明的大小可能被篡改）
+        if remaining is not None and declared_size is not None and declared_size > remaining:
+            raise BatchLimitError(f"单次批量审核的文件总大小最多{max_bytes // (1024 * 1024)}MB")
+        # 批内可能有同名文件，保存时加序号前缀
+        file_path = os.path.join(job_dir, f"{len(files):04d}_{os.path.basename(name)}")
+        try:
+            content_hash, written = _save_stream(source, file_path, chunk_size, remaining)
+        except BatchLimitError:
+            raise BatchLimitError(f"单次批量审核的文件总大小最多{max_bytes // (1024 * 1024)}MB")
+        total_bytes += written
+        files.append({
+            "name": name,
+            "file_path": file_path,
+            "content_hash": content_hash
+        })
+
+    try:
+        for upload_file in upload_files:
+            filename = os.path.basename(upload_file.filename or "")
+            ext = os.path.splitext(filename)[1].lower()
+            if ext == ".zip":
+                with zipfile.ZipFile(upload_file.file) as archive:
+                    for member in archive.infolist():
+                        # 跳过目录和macOS附带的元数据文件
+                        if member.is_dir() or member.filename.startswith("__MACOSX/"):
+                            continue
+                        if os.path.splitext(member.filename)[1].lower() != allowed_ext:
+                            skipped.append(f"{filename}/{member.filename}")
+                            continue
+                        with archive.open(member) as source:
+                            add(member.filename, source, member.file_size)
+            elif ext == allowed_ext:
+                add(filename, upload_file.file)
+            else:
+                skipped.append(filename)
+    except Exception:
+        remove_review_job(job_dir)
+        raise
+
+    return {
+        "job_id": job_id,
+        "job_dir": job_dir,
+        "files": files,
+        "skipped": skipped
+    }
+
+
+def build_result_path(configured_path, content_hash, job_id):
+    """在配置的结果路径所在目录下，生成 {原文件名}_{内容哈希前16位}_{任务ID}.json"""
+    configured = Path(configured_path)
+    configured.parent.mkdir(parents=True, exist_ok=True)
+    return str(configured.parent / f"{configured.stem}_{content_hash[:16]}_{job_id}{configured.suffix}")
+
+
+def remove_review_job(job_dir):
+    """删除任务目录"""
+    shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def cleanup_expired(configured_path, retention_hours, upload_root=UPLOAD_ROOT, force=False):
+    """
+    清理超过保留时长的任务目录和结果文件
+
+    Args:
+        configured_path: 配置中的结果文件路径（只清理由其派生的按任务结果文件）
+        retention_hours: 保留时长（小时）
+        upload_root: 任务目录的根目录
+        force: 忽略清理间隔，立即执行
+
+    Returns:
+        删除的条目数
+    """
+    global _last_cleanup
+    now = time.time()
+    if not force and now - _last_cleanup < _CLEANUP_INTERVAL:
+        return 0
+    _last_cleanup = now
+
+    cutoff = now - retention_hours * 3600
+    removed = 0
+
+    # 任务目录（正常情况下审核结束即删除，此处兜底清理异常中断遗留的目录）
+    if os.path.isdir(upload_root):
+        for entry in os.scandir(upload_root):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+
+    # 按任务生成的结果文件
+    configured = Path(configured_path)
+    prefix = f"{configured.stem}_"
+    if configured.parent.is_dir():
+        for entry in os.scandir(configured.parent):
+            if (entry.is_file() and entry.name.startswith(prefix) and entry.name.endswith(configured.suffix)
+                    and entry.stat().st_mtime < cutoff):
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Failed to remove expired result {entry.path}: {e}")
+
+    if removed:
+        logger.info(f"Cleaned up {removed} expired review workspaces/results")
+    return removed
@@ -0,0 +1,348 @@
+"""
+术语库二进制镜像
+1.compile_term_bank:离线将termBank*.json编译为紧凑的二进制镜像（按UTF-8字节排序的小写匹配键 + 字符串表），
+  同时写入匹配键的字典树，进程加载镜像后直接在mmap上匹配，不再排序全部键、编译正则
+2.open_term_bank_image:以只读mmap方式加载镜像，多个uvicorn工作进程共享同一份物理页
+3.is_image_stale:根据源JSON的大小、修改时间及SHA-256判断镜像是否过期
+
+用法：python -m Agents.FileReviewAgents.term_bank_image Configs/FileReviewConfig/termBank1.json [...]
+
+镜像布局（小端序）:
+    头部        _HEADER
+    键索引      key_count 条 _RECORD：键偏移、键长度、变体目标偏移、变体目标长度、正确术语引用起点、正确术语引用数
+    正确术语引用 ref_count 条 _REF：字符串偏移、字符串长度
+    字典树节点  node_count 条 _NODE：首条边序号、边数、匹配键序号（非键结尾为_NONE），0号为根节点
+    边字符      edge_count 个uint32：小写字符的码位，同一节点的边按码位升序连续存放
+    边目标节点  edge_count 个uint32：与边字符一一对应
+    字符串表    UTF-8字节
+"""
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from Models.FileReviewModels.DomainModels.file_review_domain_models import TermBank
+
+_MAGIC = b"TERMIMG1"
+_VERSION = 2
+# 魔数、版本、源文件大小、源文件修改时间、源文件SHA-256、键数、引用数、字符串表长度、最长键字符数、字典树节点数、边数
+_HEADER = struct.Struct("<8sIQQ32sIIIIII")
+_RECORD = struct.Struct("<IIIIII")
+_REF = struct.Struct("<II")
+_NODE = struct.Struct("<III")
+_NONE = 0xFFFFFFFF
+
+IMAGE_SUFFIX = ".termimg"
+
+
+def image_path_for(term_bank_path):
+    """术语库对应的镜像路径：与JSON同目录、同名，扩展名为.termimg"""
+    return os.path.splitext(term_bank_path)[0] + IMAGE_SUFFIX
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def compile_term_bank(term_bank_path, image_path=None):
+    """
+    将术语库JSON编译为二进制镜像
+
+    Args:
+        term_bank_path: 术语库JSON路径
+        image_path: 输出镜像路径，默认与JSON同名
+
+    Returns:
+        镜像路径
+    """
+    image_path = image_path or image_path_for(term_bank_path)
+    stat = os.stat(term_bank_path)
+    source_hash = _file_sha256(term_bank_path)
+    with open(term_bank_path, 'r', encoding='utf-8') as f:
+        terminology_db = TermBank(**json.load(f)).term_bank
+
+    # 小写匹配键 -> {"variant": 正确术语, "correct": [正确术语]}，与TermMatcher的判定规则一致
+    keys = {}
+    for term_entry in terminology_db:
+        correct_term = term_entry.correct_term
+        if correct_term:
+            keys.setdefault(correct_term.lower(), {"variant": None, "correct": []})["correct"].append(correct_term)
+        for variant in term_entry.error_term:
+            if variant:
+                keys.setdefault(variant.lower(), {"variant": None, "correct": []})["variant"] = correct_term
+
+    blob = bytearray()
+    string_offsets = {}
+
+    def intern(text):
+        if text not in string_offsets:
+            data = text.encode("utf-8")
+            string_offsets[text] = (len(blob), len(data))
+            blob.extend(data)
+        return string_offsets[text]
+
+    records = []
+    refs = []
+    max_key_len = 0
+    sorted_keys = sorted(keys, key=lambda k: k.encode("utf-8"))
+    for key in sorted_keys:
+        entry = keys[key]
+        key_off, key_len = intern(key)
+        var_off, var_len = intern(entry["variant"]) if entry["variant"] is not None else (_NONE, 0)
+        records.append((key_off, key_len, var_off, var_len, len(refs), len(entry["correct"])))
+        refs.extend(intern(term) for term in entry["correct"])
+        max_key_len = max(max_key_len, len(key))
+    nodes, edge_chars, edge_children = _build_trie(sorted_keys)
+
+    tmp_path = image_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, stat.st_size, stat.st_mtime_ns, source_hash,
+                             len(records), len(refs), len(blob), max_key_len, len(nodes), len(edge_chars)))
+        for record in records:
+            f.write(_RECORD.pack(*record))
+        for ref in refs:
+            f.write(_REF.pack(*ref))
+        for node in nodes:
+            f.write(_NODE.pack(*node))
+        f.write(struct.pack(f"<{len(edge_chars)}I", *edge_chars))
+        f.write(struct.pack(f"<{len(edge_children)}I", *edge_children))
+        f.write(blob)
+    # 原子替换，正在使用旧镜像的进程不受影响
+    os.replace(tmp_path, image_path)
+    print(f"术语库镜像已生成：{image_path}（{len(records)} 个匹配键）")
+    return image_path
+
+
+def _build_trie(sorted_keys):
+    """
+    按字符构建匹配键的字典树，节点按广度优先编号，每个节点的边连续存放
+
+    Returns:
+        (节点列表 [(首条边序号, 边数, 匹配键序号)], 边字符码位列表, 边目标节点列表)
+    """
+    # 先构建嵌套字典：{字符: 子节点}，"" 键保存匹配键序号
+    root = {}
+    for index, key in enumerate(sorted_keys):
+        node = root
+        for char in key:
+            node = node.setdefault(char, {})
+        node[""] = index
+
+    nodes = []
+    edge_chars = []
+    edge_children = []
+    queue = [root]
+    for node in queue:
+        children = sorted((char, child) for char, child in node.items() if char)
+        nodes.append((len(edge_chars), len(children), node.get("", _NONE)))
+        for char, child in children:
+            edge_chars.append(ord(char))
+            edge_children.append(len(queue))
+            queue.append(child)
+    return nodes, edge_chars, edge_children
+
+
+def _read_header(image_path):
+    with open(image_path, "rb") as f:
+        data = f.read(_HEADER.size)
+    if len(data) < _HEADER.size:
+        return None
+    header = _HEADER.unpack(data)
+    if header[0] != _MAGIC or header[1] != _VERSION:
+        return None
+    return header
+
+
+def is_image_stale(term_bank_path, image_path=None):
+    """镜像不存在、格式不符或源JSON已变化时返回True（大小、时间一致直接视为最新，否则比对SHA-256）"""
+    image_path = image_path or image_path_for(term_bank_path)
+    if not os.path.exists(image_path):
+        return True
+    header = _read_header(image_path)
+    if header is None:
+        return True
+    _, _, source_size, source_mtime_ns, source_hash = header[:5]
+    try:
+        stat = os.stat(term_bank_path)
+    except FileNotFoundError:
+        # 源JSON已删除，回退到JSON加载（加载失败时按空术语库处理）
+        return True
+    if stat.st_size != source_size:
+        return True
+    if stat.st_mtime_ns == source_mtime_ns:
+        return False
+    # 仅修改时间变化（如重新拷贝）时比对内容
+    return _file_sha256(term_bank_path) != source_hash
+
+
+class MappedTermBank:
+    """只读mmap的术语库镜像，按小写键二分查找，或沿字典树匹配"""
+
+    def __init__(self, image_path):
+        with open(image_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (_, _, _, _, _, self.key_count, self.ref_count,
+         blob_len, self.max_key_len, self.node_count, self.edge_count) = _HEADER.unpack_from(self._mm, 0)
+        self._records_off = _HEADER.size
+        self._refs_off = self._records_off + self.key_count * _RECORD.size
+        nodes_off = self._refs_off + self.ref_count * _REF.size
+        chars_off = nodes_off + self.node_count * _NODE.size
+        children_off = chars_off + self.edge_count * 4
+        self._blob_off = children_off + self.edge_count * 4
+        # 各区段为uint32数组，直接以内存视图按下标读取（镜像为小端序，仅在小端序平台上加载，见open_term_bank_image）
+        view = memoryview(self._mm)
+        self.nodes = view[nodes_off:chars_off].cast("I")
+        self.edge_chars = view[chars_off:children_off].cast("I")
+        self.edge_children = view[children_off:self._blob_off].cast("I")
+
+    def _string(self, offset, length):
+        start = self._blob_off + offset
+        return self._mm[start:start + length]
+
+    def _record(self, index):
+        return _RECORD.unpack_from(self._mm, self._records_off + index * _RECORD.size)
+
+    def keys(self):
+        """按顺序返回所有小写匹配键"""
+        for index in range(self.key_count):
+            key_off, key_len = self._record(index)[:2]
+            yield self._string(key_off, key_len).decode("utf-8")
+
+    def lookup(self, lower_key):
+        """
+        查找小写键
+
+        Returns:
+            (变体对应的正确术语或None, [同名正确术语])；键不存在时返回None
+        """
+        target = lower_key.encode("utf-8")
+        low, high = 0, self.key_count
+        while low < high:
+            mid = (low + high) // 2
+            record = self._record(mid)
+            key = self._string(record[0], record[1])
+            if key < target:
+                low = mid + 1
+            elif key > target:
+                high = mid
+            else:
+                return self.entry(mid)
+        return None
+
+    def entry(self, index):
+        """第index个匹配键的 (变体对应的正确术语或None, [同名正确术语])"""
+        _, _, var_off, var_len, ref_start, ref_count = self._record(index)
+        variant = self._string(var_off, var_len).decode("utf-8") if var_off != _NONE else None
+        correct = []
+        for ref_index in range(ref_start, ref_start + ref_count):
+            ref_off, ref_len = _REF.unpack_from(self._mm, self._refs_off + ref_index * _REF.size)
+            correct.append(self._string(ref_off, ref_len).decode("utf-8"))
+        return variant, correct
+
+    def longest_match(self, lowered, start):
+        """
+        从lowered[start]开始沿字典树匹配，返回最长匹配键的 (结束位置, 匹配键序号)，没有匹配时返回None
+        """
+        nodes, edge_chars, edge_children = self.nodes, self.edge_chars, self.edge_children
+        node = 0
+        found = None
+        for position in range(start, len(lowered)):
+            first = nodes[3 * node]
+            last = first + nodes[3 * node + 1]
+            code = ord(lowered[position])
+            edge = bisect.bisect_left(edge_chars, code, first, last)
+            if edge == last or edge_chars[edge] != code:
+                break
+            node = edge_children[edge]
+            key_index = nodes[3 * node + 2]
+            if key_index != _NONE:
+                found = (position + 1, key_index)
+        return found
+
+    def close(self):
+        self.nodes.release()
+        self.edge_chars.release()
+        self.edge_children.release()
+        self._mm.close()
+
+
+def _lower_chars(text):
+    """逐字符转为小写，结果与原文逐字符对齐（小写后变为多个字符的字符保持原样）"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+
+class MappedTermMatcher:
+    """
+    基于mmap镜像的术语匹配器，scan接口与TermMatcher一致
+    直接在镜像中的字典树上匹配：从左到右在每个位置取最长匹配键，匹配后从其结尾继续（与长键优先的正则交替一致）
+    """
+
+    def __init__(self, term_bank):
+        self.term_bank = term_bank
+
+    def scan(self, text_block):
+        """扫描单个文本块，返回 [(错误类型, 错误词, 正确术语, 块内偏移)]"""
+        block_errors = []
+        term_bank = self.term_bank
+        if term_bank.key_count == 0:
+            return block_errors
+
+        lowered = _lower_chars(text_block)
+        # 根节点的边：文本字符不是任何匹配键的首字符时直接跳过
+        root_first = term_bank.nodes[0]
+        root_last = root_first + term_bank.nodes[1]
+        edge_chars = term_bank.edge_chars
+        start = 0
+        length = len(lowered)
+        while start < length:
+            code = ord(lowered[start])
+            edge = bisect.bisect_left(edge_chars, code, root_first, root_last)
+            if edge == root_last or edge_chars[edge] != code:
+                start += 1
+                continue
+            found = term_bank.longest_match(lowered, start)
+            if found is None:
+                start += 1
+                continue
+            end, key_index = found
+            matched_term = text_block[start:end]
+            variant, correct_terms = term_bank.entry(key_index)
+
+            # 检查是否是正确术语本身
+            if correct_terms:
+                for correct_term in correct_terms:
+                    if correct_term != matched_term:
+                        block_errors.append(("术语大小写不规范", matched_term, correct_term, start))
+            # 检查是否是错误变体
+            elif variant is not None:
+                block_errors.append(("术语不规范", matched_term, variant, start))
+            start = end
+
+        return block_errors
+
+
+def open_term_bank_image(term_bank_path):
+    """镜像存在且未过期时返回MappedTermMatcher，否则返回None（调用方回退到JSON加载）"""
+    image_path = image_path_for(term_bank_path)
+    # 镜像中的字典树以uint32数组按本机字节序读取，大端序平台回退到JSON加载
+    if sys.byteorder != "little" or is_image_stale(term_bank_path, image_path):
+        return None
+    return MappedTermMatcher(MappedTermBank(image_path))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python -m Agents.FileReviewAgents.term_bank_image <termBank.json> [...]")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        compile_term_bank(path)
@@ -1,10 +1,21 @@
 """
 1.split_into_textblocks:语法审核、术语库审核使用，不会切分完整句子，按句子分割文本为不超过max_length的块
 2.split_into_blocks:格式审核专用，因为“文本内容提取”是以run为单位，所以可能将完整句子分割
+3.split_into_token_blocks:按token预算分块，优先在段落、句子边界切分，减少语法审核的大模型调用次数
+4.split_paragraphs_into_textblocks:逐段落调用split_into_textblocks，文本块不跨段落，并记录每个块所属段落
 """
 
+import math
 import re
 
+# 中日韩统一表意文字及全角标点，按1个字符≈1个token估算
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+# 英文单词/数字串，按约4个字符≈1个token估算
+_WORD_PATTERN = re.compile(r'[A-Za-z0-9_]+')
+# 句子结尾：中文句末标点直接切分，英文句末标点需后接空白（避免切开3.14、e.g等）
+_SENTENCE_PATTERN = re.compile(r'(?<=[。！？；])|(?<=[.?!;])(?=\s)')
+
+
 def split_into_textblocks(text, max_length):
     """语法审核、术语库审核使用，不会切分完整句子，按句子分割文本为不超过max_length的块"""
 
@@ -28,6 +39,21 @@ def split_into_textblocks(text, max_length):
         text_blocks.append(''.join(current_block))
     return text_blocks
 
+def split_paragraphs_into_textblocks(paragraphs, max_length):
+    """
+    逐段落按句子分块，文本块不跨段落
+
+    Returns:
+        (文本块列表, 每个文本块所属的段落下标列表)
+    """
+    text_blocks = []
+    block_paragraphs = []
+    for paragraph_index, paragraph in enumerate(paragraphs):
+        for text_block in split_into_textblocks(paragraph, max_length):
+            text_blocks.append(text_block)
+            block_paragraphs.append(paragraph_index)
+    return text_blocks, block_paragraphs
+
 def split_into_blocks(styled_content, max_length):
     """格式审核使用"""
     blocks = []
@@ -54,4 +80,152 @@ def split_into_blocks(styled_content, max_length):
     # 处理剩余内容
     if current_block:
         blocks.append({"text": current_text, "styles": current_block})
-    return blocks
\ No newline at end of file
+    return blocks
+
+def estimate_tokens(text):
+    """本地近似估算token数：中文字符约1 token/字，英文单词约4字符/token，其余标点符号各计1 token"""
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    word_tokens = 0
+    word_chars = 0
+    for word in _WORD_PATTERN.findall(text):
+        word_tokens += math.ceil(len(word) / 4)
+        word_chars += len(word)
+    # 剩余的非空白字符（半角标点、符号等）
+    other_count = len(re.sub(r'\s', '', text)) - cjk_count - word_chars
+    return cjk_count + word_tokens + max(other_count, 0)
+
+
+def choose_block_tokens(chunking, prompt_tokens, remaining_tokens=None):
+    """
+    根据模型上下文长度和当前限流余量确定每个文本块的token预算
+
+    Args:
+        chunking: 分块配置（ChunkingConfig）
+        prompt_tokens: 系统提示词的token数
+        remaining_tokens: 服务端返回的剩余token额度（未知时为None）
+
+    Returns:
+        每个文本块的token上限
+    """
+    # 每次调用的开销 = 提示词 + 输入块 + 输出（按输入的output_ratio倍预留）
+    per_token_cost = 1 + chunking.output_ratio
+    context_cap = (chunking.context_window - prompt_tokens) // per_token_cost
+    block_tokens = min(chunking.max_block_tokens, int(context_cap))
+
+    # 限流余量不足时缩小块，保证单次调用不超出剩余额度
+    if remaining_tokens is not None:
+        headroom_cap = (remaining_tokens - prompt_tokens) // per_token_cost
+        block_tokens = min(block_tokens, int(headroom_cap))
+
+    return max(block_tokens, chunking.min_block_tokens)
+
+
+def _split_sentences(paragraph):
+    """按中英文句末标点将段落切分为句子"""
+    return [sent for sent in _SENTENCE_PATTERN.split(paragraph) if sent.strip()]
+
+
+def _split_oversized(sentence, max_tokens):
+    """单个句子超出预算时按字符硬切分（逐字符累计近似token数，英文字符按1/4计）"""
+    pieces = []
+    start = 0
+    tokens = 0.0
+    for idx, char in enumerate(sentence):
+        if char.isspace():
+            cost = 0.0
+        elif _WORD_PATTERN.match(char):
+            cost = 0.25
+        else:
+            cost = 1.0
+        if tokens + cost > max_tokens and idx > start:
+            pieces.append(sentence[start:idx])
+            start = idx
+            tokens = 0.0
+        tokens += cost
+    if start < len(sentence):
+        pieces.append(sentence[start:])
+    return pieces
+
+
+def split_into_token_blocks(text, max_tokens):
+    """
+    按token预算分块：优先整段放入，段落超出预算时按句子切分，句子超出预算时按字符硬切分
+
+    Args:
+        text: 待分块的全文（段落以换行分隔）
+        max_tokens: 每个文本块的token上限
+
+    Returns:
+        文本块列表
+    """
+    text_blocks = []
+    current_block = []  # 当前块中的片段
+    current_tokens = 0  # 当前块的token数
+
+    def flush():
+        nonlocal current_block, current_tokens
+        if current_block:
+            text_blocks.append('\n'.join(current_block))
+        current_block = []
+        current_tokens = 0
+
+    for paragraph in text.split('\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        para_tokens = estimate_tokens(paragraph)
+
+        # 段落可整体放入当前块
+        if current_tokens + para_tokens <= max_tokens:
+            current_block.append(paragraph)
+            current_tokens += para_tokens
+            continue
+
+        # 段落本身不超预算：另起一块，保持段落完整
+        if para_tokens <= max_tokens:
+            flush()
+            current_block.append(paragraph)
+            current_tokens = para_tokens
+            continue
+
+        # 段落超出预算：按句子切分后依次装入
+        flush()
+        sentence_buffer = ""
+        sentence_tokens = 0
+        for sent in _split_sentences(paragraph):
+            sent_tokens = estimate_tokens(sent)
+            if sent_tokens > max_tokens:
+                if sentence_buffer:
+                    text_blocks.append(sentence_buffer)
+                    sentence_buffer, sentence_tokens = "", 0
+                text_blocks.extend(_split_oversized(sent, max_tokens))
+                continue
+            if sentence_tokens + sent_tokens > max_tokens:
+                text_blocks.append(sentence_buffer)
+                sentence_buffer, sentence_tokens = "", 0
+            sentence_buffer += sent
+            sentence_tokens += sent_tokens
+        if sentence_buffer:
+            # 段落尾部留在当前块中，后续段落可继续追加
+            current_block.append(sentence_buffer)
+            current_tokens = sentence_tokens
+
+    flush()
+    return text_blocks
+
+
+def build_chunk_report(text_blocks, prompt_tokens, block_tokens):
+    """统计每个文档的提示词开销与正文token占比"""
+    content_tokens = sum(estimate_tokens(block) for block in text_blocks)
+    overhead_tokens = prompt_tokens * len(text_blocks)
+    total_tokens = content_tokens + overhead_tokens
+    return {
+        "block_count": len(text_blocks),
+        "block_tokens": block_tokens,
+        "prompt_tokens": prompt_tokens,
+        "content_tokens": content_tokens,
+        "overhead_tokens": overhead_tokens,
+        "overhead_ratio": round(overhead_tokens / total_tokens, 4) if total_tokens else 0.0
+    }
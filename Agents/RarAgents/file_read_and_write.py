@@ -1,10 +1,10 @@
 import pandas as pd
-from openpyxl import load_workbook
 from openpyxl.styles import Alignment
+from Agents.RarAgents.template_cache import rar_template_cache
 from Models.RarModels.DomainModels.rar_domain_models import RarData
 from typing import List
-import json
 from pathlib import Path
+from Agents.serialization import json_dump
 
 
 def read_urs_file(file_path: str) -> List[RarData]:
@@ -74,7 +74,8 @@ def write_excel(template_file_path: str,output_file_path:str,rar_data_array: Lis
     output_dir = Path(output_file_path).parent
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    workbook = load_workbook(template_file_path)
+    # 使用缓存模板的副本，避免每次重新解析模板文件
+    workbook = rar_template_cache.clone(template_file_path)
     worksheet = workbook.active
 
     start_row = 6
@@ -133,8 +134,7 @@ def export_to_json(rar_data_array: List[RarData],output_file_path:str) -> None:
     json_path.parent.mkdir(parents=True, exist_ok=True)
 
     # 写入JSON文件
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    json_dump(result, output_file_path, pretty=True)
 
     print(f"JSON数据已保存至: {output_file_path}")
 
@@ -0,0 +1,59 @@
+"""
+RAR Excel模板缓存
+模板只在启动时（或文件修改后）用openpyxl完整解析一次，解析结果序列化为pickle字节常驻内存；
+每次生成结果时反序列化得到独立的工作簿副本，省去重复解析模板XML、样式表和共享字符串的开销
+"""
+import logging
+import os
+import pickle
+import threading
+from pathlib import Path
+from openpyxl import load_workbook
+
+logger = logging.getLogger("rar_analysis")
+
+
+class RarTemplateCache:
+    """按模板路径缓存解析后的工作簿，文件修改（mtime或大小变化）后自动重新加载"""
+
+    def __init__(self):
+        self._entries = {}  # 模板绝对路径 -> {"signature", "image"}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "loads": 0,
+            "reloads": 0
+        }
+
+    def load(self, template_path):
+        """解析模板并缓存（启动时调用，预热缓存）"""
+        self._get_image(template_path)
+
+    def clone(self, template_path):
+        """返回模板工作簿的独立副本，可直接写入和保存"""
+        return pickle.loads(self._get_image(template_path))
+
+    def _get_image(self, template_path):
+        path = str(Path(template_path).resolve())
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry["signature"] == signature:
+                self.stats["hits"] += 1
+                return entry["image"]
+
+            self.stats["reloads" if entry else "loads"] += 1
+            logger.info(f"Parsing RAR template: {path}")
+            image = pickle.dumps(load_workbook(path), protocol=pickle.HIGHEST_PROTOCOL)
+            self._entries[path] = {"signature": signature, "image": image}
+            return image
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, "templates": sorted(self._entries.keys())}
+
+
+# 创建全局模板缓存实例
+rar_template_cache = RarTemplateCache()
@@ -0,0 +1,173 @@
+"""
+JSON、YAML序列化后端
+检测已安装的加速实现并优先使用，未安装时回退到纯Python实现，各后端的输出格式一致（缩进2个空格、不转义非ASCII字符）：
+1.JSON序列化：orjson > 标准库json；orjson无法处理的数据（超过64位的整数、嵌套超过254层等）自动改用标准库json；
+  orjson将NaN、Infinity输出为null，指数形式的浮点数写法也与标准库不同（1e20、0.00001，标准库为1e+20、1e-05），
+  序列化前检查数据中是否包含这类浮点数（非有限值，或绝对值不在[1e-4, 1e16)内的非零值），包含时同样改用标准库json，
+  输出与标准库一致（检查在Python中遍历数据，耗时为orjson序列化的2~5倍，加上检查后仍比标准库json快1.5~5倍）
+  日期时间作为字典的键时（如YAML中的 2020-01-01: x）两个后端都输出为ISO 8601字符串
+  JSON解析始终使用标准库json（C实现的扫描器），orjson会把超过64位的整数解析为浮点数，丢失精度
+2.YAML：libyaml（CSafeLoader、CSafeDumper）> PyYAML纯Python实现（SafeLoader、SafeDumper）
+  libyaml解析失败时改用纯Python实现重新解析，错误信息与纯Python实现一致；
+  libyaml输出的个别写法与纯Python实现不同：
+    键：空字符串不使用"? "，包含回车符（\\r）的键使用"? "；长键使用"? "的阈值按UTF-8字节数计算（纯Python实现按字符数），
+        中文等多字节字符较多时更早使用"? "
+    allow_unicode时：BMP以外的字符（如emoji）转义为\\U形式；NEL（U+0085）转义为\\N，
+        纯Python实现直接输出该字符，再次解析时变为空格（PyYAML的问题），其余写法不同的情况解析结果相同
+get_backends() 返回当前使用的后端和已安装的后端，set_backend() 指定后端（如基准测试中对比各后端）
+"""
+import datetime
+import json
+from typing import Any, Dict
+
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(value: Any) -> Any:
+    """标准库json不支持的日期时间（如YAML中的日期），与orjson一致输出为ISO 8601字符串"""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _iso_keys(data: Any) -> Any:
+    """将字典中日期时间类型的键转换为ISO 8601字符串（default只处理值，标准库json对这类键抛出TypeError）"""
+    if isinstance(data, dict):
+        return {
+            key.isoformat() if isinstance(key, (datetime.date, datetime.time)) else key: _iso_keys(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, (list, tuple)):
+        return [_iso_keys(value) for value in data]
+    return data
+
+
+def _stdlib_json_dumps(data: Any, pretty: bool) -> bytes:
+    if pretty:
+        options = {"indent": 2}
+    else:
+        options = {"separators": (",", ":")}
+    try:
+        text = json.dumps(data, ensure_ascii=False, default=_json_default, **options)
+    except TypeError:
+        # 与orjson（OPT_NON_STR_KEYS）一致：日期时间类型的键输出为ISO 8601字符串，转换后仍不支持时抛出原异常
+        text = json.dumps(_iso_keys(data), ensure_ascii=False, default=_json_default, **options)
+    return text.encode("utf-8")
+
+
+def _has_unportable_float(data: Any) -> bool:
+    """
+    数据（包括字典的键）中是否有orjson与标准库输出不同的浮点数：
+    NaN、Infinity，以及标准库repr使用指数形式的值（绝对值小于1e-4或不小于1e16）
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        # 大多数值为字符串、整数或None，先按类型精确比较跳过，其余再用isinstance判断（包括子类，如OrderedDict）；
+        # 键大多为字符串，只检查非字符串的键
+        kind = type(value)
+        if kind is str or kind is int or value is None:
+            continue
+        if isinstance(value, dict):
+            stack.extend(value.values())
+            stack.extend(key for key in value if type(key) is not str)
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, float):
+            # NaN的比较结果均为False，Infinity不小于1e16，都会被判定为需要改用标准库
+            if value != 0 and not 1e-4 <= abs(value) < 1e16:
+                return True
+    return False
+
+
+def _orjson_dumps(data: Any, pretty: bool) -> bytes:
+    # NaN、Infinity在orjson的输出中与None无法区分，只能在序列化前检查数据
+    if _has_unportable_float(data):
+        return _stdlib_json_dumps(data, pretty)
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+    try:
+        return orjson.dumps(data, option=option)
+    except orjson.JSONEncodeError:
+        return _stdlib_json_dumps(data, pretty)
+
+
+# 后端名称 -> 序列化函数，按优先级排列
+JSON_BACKENDS = {"json": _stdlib_json_dumps}
+if orjson is not None:
+    JSON_BACKENDS = {"orjson": _orjson_dumps, **JSON_BACKENDS}
+
+YAML_BACKENDS = {"pyyaml": (yaml.SafeLoader, yaml.SafeDumper)}
+if getattr(yaml, "__with_libyaml__", False):
+    YAML_BACKENDS = {"libyaml": (yaml.CSafeLoader, yaml.CSafeDumper), **YAML_BACKENDS}
+
+_active = {"json": next(iter(JSON_BACKENDS)), "yaml": next(iter(YAML_BACKENDS))}
+
+
+def get_backends() -> Dict[str, Dict[str, Any]]:
+    """当前使用的后端和已安装的后端"""
+    return {
+        "json": {"active": _active["json"], "available": list(JSON_BACKENDS)},
+        "yaml": {"active": _active["yaml"], "available": list(YAML_BACKENDS)}
+    }
+
+
+def set_backend(kind: str, name: str):
+    """
+    指定JSON或YAML使用的后端（只影响当前进程）
+
+    Raises:
+        ValueError: 类型错误或后端未安装
+    """
+    backends = {"json": JSON_BACKENDS, "yaml": YAML_BACKENDS}.get(kind)
+    if backends is None:
+        raise ValueError(f"不支持的序列化类型: {kind}")
+    if name not in backends:
+        raise ValueError(f"{kind}后端未安装: {name}，可用: {', '.join(backends)}")
+    _active[kind] = name
+
+
+def json_dumpb(data: Any, pretty: bool = False) -> bytes:
+    """
+    序列化为UTF-8 JSON字节
+
+    Args:
+        pretty: 为True时缩进2个空格，否则为不含空白的紧凑格式
+    """
+    return JSON_BACKENDS[_active["json"]](data, pretty)
+
+
+def json_dumps(data: Any, pretty: bool = False) -> str:
+    """序列化为JSON字符串"""
+    return json_dumpb(data, pretty).decode("utf-8")
+
+
+def json_dump(data: Any, file_path, pretty: bool = False):
+    """序列化后直接以字节写入文件"""
+    with open(file_path, "wb") as f:
+        f.write(json_dumpb(data, pretty))
+
+
+def yaml_load(content: str) -> Any:
+    """解析YAML文本"""
+    loader = YAML_BACKENDS[_active["yaml"]][0]
+    if loader is yaml.SafeLoader:
+        return yaml.load(content, Loader=loader)
+    try:
+        return yaml.load(content, Loader=loader)
+    except yaml.YAMLError:
+        # 重新解析得到与纯Python实现一致的错误信息（个别写法也只有纯Python实现接受）
+        return yaml.load(content, Loader=yaml.SafeLoader)
+
+
+def yaml_dump(data: Any, **options) -> str:
+    """序列化为YAML，options传给yaml.dump（如allow_unicode、default_flow_style）"""
+    dumper = YAML_BACKENDS[_active["yaml"]][1]
+    if not isinstance(data, (dict, list)):
+        # 顶层为简单值时libyaml不输出文档结束标记"..."，使用纯Python实现保持输出一致
+        dumper = yaml.SafeDumper
+    return yaml.dump(data, Dumper=dumper, **options)
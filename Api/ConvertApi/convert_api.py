@@ -5,12 +5,16 @@
 """
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Optional
+from urllib.parse import quote
 import logging
 import shutil
 import os
 
-from Agents.FileConvertAgents.convert_run import execute_conversion, get_supported_formats_info
+from Agents.FileConvertAgents.convert_run import execute_conversion, get_supported_formats_info, get_cache_stats, get_planner_stats
+from Agents.FileConvertAgents.conversion_pool import ConversionQueueFullError, get_conversion_pool
+from Agents.serialization import get_backends
 
 router = APIRouter()
 logger = logging.getLogger("convert_api")
@@ -19,12 +23,15 @@ logger = logging.getLogger("convert_api")
 @router.post(
     "/convert",
     summary="文档格式转换",
-    description="支持多种文档格式之间的相互转换"
+    description="支持多种文档格式之间的相互转换，可一次指定多个目标格式"
 )
 async def convert_document(
         background_tasks: BackgroundTasks,
         file: UploadFile = File(..., description="待转换的文档文件"),
-        target_format: str = Form(..., description="目标格式，如: docx,pdf, html, txt, md, json, yaml,xml,csv")
+        target_format: str = Form(..., description="目标格式，如: docx,pdf, html, txt, md, json, yaml,xml,csv；多个格式用逗号分隔时返回zip"),
+        pages: Optional[str] = Form(None, description="只转换指定页（从1开始），如: 1-5,8,10-（仅PDF）"),
+        max_pages: Optional[int] = Form(None, description="最多转换的页数（仅PDF）"),
+        section: Optional[str] = Form(None, description="只转换指定标题下的章节（仅DOCX、Markdown）")
 ):
     """
     文档格式转换接口
@@ -33,13 +40,27 @@ async def convert_document(
         background_tasks: FastAPI后台任务
         file: 上传的文档文件
         target_format: 目标格式
+        pages: 页码范围
+        max_pages: 最多转换的页数
+        section: 章节标题
 
     Returns:
         转换后的文件
     """
     try:
         # 执行转换
-        result = await execute_conversion(file, target_format)
+        result = await execute_conversion(file, target_format, pages, max_pages, section)
+
+        if result["stream"] is not None:
+            # 边转换边返回（分块传输），临时目录在输出结束后清理
+            return StreamingResponse(
+                result["stream"],
+                media_type=result["media_type"],
+                headers={
+                    "Content-Disposition": _content_disposition(result["output_filename"]),
+                    "X-Conversion-Cache": "MISS"
+                }
+            )
 
         # 添加后台清理任务，在响应发送完成后清理临时文件
         background_tasks.add_task(_cleanup_temp_directory, result["temp_dir"])
@@ -47,16 +68,28 @@ async def convert_document(
         return FileResponse(
             result["output_path"],
             media_type=result["media_type"],
-            filename=result["output_filename"]
+            filename=result["output_filename"],
+            headers={"X-Conversion-Cache": "HIT" if result["cache_hit"] else "MISS"}
         )
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ConversionQueueFullError as e:
+        logger.warning(f"Conversion rejected: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         logger.error(f"Conversion failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"转换失败: {str(e)}")
 
 
+def _content_disposition(filename: str) -> str:
+    """与FileResponse相同的下载文件名头"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
 def _cleanup_temp_directory(temp_dir: str):
     """清理临时目录"""
     try:
@@ -69,7 +102,7 @@ def _cleanup_temp_directory(temp_dir: str):
 @router.get(
     "/convert/formats",
     summary="获取支持的转换格式",
-    description="返回所有支持的输入格式及其可转换的目标格式"
+    description="返回所有支持的输入格式及其可转换的目标格式；reachable_formats包含经转换链可到达的格式、转换路径和估计代价（每MiB输入的转换耗时，秒）"
 )
 async def get_supported_formats():
     """
@@ -79,3 +112,39 @@ async def get_supported_formats():
         包含所有支持格式的字典
     """
     return get_supported_formats_info()
+
+
+@router.get(
+    "/convert/pool/stats",
+    summary="转换进程池状态",
+    description="返回转换进程数、忙碌进程数、排队数以及完成、失败、拒绝、替换进程的次数"
+)
+async def get_pool_stats():
+    return get_conversion_pool().get_stats()
+
+
+@router.get(
+    "/convert/cache/stats",
+    summary="转换结果缓存统计",
+    description="返回缓存命中率、节省的输出字节数、条目数和缓存占用空间"
+)
+async def get_conversion_cache_stats():
+    return get_cache_stats()
+
+
+@router.get(
+    "/convert/planner/stats",
+    summary="转换代价统计",
+    description="返回各直接转换按实际耗时测得的代价（每MiB输入的转换耗时，秒）和样本数"
+)
+async def get_conversion_planner_stats():
+    return get_planner_stats()
+
+
+@router.get(
+    "/convert/serialization",
+    summary="序列化后端",
+    description="返回JSON、YAML当前使用的序列化后端（orjson、libyaml等加速实现或标准库、纯Python实现）和已安装的后端"
+)
+async def get_serialization_backends():
+    return get_backends()
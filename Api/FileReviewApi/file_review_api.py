@@ -3,14 +3,18 @@ API路由定义模块
 包含所有API端点和处理逻辑
 """
 
-import os
-import shutil
 import json
 import logging
-from openai import AsyncOpenAI
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File,Query
-from Agents.FileReviewAgents.agent_run_f import agent_file_review_run
-from Models.FileReviewModels.ApiModels.file_review_api_models import FileReviewResult, Example, Config
+from fastapi.responses import StreamingResponse, Response
+from Agents.FileReviewAgents.agent_run_f import agent_file_review_run, agent_file_review_stream
+from Agents.FileReviewAgents.agent_batch_review import agent_batch_review_stream
+from Agents.FileReviewAgents.result_encoding import dumps
+from Agents.FileReviewAgents.review_workspace import create_review_job, create_batch_job, build_result_path, remove_review_job, cleanup_expired, BatchLimitError
+from Agents.FileReviewAgents.review_snapshot import load_snapshot
+from Models.FileReviewModels.ApiModels.file_review_api_models import FileReviewResult, Example
+from Configs.FileReviewConfig.file_review_config_init import file_review_config_registry
 
 # 创建日志记录器
 logger = logging.getLogger("file_review")
@@ -19,33 +23,9 @@ logger = logging.getLogger("file_review")
 router = APIRouter()
 
 def load_file_review_config(agent_id:str):
-    """加载配置参数，按agent_id（例如1或2）加载不同的配置:"""
-    config_path = f'./Configs/FileReviewConfig/fileReviewConfig{agent_id}.json'
+    """加载配置参数，按agent_id（例如1或2）加载不同的配置（由注册表缓存，文件修改后自动重新加载）"""
     try:
-        logger.info(f"Loading configuration for agent ID: {agent_id}")
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
-            # 使用模型解析配置
-            config_obj = Config(**config_data)
-            client = AsyncOpenAI(
-                api_key=config_obj.file_review.api_key,
-                base_url=config_obj.file_review.base_url
-            )
-            # 解析其他固定参数
-            logger.info(f"Configuration loaded successfully for agent ID: {agent_id}")
-            return {
-                "client": client,
-                "model_name": config_obj.file_review.model_name,
-                "term_bank_path": config_obj.file_review.term_bank_path,
-                "file_review_result_path": config_obj.file_review.file_review_result_path,
-                "format_standards": {
-                    item.style_name: {
-                        "font_size": item.font_size,
-                        "font_color": item.font_color,
-                        "allowed_fonts": item.allowed_fonts
-                    } for item in config_obj.file_review.format_standards
-                }
-            }
+        return file_review_config_registry.get(agent_id)
     except FileNotFoundError:
         logger.error(f"Configuration file not found for agent ID: {agent_id}")
         raise HTTPException(status_code=404,detail=f"文件ReviewConfig{agent_id}.json未找到")
@@ -54,7 +34,8 @@ def load_file_review_config(agent_id:str):
 @router.post(
     "/filereview",
     summary="文件审核助手",
-    description="上传文件进行语法、术语、格式审核",
+    description="上传文件进行语法、术语、格式审核；stream=true时以NDJSON流式返回，术语和格式结果先行，语法结果按块陆续返回；compact=true时返回紧凑编码结果（不能与stream同时使用）；"
+                "传入baseline_review_id时按段落与该次审核对比，只审核新增或修改的段落，其余沿用基线结果",
     status_code=200,
     response_model=FileReviewResult,
     responses={
@@ -71,38 +52,151 @@ def load_file_review_config(agent_id:str):
 )
 async def review_file(
         file: UploadFile = File(..., description="上传待审核的文件，仅支持docx格式"),
-        agent_id:str=Query(...,description="agent_id，1或2，由此加载不同的配置文件参数")
+        agent_id:str=Query(...,description="agent_id，1或2，由此加载不同的配置文件参数"),
+        stream:bool=Query(False,description="是否以NDJSON流式返回审核结果"),
+        compact:bool=Query(False,description="是否返回紧凑编码结果（文本块去重引用、同类错误分组）"),
+        baseline_review_id:Optional[str]=Query(None,description="基线审核ID（此前审核返回的review_id），传入时执行增量审核")
 ):
+    job = None
     try:
         logger.info(f"Received file review request: {file.filename}, agent ID: {agent_id}")
-        # 创建临时保存目录
-        temp_dir = "./Files/FileReviewUploads"
-        os.makedirs(temp_dir, exist_ok=True)
+        if stream and compact:
+            # 紧凑编码针对完整的审核结果（文本块去重、同类错误分组），流式记录按块陆续返回，无法编码
+            raise HTTPException(status_code=400, detail="紧凑编码暂不支持流式返回")
         #加载配置文件
         config=load_file_review_config(agent_id)
-        # 保存上传文件
-        file_path = os.path.join(temp_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)  # type: ignore
+        baseline = None
+        if baseline_review_id:
+            if stream:
+                raise HTTPException(status_code=400, detail="增量审核暂不支持流式返回")
+            baseline = load_snapshot(config["file_review_result_path"], baseline_review_id)
+            if baseline is None:
+                raise HTTPException(status_code=404, detail=f"基线审核{baseline_review_id}不存在或已过期")
+        # 清理过期的任务目录和结果文件（按间隔节流）
+        cleanup_expired(config["file_review_result_path"], config["result_retention_hours"])
+        # 每个任务使用独立目录保存上传文件，同时计算内容哈希
+        job = create_review_job(file)
+        file_path = job["file_path"]
+        # 结果文件按内容哈希和任务ID命名，并发审核互不覆盖
+        result_path = build_result_path(config["file_review_result_path"], job["content_hash"], job["job_id"])
 
         logger.info(f"Saved file to: {file_path}")
-        # 调用原有处理逻辑
-        result = await agent_file_review_run(
+        review_kwargs = dict(
             file_path=file_path,
             term_bank_path=config["term_bank_path"],
-            file_review_result_path=config["file_review_result_path"],
+            file_review_result_path=result_path,
             client=config["client"],
             model_name=config["model_name"],
-            format_standards=config["format_standards"]
+            format_standards=config["format_standards"],
+            chunking=config["chunking"],
+            prefilter=config["prefilter"],
+            review_id=job["job_id"]
         )
+        if stream:
+            generator = agent_file_review_stream(**review_kwargs)
+            response = StreamingResponse(
+                _stream_and_cleanup(generator, job["job_dir"], file.filename),
+                media_type="application/x-ndjson"
+            )
+            # 任务目录交由流结束时清理
+            job = None
+            return response
 
-        # 删除上传的文件（如果保留就注释掉）
-        os.remove(file_path)
+        # 调用原有处理逻辑
+        result = await agent_file_review_run(**review_kwargs, compact=compact, baseline=baseline)
         logger.info(f"File review completed for: {file.filename}")
 
+        if compact:
+            return Response(content=dumps(result), media_type="application/json")
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error during file review: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # 删除本次任务的上传目录
+        if job is not None:
+            remove_review_job(job["job_dir"])
 
+
+async def _stream_and_cleanup(generator, job_dir, filename):
+    """转发流式审核记录，结束（或出错、断开）后删除任务目录"""
+    try:
+        async for line in generator:
+            yield line
+        logger.info(f"Streaming file review completed for: {filename}")
+    except Exception as e:
+        logger.error(f"Error during streaming file review: {str(e)}", exc_info=True)
+        yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+    finally:
+        remove_review_job(job_dir)
+
+
+@router.post(
+    "/filereview/batch",
+    summary="批量文件审核",
+    description="上传多个docx文件或包含docx的zip压缩包进行批量审核；以NDJSON流式返回，每个文件完成即返回其结果，最后返回汇总报告（含每分钟处理文档数）"
+)
+async def review_files_batch(
+        files: List[UploadFile] = File(..., description="上传待审核的docx文件（可多选）或zip压缩包"),
+        agent_id:str=Query(...,description="agent_id，1或2，由此加载不同的配置文件参数")
+):
+    job = None
+    try:
+        logger.info(f"Received batch review request: {len(files)} uploads, agent ID: {agent_id}")
+        config=load_file_review_config(agent_id)
+        cleanup_expired(config["file_review_result_path"], config["result_retention_hours"])
+        try:
+            # 文件数和总大小在保存、解压过程中检查，超出时立即中止
+            job = create_batch_job(files, max_files=config["batch"].max_files, max_bytes=config["batch"].max_total_mb * 1024 * 1024)
+        except BatchLimitError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if job["skipped"]:
+            logger.warning(f"Skipped unsupported files in batch: {job['skipped']}")
+        if not job["files"]:
+            raise HTTPException(status_code=400, detail="未找到可审核的docx文件")
+
+        # 批内每个文件使用独立的结果文件
+        result_paths = [
+            build_result_path(config["file_review_result_path"], item["content_hash"], f"{job['job_id']}_{index}")
+            for index, item in enumerate(job["files"])
+        ]
+        generator = agent_batch_review_stream(
+            files=job["files"],
+            result_paths=result_paths,
+            term_bank_path=config["term_bank_path"],
+            client=config["client"],
+            model_name=config["model_name"],
+            format_standards=config["format_standards"],
+            chunking=config["chunking"],
+            prefilter=config["prefilter"],
+            batch=config["batch"],
+            batch_id=job["job_id"]
+        )
+        response = StreamingResponse(
+            _stream_and_cleanup(generator, job["job_dir"], f"batch {job['job_id']}"),
+            media_type="application/x-ndjson"
+        )
+        # 任务目录交由流结束时清理
+        job = None
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error during batch review: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if job is not None:
+            remove_review_job(job["job_dir"])
+
+
+@router.get(
+    "/filereview/config/stats",
+    summary="文件审核配置缓存统计",
+    description="返回配置注册表的命中、加载、重新加载次数及已缓存的agent配置"
+)
+async def get_config_stats():
+    return file_review_config_registry.get_stats()
@@ -8,6 +8,7 @@ from datetime import datetime
 
 from Configs.RarConfig.rar_config_init import rar_config
 from Agents.RarAgents.agent_run_r import run_rar_analysis
+from Agents.RarAgents.template_cache import rar_template_cache
 
 router = APIRouter()
 
@@ -22,6 +23,8 @@ def init_rar_config():
         "template_path": Path("./Files/RarUploads/RAR空白模板.xlsx")
     }
     config["output_dir"].mkdir(parents=True, exist_ok=True)
+    # 启动时预先解析模板，之后每次请求只复制缓存的工作簿；模板文件修改后自动重新加载
+    rar_template_cache.load(config["template_path"])
     logger.info("RAR configuration initialized")
 
 
@@ -88,6 +91,11 @@ async def analyze_urs(
             raise HTTPException(status_code=500, detail=f"处理失败: {str(e)}")
 
 
+@router.get("/rar/template/stats", summary="RAR模板缓存统计")
+async def get_template_stats():
+    return rar_template_cache.get_stats()
+
+
 @router.get("/health", summary="服务健康检查")
 async def health_check():
     logger.debug("Health check requested")
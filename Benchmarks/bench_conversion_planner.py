@@ -0,0 +1,128 @@
+"""
+转换路径规划基准：
+1.测量conversion_map中每个直接转换的代价（每MiB输入的转换耗时，秒）和输出与输入的大小比，
+  输出可填入配置planner.estimatedCosts、planner.estimatedSizeRatios的结果
+2.对比转换链在内存中传递中间结果（convert_chain）与逐步调用转换函数、中间结果写临时文件的耗时
+
+用法：python -m Benchmarks.bench_conversion_planner [PDF页数] [JSON记录数]
+PDF测试文档由reportlab生成（需安装reportlab）
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+from Agents.FileConvertAgents import pdf_converter
+from Agents.FileConvertAgents.conversion_planner import ConversionPlanner, convert_chain
+from Benchmarks.bench_pdf_layout import build_corpus
+from Configs.FileConvertConfig.convert_config_init import conversion_config
+
+
+def build_markdown(sections):
+    parts = []
+    for section in range(sections):
+        parts.append(f"# Chapter {section + 1}\n\nIntro paragraph with **bold**, *italic* and `code` text.\n")
+        parts.append("\n".join(f"- item {item} of list {section}" for item in range(5)) + "\n")
+        parts.append("| name | value |\n| --- | --- |\n" + "\n".join(f"| key{row} | {row * section} |" for row in range(5)) + "\n")
+        parts.append("Closing paragraph. " * 20 + "\n")
+    return "\n".join(parts)
+
+
+def build_samples(temp_dir, page_count, record_count):
+    """生成各输入格式的测试文件，返回 {扩展名: 路径}"""
+    from Agents.FileConvertAgents import md_converter
+
+    samples = {ext: os.path.join(temp_dir, f"sample{ext}") for ext in conversion_config["conversion_map"]}
+    build_corpus(samples[".pdf"], page_count)
+    with open(samples[".md"], "w", encoding="utf-8") as f:
+        f.write(build_markdown(page_count * 4))
+    md_converter.convert_md_to_txt(samples[".md"], samples[".txt"])
+    md_converter.convert_md_to_html(samples[".md"], samples[".html"])
+    md_converter.convert_md_to_docx(samples[".md"], samples[".docx"])
+
+    records = [{"id": index, "name": f"user{index}", "score": index * 1.5, "tags": ["a", "b"]} for index in range(record_count)]
+    with open(samples[".json"], "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2)
+    for ext in (".yaml", ".yml"):
+        with open(samples[ext], "w", encoding="utf-8") as f:
+            yaml.dump(records, f)
+    return samples
+
+
+def measure_edges(samples, temp_dir):
+    """逐个执行直接转换，返回 ({源格式: {目标格式: 每MiB耗时}}, {源格式: {目标格式: 大小比}})"""
+    costs = {}
+    ratios = {}
+    for source_ext, target_info in conversion_config["conversion_map"].items():
+        size_mib = os.path.getsize(samples[source_ext]) / (1024 * 1024)
+        for target_ext in target_info["target_formats"]:
+            pdf_converter._layout_cache.clear()
+            output_path = os.path.join(temp_dir, f"edge{target_ext}")
+            try:
+                timings = convert_chain(samples[source_ext], output_path, [source_ext, target_ext])
+            except Exception as e:
+                print(f"{source_ext} -> {target_ext:<6} 失败: {e}")
+                continue
+            _, _, seconds, input_bytes, output_bytes = timings[0]
+            costs.setdefault(source_ext, {})[target_ext] = round(seconds / size_mib, 3)
+            ratios.setdefault(source_ext, {})[target_ext] = round(output_bytes / input_bytes, 2)
+            print(f"{source_ext} -> {target_ext:<6} {size_mib:>7.2f} MiB {seconds:>8.3f} s "
+                  f"{costs[source_ext][target_ext]:>9.3f} s/MiB  大小比 {ratios[source_ext][target_ext]:.2f}")
+    return costs, ratios
+
+
+def chain_with_files(input_path, path, temp_dir):
+    """逐步调用 convert_{源格式}_to_{目标格式}，中间结果写临时文件"""
+    import importlib
+
+    current_path = input_path
+    for index, (source_ext, target_ext) in enumerate(zip(path, path[1:])):
+        converter_name = conversion_config["conversion_map"][source_ext]["converter"]
+        module = importlib.import_module(f"Agents.FileConvertAgents.{converter_name}")
+        output_path = os.path.join(temp_dir, f"files_{index}{target_ext}")
+        getattr(module, f"convert_{source_ext[1:]}_to_{target_ext[1:]}")(current_path, output_path)
+        current_path = output_path
+    return current_path
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    record_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        samples = build_samples(temp_dir, page_count, record_count)
+
+        print("直接转换代价")
+        costs, ratios = measure_edges(samples, temp_dir)
+        print(json.dumps({"estimatedCosts": costs, "estimatedSizeRatios": ratios}, indent=4))
+
+        planner = ConversionPlanner(conversion_config["conversion_map"], estimated_costs=costs, estimated_size_ratios=ratios,
+                                    excluded_intermediates=conversion_config.get("planner", {}).get("excludedIntermediates", []))
+
+        print("\n转换链              内存传递      临时文件  输出一致")
+        for source_ext, target_ext in [(".pdf", ".docx"), (".txt", ".docx"), (".yaml", ".csv"), (".yaml", ".xml")]:
+            route = planner.plan(source_ext, target_ext)
+            if route is None:
+                print(f"{source_ext} -> {target_ext} 不可到达")
+                continue
+            memory_output = os.path.join(temp_dir, f"memory{target_ext}")
+            pdf_converter._layout_cache.clear()
+            start = time.perf_counter()
+            convert_chain(samples[source_ext], memory_output, list(route.path))
+            memory_elapsed = time.perf_counter() - start
+
+            pdf_converter._layout_cache.clear()
+            start = time.perf_counter()
+            files_output = chain_with_files(samples[source_ext], route.path, temp_dir)
+            files_elapsed = time.perf_counter() - start
+
+            with open(memory_output, "rb") as f1, open(files_output, "rb") as f2:
+                # docx为zip格式，包含写入时间，只比较文本格式
+                same = f1.read() == f2.read() if target_ext != ".docx" else "-"
+            print(f"{' -> '.join(route.path):<18} {memory_elapsed:>8.3f} s {files_elapsed:>9.3f} s  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+流式转换首字节时间基准：分别按文件方式和流式方式在转换进程池中执行PDF→TXT/MD/HTML，
+输出文件方式的总耗时（即原先的首字节时间）、流式方式的首字节时间和总耗时
+
+用法：python -m Benchmarks.bench_convert_stream [页数] [PDF路径]
+未指定PDF时使用reportlab生成测试文档（需安装reportlab）；每次测量使用新的工作进程，避免版面分析缓存影响结果
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from Agents.FileConvertAgents.conversion_pool import ConversionPool
+from Benchmarks.bench_pdf_layout import build_corpus
+
+
+async def measure_file(input_path, output_path, target):
+    pool = ConversionPool(workers=1)
+    try:
+        await pool.run("pdf_converter", "get_page_count", input_path)  # 等待工作进程完成预加载
+        start = time.perf_counter()
+        await pool.run("pdf_converter", f"convert_pdf_to_{target}", input_path, output_path)
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+
+async def measure_stream(input_path, target):
+    pool = ConversionPool(workers=1)
+    try:
+        await pool.run("pdf_converter", "get_page_count", input_path)
+        start = time.perf_counter()
+        first_byte = None
+        chunk_count = 0
+        async for _ in pool.stream("pdf_converter", f"stream_pdf_to_{target}", input_path):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            chunk_count += 1
+        return first_byte, time.perf_counter() - start, chunk_count
+    finally:
+        pool.shutdown()
+
+
+async def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(temp_dir, "corpus.pdf")
+        if len(sys.argv) <= 2:
+            build_corpus(input_path, page_count)
+        print(f"文档 {input_path}，{os.path.getsize(input_path) / 1024:.0f} KiB，CPU核数 {os.cpu_count()}")
+        print(f"{'格式':<6} {'文件方式':>10} {'流式首字节':>10} {'流式总耗时':>10} {'片段数':>6}")
+
+        for target in ("txt", "md", "html"):
+            file_elapsed = await measure_file(input_path, os.path.join(temp_dir, f"out.{target}"), target)
+            first_byte, stream_elapsed, chunk_count = await measure_stream(input_path, target)
+            print(f"{target:<6} {file_elapsed:>9.2f}s {first_byte:>9.2f}s {stream_elapsed:>9.2f}s {chunk_count:>6}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+多目标格式转换基准：对比逐个调用转换函数（每个目标格式解析一次DOCX）与convert_to_targets（解析一次、渲染多次）
+
+用法：python -m Benchmarks.bench_document_model [段落数] [DOCX路径]
+未指定DOCX时生成包含标题、格式化段落、列表和表格的测试文档
+"""
+import os
+import sys
+import tempfile
+import time
+from docx import Document
+from Agents.FileConvertAgents import docx_converter
+from Agents.FileConvertAgents.document_model import convert_to_targets
+
+TARGETS = (".html", ".md", ".txt")
+
+
+def build_corpus(path, paragraph_count):
+    doc = Document()
+    for index in range(paragraph_count):
+        if index % 20 == 0:
+            doc.add_heading(f"Section {index // 20 + 1}", 1)
+        paragraph = doc.add_paragraph(f"Paragraph {index}: the quick brown fox ")
+        paragraph.add_run("jumps over").bold = True
+        paragraph.add_run(" the lazy dog.")
+        if index % 10 == 0:
+            doc.add_paragraph(f"List item {index}", style="List Bullet")
+        if index % 50 == 0:
+            table = doc.add_table(rows=4, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = "cell"
+    doc.save(path)
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed:>8.2f} s")
+    return elapsed
+
+
+def main():
+    paragraph_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(temp_dir, "corpus.docx")
+        if len(sys.argv) <= 2:
+            build_corpus(input_path, paragraph_count)
+        print(f"文档 {input_path}，{os.path.getsize(input_path) / 1024:.0f} KiB，目标格式 {', '.join(TARGETS)}")
+
+        def separately():
+            for target_ext in TARGETS:
+                getattr(docx_converter, f"convert_docx_to_{target_ext[1:]}")(input_path, os.path.join(temp_dir, f"a{target_ext}"))
+
+        outputs = [(target_ext, os.path.join(temp_dir, f"b{target_ext}")) for target_ext in TARGETS]
+        separate_elapsed = measure("逐个格式转换（每次解析）", separately)
+        shared_elapsed = measure("共用文档树转换", lambda: convert_to_targets(input_path, ".docx", outputs, "docx_converter"))
+        print(f"加速比 {separate_elapsed / shared_elapsed:.2f}x")
+        for target_ext, path in outputs:
+            with open(path, "rb") as f, open(os.path.join(temp_dir, f"a{target_ext}"), "rb") as g:
+                print(f"{target_ext} 输出一致: {f.read() == g.read()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+DOCX -> PDF渲染基准：
+1.冷启动：每次转换在新进程中执行（加载.NET运行时、字体缓存后渲染），对应未预热时每个请求的开销
+2.预热进程池：转换进程池启动时预热渲染引擎，所有文档并发提交，统计吞吐量（文档数/分钟）、延迟和进程常驻内存
+3.排版回调（超时、页数检查）的额外开销：同一进程内对比有无回调的渲染耗时
+
+用法：python -m Benchmarks.bench_docx_pdf [文档数] [每个文档的章节数] [进程数]
+需要在配置pdfRendering.licensePath中指定aspose.words许可证（未授权时不提供DOCX转PDF）
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def build_corpus(path, sections):
+    """生成测试文档：每个章节包含标题、中英文段落、列表和表格"""
+    from docx import Document
+
+    doc = Document()
+    for section in range(sections):
+        doc.add_heading(f"第{section + 1}章 Chapter {section + 1}", 1)
+        for number in range(3):
+            doc.add_paragraph(f"段落{number}：系统应支持电子签名，签名记录包含签名人、时间和签名含义。"
+                              "The system shall record who signed, when, and why. " * 4)
+        for item in range(4):
+            doc.add_paragraph(f"要求 {item + 1}：审计追踪不可修改", style="List Bullet")
+        table = doc.add_table(rows=5, cols=3)
+        table.style = "Table Grid"
+        for row in range(5):
+            for column in range(3):
+                table.cell(row, column).text = f"R{row}C{column}"
+    doc.save(path)
+
+
+def run_child(input_path, output_path):
+    """子进程：冷启动执行一次转换"""
+    from Agents.FileConvertAgents import docx_converter
+
+    docx_converter.convert_docx_to_pdf(input_path, output_path)
+
+
+def measure_cold(inputs, temp_dir):
+    latencies = []
+    for index, input_path in enumerate(inputs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "Benchmarks.bench_docx_pdf", "--run", input_path, os.path.join(temp_dir, f"cold_{index}.pdf")],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}")
+        latencies.append(time.perf_counter() - start)
+    return sum(latencies), latencies
+
+
+async def measure_warm(inputs, temp_dir, workers):
+    from Agents.FileConvertAgents.conversion_pool import ConversionPool, _rss_bytes
+
+    start = time.perf_counter()
+    pool = ConversionPool(workers=workers, max_queue=len(inputs))
+    # 进程预热完成后才开始执行任务，每个进程执行一次warm_up以等待所有进程就绪
+    await asyncio.gather(*[pool.run("docx_converter", "warm_up") for _ in range(workers)])
+    ready = time.perf_counter() - start
+    try:
+        async def convert(index, input_path):
+            begin = time.perf_counter()
+            await pool.run("docx_converter", "convert_docx_to_pdf", input_path, os.path.join(temp_dir, f"warm_{index}.pdf"))
+            return time.perf_counter() - begin
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*[convert(index, path) for index, path in enumerate(inputs)])
+        elapsed = time.perf_counter() - start
+        rss = [_rss_bytes(worker.process.pid) or 0 for worker in pool._workers]
+    finally:
+        pool.shutdown()
+    return ready, elapsed, list(latencies), rss
+
+
+def measure_guard(input_path, temp_dir, repeat=5):
+    """同一进程内对比有无排版回调的渲染耗时（已预热）"""
+    from Agents.FileConvertAgents.docx_renderer import DocxPdfRenderer
+
+    guarded = DocxPdfRenderer(timeout_seconds=600, max_pages=100000)
+    plain = DocxPdfRenderer(timeout_seconds=0, max_pages=0)
+    guarded.warm_up()
+    output_path = os.path.join(temp_dir, "guard.pdf")
+    times = {"回调": [], "无回调": []}
+    for _ in range(repeat):
+        for label, renderer in (("回调", guarded), ("无回调", plain)):
+            start = time.perf_counter()
+            renderer.render(input_path, output_path)
+            times[label].append(time.perf_counter() - start)
+    return {label: min(values) for label, values in times.items()}
+
+
+def _summary(latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50 {statistics.median(ordered):.2f}s p95 {p95:.2f}s"
+
+
+def main():
+    doc_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    sections = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        inputs = []
+        for index in range(doc_count):
+            path = os.path.join(temp_dir, f"doc_{index}.docx")
+            build_corpus(path, sections)
+            inputs.append(path)
+
+        from pdfminer.high_level import extract_pages
+
+        cold_total, cold_latencies = measure_cold(inputs[:min(3, doc_count)], temp_dir)
+        pages = sum(1 for _ in extract_pages(os.path.join(temp_dir, "cold_0.pdf")))
+        print(f"文档数 {doc_count}，每个文档 {pages} 页，进程数 {workers}")
+        print(f"冷启动      每个文档 {cold_total / len(cold_latencies):.2f}s  "
+              f"吞吐量 {60 * len(cold_latencies) / cold_total:.1f} 文档/分钟（单进程）")
+
+        ready, elapsed, latencies, rss = asyncio.run(measure_warm(inputs, temp_dir, workers))
+        print(f"预热进程池  启动并预热 {ready:.2f}s  总耗时 {elapsed:.2f}s  {_summary(latencies)}  "
+              f"吞吐量 {60 * doc_count / elapsed:.1f} 文档/分钟  进程常驻内存 {max(rss) / (1024 * 1024):.0f} MiB")
+
+        guard = measure_guard(inputs[0], temp_dir)
+        print(f"排版回调    有 {guard['回调']:.3f}s  无 {guard['无回调']:.3f}s  "
+              f"开销 {100 * (guard['回调'] / guard['无回调'] - 1):.1f}%")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run_child(*sys.argv[2:4])
+    else:
+        main()
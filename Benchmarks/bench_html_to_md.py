@@ -0,0 +1,240 @@
+"""
+HTML -> Markdown基准：在多MB的HTML导出页面上对比原实现（BeautifulSoup构建整棵树后遍历）与单遍解析（html_stream，
+分别使用lxml和html.parser后端，边解析边输出）的耗时和峰值内存，并检查输出一致
+每次转换在单独的子进程中执行，峰值内存取子进程的最大常驻内存（ru_maxrss）
+
+用法：python -m Benchmarks.bench_html_to_md [大小MB,逗号分隔] [方式,逗号分隔]
+例如：python -m Benchmarks.bench_html_to_md 2,10,50 bs4,lxml,html.parser
+原实现所需内存（按BS4_MEMORY_FACTOR倍文件大小估计）超过可用内存时跳过
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from Benchmarks.bench_json_stream import _available_bytes, _same_file
+
+# 原实现所需内存与文件大小之比的估计值
+BS4_MEMORY_FACTOR = 40
+
+
+def build_section(index):
+    """导出页面的一节：标题、带行内格式的段落、嵌套列表、表格、代码块和零散的行内内容"""
+    parts = [f'<div class="section" id="s{index}">\n<h2>Section {index} <small>rev</small></h2>\n']
+    for number in range(5):
+        parts.append(f'<p>Paragraph {number} with <strong>bold text</strong>, <em>italic</em>, '
+                     f'<a href="https://example.com/{index}/{number}">a link</a>, <code>code()</code> '
+                     f'and &amp; entities &lt;tag&gt; 中文内容。<br>\nSecond line</p>\n')
+    parts.append('<ul>\n' + ''.join(f'  <li>Item {item} <b>bold</b>\n    <ol><li>nested {item}</li><li>nested b</li></ol>\n  </li>\n'
+                                    for item in range(3)) + '</ul>\n')
+    parts.append('<table>\n<thead><tr><th>Name</th><th>Value</th><th>Note</th></tr></thead>\n<tbody>\n'
+                 + ''.join(f'<tr><td>key{row}</td><td>{row * index}</td><td>note | pipe</td></tr>\n' for row in range(6))
+                 + '</tbody>\n</table>\n')
+    parts.append('<pre><code class="language-python">def f(x):\n    return x &lt; 1\n</code></pre>\n')
+    parts.append('<div><span>loose inline</span> text <img src="a.png" alt="pic"> tail</div>\n'
+                 '<blockquote><p>quoted</p></blockquote>\n<hr>\n</div>\n')
+    return ''.join(parts)
+
+
+def build_corpus(path, size_mb):
+    """生成指定大小的HTML导出页面"""
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>Export</title>'
+                '<style>p { color: #333; }</style><script>var html = "<p>";</script></head>\n<body>\n')
+        written = 0
+        index = 0
+        while written < target:
+            index += 1
+            section = build_section(index)
+            f.write(section)
+            written += len(section.encode("utf-8"))
+        f.write('</body>\n</html>\n')
+
+
+# ==================== 原实现 ====================
+
+def bs4_html_to_md(input_path, output_path):
+    """原HTML -> Markdown实现：BeautifulSoup（html.parser）构建整棵树，按文档顺序遍历生成文档树后渲染"""
+    from bs4 import BeautifulSoup, NavigableString, Tag
+
+    from Agents.FileConvertAgents import document_model
+    from Agents.FileConvertAgents.document_model import CodeBlock, Heading, Paragraph, Run, Table, add_list_item, append_run
+    from Agents.FileConvertAgents.html_stream import (_HEADING_TAGS, _INLINE_FORMATS, _INLINE_TAGS, _PARAGRAPH_TAGS,
+                                                      _SKIPPED_TAGS, _WHITESPACE, _clean_line_breaks, _code_language)
+
+    def inline_runs(children, runs, style):
+        for child in children:
+            if isinstance(child, NavigableString):
+                if type(child) is NavigableString:
+                    append_run(runs, style._replace(text=_WHITESPACE.sub(' ', str(child))))
+                continue
+            name = child.name
+            if name in _SKIPPED_TAGS:
+                continue
+            if name == "br":
+                append_run(runs, style._replace(text="\n"))
+            elif name == "img":
+                if child.get("src"):
+                    runs.append(Run(child.get("alt", ""), image=child["src"]))
+            elif name in _INLINE_FORMATS:
+                inline_runs(child.children, runs, style._replace(**{_INLINE_FORMATS[name]: True}))
+            elif name == "a" and child.get("href"):
+                inline_runs(child.children, runs, style._replace(href=child["href"]))
+            else:
+                inline_runs(child.children, runs, style)
+
+    def table_rows(table):
+        rows = []
+        header_rows = 0
+        for tr in table.find_all("tr"):
+            if tr.find_parent("table") is not table:
+                continue
+            cells = tr.find_all(["td", "th"], recursive=False)
+            if not cells:
+                continue
+            in_head = tr.parent is not None and tr.parent.name == "thead"
+            if (in_head or all(cell.name == "th" for cell in cells)) and header_rows == len(rows):
+                header_rows += 1
+            rows.append([_WHITESPACE.sub(' ', cell.get_text()).strip() for cell in cells])
+        return rows, header_rows
+
+    blocks = []
+    pending = []
+
+    def flush():
+        runs = _clean_line_breaks(pending)
+        if runs:
+            blocks.append(Paragraph(runs))
+        pending.clear()
+
+    def walk_list(list_tag, ordered, depth):
+        for li in list_tag.find_all("li", recursive=False):
+            runs = []
+            nested = []
+            for child in li.children:
+                if isinstance(child, Tag) and child.name in ("ul", "ol"):
+                    nested.append(child)
+                else:
+                    inline_runs((child,), runs, Run(""))
+            add_list_item(blocks, ordered, depth, _clean_line_breaks(runs))
+            for child in nested:
+                walk_list(child, child.name == "ol", depth + 1)
+
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if type(child) is NavigableString:
+                    append_run(pending, Run(_WHITESPACE.sub(' ', str(child))))
+                continue
+            name = child.name
+            if name in _SKIPPED_TAGS:
+                continue
+            if name in _HEADING_TAGS or name in _PARAGRAPH_TAGS:
+                flush()
+                runs = []
+                inline_runs(child.children, runs, Run(""))
+                runs = _clean_line_breaks(runs)
+                if runs:
+                    blocks.append(Heading(_HEADING_TAGS[name], runs) if name in _HEADING_TAGS else Paragraph(runs))
+            elif name in ("ul", "ol"):
+                flush()
+                walk_list(child, name == "ol", 0)
+            elif name == "table":
+                flush()
+                rows, header_rows = table_rows(child)
+                if rows:
+                    blocks.append(Table(rows, header_rows))
+            elif name == "pre":
+                flush()
+                text = child.get_text()
+                if text.strip():
+                    code = child.find("code")
+                    blocks.append(CodeBlock(text.strip('\n'), _code_language((code.get("class", []) if code else []) + child.get("class", []))))
+            elif name == "hr":
+                flush()
+            elif name in _INLINE_TAGS:
+                inline_runs((child,), pending, Run(""))
+            else:
+                flush()
+                walk(child)
+
+    with open(input_path, "r", encoding="utf-8") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    title_tag = soup.find("title")
+    walk(soup.body or soup)
+    flush()
+    document = document_model.Document(blocks, title_tag.get_text().strip() if title_tag else "")
+    document_model.write_document(document, ".md", output_path)
+
+
+# ==================== 测量 ====================
+
+def run_child(mode, input_path, output_path):
+    """子进程：执行一次转换，输出耗时和峰值内存（MiB）"""
+    from Agents.FileConvertAgents import document_model, html_stream
+
+    start = time.perf_counter()
+    if mode == "bs4":
+        bs4_html_to_md(input_path, output_path)
+    else:
+        with open(input_path, "r", encoding="utf-8") as f, open(output_path, "w", encoding="utf-8") as out:
+            document_model.write_md(html_stream.iter_blocks(f, parser=mode), out)
+    elapsed = time.perf_counter() - start
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"elapsed": elapsed, "peak_mib": peak_mib}))
+
+
+def measure(mode, input_path, output_path):
+    result = subprocess.run(
+        [sys.executable, "-m", "Benchmarks.bench_html_to_md", "--run", mode, input_path, output_path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}"
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    from Agents.FileConvertAgents.html_stream import PARSERS
+
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "2,10").split(",")]
+    modes = (sys.argv[2] if len(sys.argv) > 2 else ",".join(("bs4",) + PARSERS)).split(",")
+    available = _available_bytes()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        print(f"{'大小':>8} {'方式':<12} {'耗时(s)':>9} {'峰值内存(MiB)':>14}")
+        for size_mb in sizes:
+            input_path = os.path.join(temp_dir, "export.html")
+            build_corpus(input_path, size_mb)
+            file_size = os.path.getsize(input_path)
+            reference = None
+            for mode in modes:
+                if mode == "bs4" and available is not None and file_size * BS4_MEMORY_FACTOR > available:
+                    print(f"{size_mb:>6}MB {mode:<12} {'跳过（内存不足）':>9}")
+                    continue
+                output_path = os.path.join(temp_dir, f"out_{mode}.md")
+                stats, error = measure(mode, input_path, output_path)
+                if stats is None:
+                    print(f"{size_mb:>6}MB {mode:<12} 失败: {error}")
+                    continue
+                same = ""
+                if reference is None:
+                    reference = output_path
+                else:
+                    same = "输出一致" if _same_file(reference, output_path) else "输出不一致"
+                    os.remove(output_path)
+                print(f"{size_mb:>6}MB {mode:<12} {stats['elapsed']:>9.2f} {stats['peak_mib']:>14.1f}  {same}")
+            if reference is not None:
+                os.remove(reference)
+            os.remove(input_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run_child(*sys.argv[2:5])
+    else:
+        main()
@@ -0,0 +1,161 @@
+"""
+JSON流式转换基准：对比整体读取（json.load）与流式转换（增量解析、逐条写入）的耗时和峰值内存
+XML另对比原实现（ElementTree构建整个文档，minidom重新解析后格式化），并检查输出一致
+每次转换在单独的子进程中执行，峰值内存取子进程的最大常驻内存（ru_maxrss）
+
+用法：python -m Benchmarks.bench_json_stream [大小MB,逗号分隔] [目标格式,逗号分隔]
+例如：python -m Benchmarks.bench_json_stream 10,1024,5120 csv,html,xml
+整体读取、XML原实现所需内存（按LOAD_MEMORY_FACTOR、MINIDOM_MEMORY_FACTOR倍文件大小估计）超过可用内存时跳过
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from xml.dom import minidom
+from xml.etree import ElementTree as ET
+
+# 各方式所需内存与文件大小之比的估计值
+LOAD_MEMORY_FACTOR = 20
+MINIDOM_MEMORY_FACTOR = 80
+
+
+def build_corpus(path, size_mb):
+    """生成指定大小的JSON记录数组（重复同一批记录，解析开销与真实数据相当）"""
+    records = [
+        {
+            "id": index,
+            "name": f"用户{index}",
+            "email": f"user{index}@example.com",
+            "score": index * 1.25,
+            "active": index % 3 == 0,
+            "tags": ["alpha", "beta"][:index % 3],
+            "address": {"city": "上海", "zip": f"{200000 + index}"},
+            "note": None
+        }
+        for index in range(10000)
+    ]
+    block = ",\n".join(json.dumps(record, ensure_ascii=False) for record in records)
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        written = 0
+        while written < target:
+            if written:
+                f.write(",\n")
+            f.write(block)
+            written += len(block.encode("utf-8"))
+        f.write("\n]\n")
+
+
+def _available_bytes():
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _dict_to_xml(data, parent, key="item"):
+    if isinstance(data, dict):
+        for k, v in data.items():
+            _dict_to_xml(v, ET.SubElement(parent, k), k)
+    elif isinstance(data, list):
+        for item in data:
+            _dict_to_xml(item, ET.SubElement(parent, key), "item")
+    else:
+        parent.text = str(data)
+
+
+def minidom_json_to_xml(input_path, output_path):
+    """原JSON -> XML实现：构建ElementTree，序列化后用minidom重新解析并格式化，再去掉XML声明"""
+    with open(input_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    root = ET.Element("root")
+    _dict_to_xml(data, root)
+    xml_content = minidom.parseString(ET.tostring(root, encoding="utf-8")).toprettyxml(indent="  ", encoding="utf-8").decode("utf-8")
+    lines = xml_content.split("\n")
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines[1:]))
+
+
+def _same_file(path1, path2, block_size=1024 * 1024):
+    with open(path1, "rb") as f1, open(path2, "rb") as f2:
+        while True:
+            block1, block2 = f1.read(block_size), f2.read(block_size)
+            if block1 != block2:
+                return False
+            if not block1:
+                return True
+
+
+def run_child(target, mode, input_path, output_path):
+    """子进程：执行一次转换，输出耗时和峰值内存（MiB）"""
+    from Agents.FileConvertAgents import json_converter
+
+    start = time.perf_counter()
+    if mode == "minidom":
+        minidom_json_to_xml(input_path, output_path)
+    else:
+        getattr(json_converter, f"convert_json_to_{target}")(input_path, output_path, stream=(mode == "stream"))
+    elapsed = time.perf_counter() - start
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"elapsed": elapsed, "peak_mib": peak_mib}))
+
+
+def measure(target, mode, input_path, output_path):
+    result = subprocess.run(
+        [sys.executable, "-m", "Benchmarks.bench_json_stream", "--run", target, mode, input_path, output_path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}"
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "10").split(",")]
+    targets = (sys.argv[2] if len(sys.argv) > 2 else "csv,html,yaml,xml").split(",")
+    available = _available_bytes()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        print(f"{'大小':>8} {'格式':<5} {'方式':<7} {'耗时(s)':>9} {'峰值内存(MiB)':>14}")
+        for size_mb in sizes:
+            input_path = os.path.join(temp_dir, "corpus.json")
+            build_corpus(input_path, size_mb)
+            file_size = os.path.getsize(input_path)
+            for target in targets:
+                modes = ("minidom", "load", "stream") if target == "xml" else ("load", "stream")
+                reference = None
+                for mode in modes:
+                    factor = {"minidom": MINIDOM_MEMORY_FACTOR, "load": LOAD_MEMORY_FACTOR}.get(mode)
+                    if factor and available is not None and file_size * factor > available:
+                        print(f"{size_mb:>6}MB {target:<5} {mode:<7} {'跳过（内存不足）':>9}")
+                        continue
+                    output_path = os.path.join(temp_dir, f"out_{mode}.{target}")
+                    stats, error = measure(target, mode, input_path, output_path)
+                    if stats is None:
+                        print(f"{size_mb:>6}MB {target:<5} {mode:<7} 失败: {error}")
+                        continue
+                    same = ""
+                    if reference is None:
+                        reference = output_path
+                    else:
+                        same = "输出一致" if _same_file(reference, output_path) else "输出不一致"
+                        os.remove(output_path)
+                    print(f"{size_mb:>6}MB {target:<5} {mode:<7} {stats['elapsed']:>9.2f} {stats['peak_mib']:>14.1f}  {same}")
+                if reference is not None:
+                    os.remove(reference)
+            os.remove(input_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run_child(*sys.argv[2:6])
+    else:
+        main()
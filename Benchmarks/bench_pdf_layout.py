@@ -0,0 +1,96 @@
+"""
+PDF转HTML/Markdown基准：对比原先的两遍版面分析（calculate_average_font_size + extract_pages）与一次版面分析
+
+用法：python -m Benchmarks.bench_pdf_layout [页数] [PDF路径]
+未指定PDF时使用reportlab生成测试文档（需安装reportlab）
+"""
+import os
+import sys
+import tempfile
+import time
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LAParams, LTTextContainer
+from Agents.FileConvertAgents import pdf_converter
+from Agents.FileConvertAgents.pdf_converter import (LAYOUT_PARAMS, analyze_pdf_layout, render_layout_html, render_layout_md,
+                                                    calculate_average_font_size, get_text_formatting, is_heading, format_text_to_html)
+
+
+def build_corpus(path, page_count):
+    """生成包含标题、粗体、斜体、彩色文字的多页PDF"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    for page in range(page_count):
+        y = 800
+        pdf.setFont("Helvetica-Bold", 20)
+        pdf.drawString(60, y, f"Chapter {page + 1}")
+        y -= 40
+        for paragraph in range(8):
+            pdf.setFont("Helvetica-Bold", 14)
+            pdf.drawString(60, y, f"Section {page + 1}.{paragraph + 1}")
+            y -= 22
+            for line in range(4):
+                pdf.setFont("Helvetica", 10)
+                pdf.setFillColorRGB(0, 0, 0)
+                pdf.drawString(60, y, f"Line {line} of paragraph {paragraph}: the quick brown fox jumps over the lazy dog.")
+                pdf.setFont("Helvetica-Oblique", 10)
+                pdf.setFillColorRGB(0.8, 0.1, 0.1)
+                pdf.drawString(420, y, "emphasis")
+                y -= 14
+            y -= 10
+        pdf.showPage()
+    pdf.save()
+
+
+def two_pass_html(input_path):
+    """原实现：先完整分析一遍统计字号，再分析一遍渲染"""
+    avg_font_size = calculate_average_font_size(input_path)
+    html_parts = []
+    for page_num, page_layout in enumerate(extract_pages(input_path, laparams=LAParams(**LAYOUT_PARAMS)), 1):
+        page_html = f'<div class="page" data-page="{page_num}">\n'
+        for element in page_layout:
+            if isinstance(element, LTTextContainer):
+                formatted_texts = get_text_formatting(element)
+                if not formatted_texts:
+                    continue
+                heading_level = is_heading(formatted_texts[0].get('format', {}), avg_font_size)
+                tag = f'h{heading_level}' if heading_level > 0 else 'p'
+                page_html += f'<{tag}>' + ''.join(format_text_to_html(item) for item in formatted_texts) + f'</{tag}>\n'
+        page_html += '</div>\n'
+        html_parts.append(page_html)
+    return ''.join(html_parts)
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed:>8.2f} s")
+    return result, elapsed
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(temp_dir, "corpus.pdf")
+        if len(sys.argv) <= 2:
+            build_corpus(input_path, page_count)
+        print(f"文档 {input_path}，{os.path.getsize(input_path) / 1024:.0f} KiB")
+
+        old_html, old_elapsed = measure("两遍分析 -> HTML", lambda: two_pass_html(input_path))
+        layout, new_elapsed = measure("一次分析 -> HTML", lambda: analyze_pdf_layout(input_path))
+        new_html = render_layout_html(layout)
+        print(f"HTML输出一致: {old_html == new_html}，加速比 {old_elapsed / new_elapsed:.2f}x")
+
+        pdf_converter._layout_cache.clear()
+        output_path = os.path.join(temp_dir, "out")
+        measure("HTML + Markdown（共用缓存）", lambda: (
+            pdf_converter.convert_pdf_to_html(input_path, output_path + ".html"),
+            pdf_converter.convert_pdf_to_md(input_path, output_path + ".md")
+        ))
+        measure("仅渲染Markdown", lambda: render_layout_md(layout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+PDF分页并行版面分析基准：对比单进程分析与不同进程数下的分片并行分析，输出加速比
+
+用法：python -m Benchmarks.bench_pdf_parallel [页数] [PDF路径]
+未指定PDF时使用reportlab生成测试文档（需安装reportlab）；进程数取1、2、4……直到CPU核数
+"""
+import concurrent.futures
+import os
+import sys
+import tempfile
+import time
+from Agents.FileConvertAgents.pdf_converter import analyze_pdf_layout, analyze_pdf_layout_parallel, get_page_count, render_layout_html
+from Benchmarks.bench_pdf_layout import build_corpus
+
+
+def worker_counts():
+    cpu_count = os.cpu_count() or 1
+    counts = []
+    count = 1
+    while count < cpu_count:
+        counts.append(count)
+        count *= 2
+    counts.append(cpu_count)
+    return counts
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(temp_dir, "corpus.pdf")
+        if len(sys.argv) <= 2:
+            build_corpus(input_path, page_count)
+        page_count = get_page_count(input_path)
+        print(f"文档 {input_path}，{page_count} 页，CPU核数 {os.cpu_count()}")
+
+        start = time.perf_counter()
+        expected = render_layout_html(analyze_pdf_layout(input_path))
+        serial_elapsed = time.perf_counter() - start
+        print(f"{'单进程':<12} {serial_elapsed:>8.2f} s")
+
+        for workers in worker_counts():
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                start = time.perf_counter()
+                layout = analyze_pdf_layout_parallel(input_path, page_count, pool)
+                elapsed = time.perf_counter() - start
+            print(f"{f'{workers} 进程':<12} {elapsed:>8.2f} s  加速比 {serial_elapsed / elapsed:.2f}x  "
+                  f"输出一致: {render_layout_html(layout) == expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+RAR模板写入基准：对比每次load_workbook解析模板与使用缓存模板副本的固定开销
+
+用法：python -m Benchmarks.bench_rar_template [写入条数]
+"""
+import io
+import sys
+import time
+from openpyxl import load_workbook
+from Agents.RarAgents.template_cache import rar_template_cache
+
+TEMPLATE_PATH = "./Files/RarUploads/RAR空白模板.xlsx"
+
+
+def write_rows(workbook, row_count):
+    worksheet = workbook.active
+    for row in range(6, 6 + row_count):
+        worksheet[f"A{row}"] = f"URS-{row}"
+        worksheet[f"B{row}"] = "系统应支持电子签名"
+    output = io.BytesIO()
+    workbook.save(output)
+    return output
+
+
+def measure(label, func, repeat=20):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<24} {best * 1000:>10.2f} ms")
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rar_template_cache.load(TEMPLATE_PATH)
+    print(f"写入条数 {row_count}")
+    measure("load_workbook", lambda: load_workbook(TEMPLATE_PATH))
+    measure("cache clone", lambda: rar_template_cache.clone(TEMPLATE_PATH))
+    measure("load_workbook + save", lambda: write_rows(load_workbook(TEMPLATE_PATH), row_count))
+    measure("cache clone + save", lambda: write_rows(rar_template_cache.clone(TEMPLATE_PATH), row_count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+文件审核结果编码基准：对比 FileReviewResult.model_dump() + json 与紧凑编码的体积和序列化耗时
+
+用法：python -m Benchmarks.bench_review_encoding [文本块数]
+"""
+import json
+import random
+import sys
+import time
+from Agents.FileReviewAgents.result_encoding import encode_compact, dumps
+from Models.FileReviewModels.ApiModels.file_review_api_models import FileReviewResult
+from Models.FileReviewModels.DomainModels.file_review_domain_models import TermError, FormatError, GrammarError
+
+
+def build_result(block_count):
+    """构造模拟审核结果：每个文本块约50字，含1~3个术语错误"""
+    random.seed(0)
+    term_errors = []
+    for block_index in range(block_count):
+        text = f"第{block_index}段：这个json文件通过api接口上传到服务端，由Deepseek模型完成解析。"
+        for word, revised in random.sample([("json", "JSON"), ("api", "API"), ("服务端", "服务器"), ("Deepseek", "DeepSeek")], k=random.randint(1, 3)):
+            # noinspection PyArgumentList
+            term_errors.append(TermError(
+                error_statement=text, type_of_error="术语不规范", error_word=word, revised=revised,
+                block_index=block_index, offset=text.find(word)
+            ))
+    # noinspection PyArgumentList
+    format_errors = [FormatError(
+        type_of_error="正文字体大小异常", current_value=f"{size}pt", expected_value="10.5pt",
+        text_snippet="明天打算去看电影", occurrences=10, locations=list(range(0, 1000, 100))
+    ) for size in range(8, 40)]
+    # noinspection PyArgumentList
+    grammar_errors = [GrammarError(error_statement="她很好我觉得", type_of_error="语序混乱", revised="我觉得她很好")
+                      for _ in range(block_count // 20)]
+    return FileReviewResult(grammar_errors=grammar_errors, term_errors=term_errors, format_errors=format_errors)
+
+
+def measure(label, func, repeat=5):
+    best = None
+    payload = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<32} {len(payload) / 1024:>10.1f} KiB {best * 1000:>10.1f} ms")
+
+
+def main():
+    block_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    result = build_result(block_count)
+    print(f"文本块 {block_count}，术语错误 {len(result.term_errors)}，格式错误 {len(result.format_errors)}")
+    measure("model_dump + json.dumps", lambda: json.dumps(result.model_dump(), ensure_ascii=False).encode("utf-8"))
+    measure("model_dump + json.dumps(indent=4)", lambda: json.dumps(result.model_dump(), ensure_ascii=False, indent=4).encode("utf-8"))
+    measure("encode_compact + dumps", lambda: dumps(encode_compact(result)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+序列化后端基准：在审核结果、RAR导出数据、JSON/YAML转换数据上对比各JSON、YAML后端的耗时，并检查输出是否与标准库、纯Python实现一致
+
+用法：python -m Benchmarks.bench_serialization [文本块数] [RAR条数] [记录数]
+"""
+import json
+import sys
+import time
+
+from Agents import serialization
+from Agents.FileReviewAgents.result_encoding import encode_compact
+from Benchmarks.bench_review_encoding import build_result
+from Models.RarModels.DomainModels.rar_domain_models import RarData
+
+
+def build_rar_items(count):
+    """模拟RAR分析结果：export_to_json写入的 {total_items, items}"""
+    # noinspection PyArgumentList
+    items = [RarData(
+        urs_no=f"URS-{index:04d}", requirement_desc="系统应支持电子签名，签名记录包含签名人、时间和签名含义",
+        belong_chapter=f"{index // 20 + 1}.{index % 20 + 1}", failure_event="电子签名缺失或与记录不关联",
+        potential_failure_consequences="无法追溯记录的审核人，数据完整性不符合法规要求",
+        severity="高", probability="中", risk_level="2", detectability="低", risk_priority="高",
+        risk_control_measures="启用电子签名,签名与记录绑定,定期审计签名日志"
+    ).model_dump() for index in range(count)]
+    return {"total_items": len(items), "items": items}
+
+
+def build_records(count):
+    """JSON、YAML转换的测试数据（与JSON流式转换基准的记录相同）"""
+    return [
+        {
+            "id": index,
+            "name": f"用户{index}",
+            "email": f"user{index}@example.com",
+            "score": index * 1.25,
+            "active": index % 3 == 0,
+            "tags": ["alpha", "beta"][:index % 3],
+            "address": {"city": "上海", "zip": f"{200000 + index}"},
+            "note": None
+        }
+        for index in range(count)
+    ]
+
+
+def measure(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def compare(kind, label, func, repeat=3):
+    """依次使用每个已安装的后端执行func，以最后一个（标准库、纯Python实现）为基准"""
+    backends = list(serialization.get_backends()[kind]["available"])
+    active = serialization.get_backends()[kind]["active"]
+    results = []
+    for name in backends:
+        serialization.set_backend(kind, name)
+        results.append((name, *measure(func, repeat)))
+    serialization.set_backend(kind, active)
+
+    _, baseline_time, baseline_output = results[-1]
+    for name, elapsed, output in results:
+        same = "输出一致" if output == baseline_output else "输出不一致"
+        print(f"{label:<28} {name:<8} {elapsed * 1000:>10.1f} ms {baseline_time / elapsed:>7.1f}x  {same}")
+
+
+def main():
+    block_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rar_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    record_count = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+    print(f"当前后端: {json.dumps(serialization.get_backends(), ensure_ascii=False)}")
+
+    result = build_result(block_count)
+    review = result.model_dump()
+    compact = encode_compact(result)
+    compare("json", "审核结果保存(缩进)", lambda: serialization.json_dumpb(review, pretty=True))
+    compare("json", "审核结果紧凑编码响应", lambda: serialization.json_dumpb(compact))
+
+    rar = build_rar_items(rar_count)
+    compare("json", "RAR导出JSON(缩进)", lambda: serialization.json_dumpb(rar, pretty=True))
+
+    records = build_records(record_count)
+    compare("json", "JSON -> TXT(缩进)", lambda: serialization.json_dumps(records, pretty=True))
+    compare("yaml", "JSON -> YAML", lambda: serialization.yaml_dump(records, allow_unicode=True, default_flow_style=False, indent=2), repeat=1)
+
+    yaml_text = serialization.yaml_dump(records, allow_unicode=True, default_flow_style=False)
+    compare("yaml", "YAML解析", lambda: serialization.yaml_load(yaml_text), repeat=1)
+    data = serialization.yaml_load(yaml_text)
+    compare("json", "YAML -> JSON(缩进)", lambda: serialization.json_dumps(data, pretty=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+审核快照回归检查：全量审核的结果经快照归属到段落后再按同一文档组装（基线全部复用），
+语法、术语、格式错误的数量和位置应与全量审核一致；文档中包含重复段落和重复格式单元；
+大模型返回的错误语句不在所在语法块中时（此处为第二个块中出现第一个块的语句）不写入快照，该块的段落不可复用
+
+用法：python -m Benchmarks.check_review_snapshot
+"""
+import sys
+
+from Agents.FileReviewAgents.grammar_prefilter import check_mechanical_errors
+from Agents.FileReviewAgents.review_snapshot import assemble_errors, build_snapshot, collect_paragraph_results, collect_unit_results, group_format_units, paragraph_key
+from Agents.FileReviewAgents.text_segmentation import split_paragraphs_into_textblocks
+from Models.FileReviewModels.DomainModels.file_review_domain_models import GrammarError, TermError
+
+PARAGRAPHS = ["这个json文件。", "中间段落。", "这个json文件。", "重复段落 the the 文件。", "其他内容。", "重复段落 the the 文件。"]
+
+
+def full_review(paragraphs):
+    """模拟全量审核：每次出现的段落各自给出结果，大模型对重复段落各报告一次"""
+    text_blocks, block_paragraphs = split_paragraphs_into_textblocks(paragraphs, max_length=50)
+    # noinspection PyArgumentList
+    term_errors = [
+        TermError(error_statement=block.strip(), type_of_error="术语错误", error_word="json", revised="JSON",
+                  block_index=index, offset=block.find("json"))
+        for index, block in enumerate(text_blocks) if "json" in block
+    ]
+    local_grammar_errors = [error for paragraph in paragraphs for error in check_mechanical_errors(paragraph)]
+    grammar_blocks = ['\n'.join(paragraphs[:3]), '\n'.join(paragraphs[3:])]
+    # noinspection PyArgumentList
+    grammar_results = [[
+        GrammarError(error_statement=paragraph, type_of_error="用词不当", revised=paragraph.replace("这个", "该"))
+        for paragraph in paragraphs[:3] if paragraph.startswith("这个")
+    ], [GrammarError(error_statement="这个json文件", type_of_error="用词不当", revised="该json文件")]]
+    styles = [
+        {"text": paragraph, "style_name": "Normal", "font_name": "宋体", "font_size": 12.0, "font_color": None, "paragraph_index": index}
+        for index, paragraph in enumerate(paragraphs)
+    ]
+    blocks = [{"styles": styles}]
+    format_violations = [("字体", "宋体", "黑体", paragraph, index, 1) for index, paragraph in enumerate(paragraphs) if "重复" in paragraph or "json" in paragraph]
+    return {
+        "text_blocks": text_blocks, "block_paragraphs": block_paragraphs, "blocks": blocks,
+        "grammar_blocks": grammar_blocks, "grammar_results": grammar_results, "local_grammar_errors": local_grammar_errors,
+        "grammar_errors": local_grammar_errors + grammar_results[0] + grammar_results[1], "term_errors": term_errors, "format_violations": format_violations
+    }
+
+
+def main():
+    review = full_review(PARAGRAPHS)
+    paragraph_results, unattributed = collect_paragraph_results(
+        PARAGRAPHS, review["grammar_blocks"], review["grammar_results"], review["local_grammar_errors"],
+        review["text_blocks"], review["block_paragraphs"], review["term_errors"]
+    )
+    units = group_format_units(review["blocks"])
+    unit_results = collect_unit_results(units, review["format_violations"])
+    grammar_errors, term_errors, format_violations = assemble_errors(
+        PARAGRAPHS, review["text_blocks"], review["block_paragraphs"], units, paragraph_results, unit_results
+    )
+    grammar_errors.extend(unattributed)
+    snapshot = build_snapshot("check", paragraph_results, unit_results)
+    reusable = [paragraph for paragraph in dict.fromkeys(PARAGRAPHS) if paragraph_key(paragraph) in snapshot["paragraphs"]]
+
+    checks = {
+        "语法错误": (sorted(error.model_dump_json() for error in review["grammar_errors"]),
+                     sorted(error.model_dump_json() for error in grammar_errors)),
+        "术语错误": ([error.model_dump() for error in review["term_errors"]], [error.model_dump() for error in term_errors]),
+        "格式违规": (sorted(review["format_violations"]), sorted(format_violations)),
+        "快照中的段落": (["这个json文件。", "中间段落。"], reusable)
+    }
+    failed = False
+    for label, (expected, actual) in checks.items():
+        same = expected == actual
+        failed = failed or not same
+        print(f"{label}  全量 {len(expected)}  复用快照 {len(actual)}  {'一致' if same else '不一致'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
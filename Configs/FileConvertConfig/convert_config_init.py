@@ -4,4 +4,18 @@ from pathlib import Path
 # 加载转换配置文件
 _config_path = Path(__file__).parent / "fileConvertConfig.json"
 with open(_config_path, 'r', encoding='utf-8') as f:
-    conversion_config = json.load(f)
\ No newline at end of file
+    conversion_config = json.load(f)
+
+# 暂不可用的转换：{源格式: {目标格式: 原因}}，不出现在conversion_map和可到达格式中，请求时返回原因
+conversion_config["disabled_conversions"] = {}
+
+# DOCX -> PDF由aspose.words渲染，未配置许可证时为评估模式（截断文档并添加水印），不提供该转换
+_license_path = conversion_config.get("pdfRendering", {}).get("licensePath", "")
+if not _license_path or not Path(_license_path).is_file():
+    _docx_targets = conversion_config["conversion_map"][".docx"]["target_formats"]
+    if ".pdf" in _docx_targets:
+        _docx_targets.remove(".pdf")
+        conversion_config["disabled_conversions"][".docx"] = {
+            ".pdf": "DOCX转PDF需要aspose.words许可证，请在配置pdfRendering.licensePath中指定许可证文件"
+                    "（未授权的评估模式会截断文档并添加水印）"
+        }
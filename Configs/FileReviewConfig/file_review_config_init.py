@@ -0,0 +1,138 @@
+"""
+文件审核配置注册表
+每个agent配置（fileReviewConfig{agent_id}.json）只解析一次并常驻内存，
+每个配置复用一个长连接的AsyncOpenAI客户端；配置文件修改后自动重新加载，
+api_key或base_url变化时创建新客户端，旧客户端等仍在使用它的请求结束后在事件循环中关闭，释放连接池
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from openai import AsyncOpenAI
+from Agents.FileReviewAgents.agent_format import compile_format_standards
+from Models.FileReviewModels.ApiModels.file_review_api_models import Config
+
+logger = logging.getLogger("file_review")
+
+_config_dir = Path(__file__).parent
+# 被替换的客户端延迟关闭的时间，与AsyncOpenAI默认的请求超时（600秒）一致，等待已发出的请求结束
+CLIENT_CLOSE_DELAY_SECONDS = 600
+
+
+class FileReviewConfigRegistry:
+    """按agent_id缓存解析后的配置和客户端"""
+
+    def __init__(self, config_dir=_config_dir):
+        self.config_dir = Path(config_dir)
+        self._entries = {}  # agent_id -> {"signature", "client_key", "config"}
+        self._lock = threading.Lock()
+        # 等待关闭旧客户端的任务，保留引用避免任务被垃圾回收
+        self._closing = set()
+        self.stats = {
+            "hits": 0,
+            "loads": 0,
+            "reloads": 0,
+            "clients_created": 0,
+            "clients_closed": 0
+        }
+
+    def _config_path(self, agent_id):
+        return self.config_dir / f"fileReviewConfig{agent_id}.json"
+
+    def get(self, agent_id):
+        """获取agent配置，文件未变化时直接返回缓存；文件不存在时抛出FileNotFoundError"""
+        config_path = self._config_path(agent_id)
+        stat = os.stat(config_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(agent_id)
+            if entry and entry["signature"] == signature:
+                self.stats["hits"] += 1
+                return entry["config"]
+
+            self.stats["reloads" if entry else "loads"] += 1
+            config, client_key = self._load(agent_id, config_path, entry)
+            self._entries[agent_id] = {
+                "signature": signature,
+                "client_key": client_key,
+                "config": config
+            }
+            return config
+
+    def _load(self, agent_id, config_path, previous):
+        """解析配置文件；api_key和base_url未变化时沿用原客户端及其连接池"""
+        logger.info(f"Loading configuration for agent ID: {agent_id}")
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config_obj = Config(**json.load(f))
+        file_review = config_obj.file_review
+
+        client_key = (file_review.api_key, file_review.base_url)
+        if previous and previous["client_key"] == client_key:
+            client = previous["config"]["client"]
+        else:
+            client = AsyncOpenAI(
+                api_key=file_review.api_key,
+                base_url=file_review.base_url
+            )
+            self.stats["clients_created"] += 1
+            if previous:
+                self._schedule_close(previous["config"]["client"])
+
+        config = {
+            "client": client,
+            "model_name": file_review.model_name,
+            "term_bank_path": file_review.term_bank_path,
+            "file_review_result_path": file_review.file_review_result_path,
+            "result_retention_hours": file_review.result_retention_hours,
+            # 格式标准在加载配置时预编译
+            "format_standards": compile_format_standards({
+                item.style_name: {
+                    "font_size": item.font_size,
+                    "font_color": item.font_color,
+                    "allowed_fonts": item.allowed_fonts
+                } for item in file_review.format_standards
+            }),
+            "chunking": file_review.chunking,
+            "prefilter": file_review.prefilter,
+            "batch": file_review.batch
+        }
+        logger.info(f"Configuration loaded successfully for agent ID: {agent_id}")
+        return config, client_key
+
+    def _schedule_close(self, client):
+        """在当前事件循环中延迟关闭被替换的客户端；不在事件循环中调用时无法关闭，交由垃圾回收"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("No running event loop, replaced OpenAI client is left to garbage collection")
+            return
+        task = loop.create_task(self._close_later(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_later(self, client):
+        await asyncio.sleep(CLIENT_CLOSE_DELAY_SECONDS)
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close replaced OpenAI client: {e}")
+            return
+        with self._lock:
+            self.stats["clients_closed"] += 1
+
+    def get_stats(self):
+        """缓存统计信息"""
+        with self._lock:
+            total = self.stats["hits"] + self.stats["loads"] + self.stats["reloads"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / total, 4) if total else 0.0,
+                "profiles": sorted(self._entries.keys())
+            }
+
+
+# 创建全局配置注册表实例
+file_review_config_registry = FileReviewConfigRegistry()
@@ -1,7 +1,7 @@
 # 保留以下与API直接相关的模型
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from Models.FileReviewModels.DomainModels.file_review_domain_models import FileReviewConfig,GrammarError,TermError,FormatError
+from Models.FileReviewModels.DomainModels.file_review_domain_models import FileReviewConfig,GrammarError,TermError,FormatError,ChunkReport,PrefilterReport,IncrementalReport
 
 
 
@@ -15,9 +15,13 @@ class Config(BaseModel):
 
 
 class FileReviewResult(BaseModel):
+    review_id: Optional[str] = None
     grammar_errors: List[GrammarError]
     term_errors: List[TermError]
     format_errors: List[FormatError]
+    chunk_report: Optional[ChunkReport] = None
+    prefilter_report: Optional[PrefilterReport] = None
+    incremental_report: Optional[IncrementalReport] = None
 
 
 class Example:
@@ -44,7 +48,9 @@ class Example:
                     "typeOfError": "正文字体大小异常",
                     "currentValue": "16.0pt",
                     "expectedValue": "10.5pt",
-                    "textSnippet": "明天打算去看电影"
+                    "textSnippet": "明天打算去看电影",
+                    "occurrences": 12,
+                    "locations": [3, 40]
                 }
             ]
         }
@@ -4,7 +4,7 @@
 """
 
 from pydantic import BaseModel,Field
-from typing import List, Tuple, Union, Optional
+from typing import Dict, List, Tuple, Union, Optional
 
 # 术语库相关模型
 class TermEntry(BaseModel):
@@ -37,6 +37,38 @@ class FormatStandard(BaseModel):
         populate_by_name = True
 
 
+# 分块相关模型
+class ChunkingConfig(BaseModel):
+    """语法审核分块配置（token预算）"""
+    context_window: int = Field(64000, alias='contextWindow', description="模型上下文长度（token）")
+    max_block_tokens: int = Field(1500, alias='maxBlockTokens', description="单个文本块的目标token上限")
+    min_block_tokens: int = Field(200, alias='minBlockTokens', description="单个文本块的token下限")
+    output_ratio: float = Field(1.0, alias='outputRatio', description="输出token相对输入token的预留倍数")
+
+    class Config:
+        populate_by_name = True
+
+
+class PrefilterConfig(BaseModel):
+    """语法审核本地预检配置"""
+    enabled: bool = Field(True, description="是否启用本地预检")
+    min_chars: int = Field(4, alias='minChars', description="少于该字符数的段落不送大模型审核")
+
+    class Config:
+        populate_by_name = True
+
+
+class BatchConfig(BaseModel):
+    """批量审核配置"""
+    max_files: int = Field(50, alias='maxFiles', description="单次批量审核的最大文件数")
+    max_total_mb: int = Field(500, alias='maxTotalMb', description="单次批量审核保存（含zip解压）的文件总大小上限（MB）")
+    max_concurrent_requests: int = Field(8, alias='maxConcurrentRequests', description="批内所有文件共享的大模型并发请求数")
+    extraction_workers: int = Field(0, alias='extractionWorkers', description="文档提取进程数，0表示使用CPU核数")
+
+    class Config:
+        populate_by_name = True
+
+
 class FileReviewConfig(BaseModel):
     api_key: str = Field(alias='apiKey')
     base_url: str = Field(alias='baseUrl')
@@ -44,6 +76,10 @@ class FileReviewConfig(BaseModel):
     term_bank_path: str = Field(alias='termBankPath')
     file_review_result_path: str = Field(alias='fileReviewResultPath')
     format_standards: List[FormatStandard] = Field(alias='formatStandards')
+    chunking: ChunkingConfig = Field(default_factory=ChunkingConfig, description="分块配置")
+    prefilter: PrefilterConfig = Field(default_factory=PrefilterConfig, description="语法审核本地预检配置")
+    result_retention_hours: float = Field(72, alias='resultRetentionHours', description="按任务生成的审核结果保留时长（小时）")
+    batch: BatchConfig = Field(default_factory=BatchConfig, description="批量审核配置")
     
     class Config:
         populate_by_name = True
@@ -78,6 +114,9 @@ class TermError(BaseModel):
     type_of_error: str = Field(alias='typeOfError', description="术语错误类型")
     error_word: str = Field(alias='errorWord', description="术语错误词")
     revised: str = Field(description="术语修正后的语句")
+    # 定位信息仅供紧凑编码使用，不出现在常规返回结果中
+    block_index: Optional[int] = Field(None, exclude=True, description="所在文本块序号")
+    offset: Optional[int] = Field(None, exclude=True, description="错误词在error_statement中的偏移")
     
     class Config:
         populate_by_name = True
@@ -88,10 +127,49 @@ class FormatError(BaseModel):
     current_value: str = Field(alias='currentValue', description="当前错误格式")
     expected_value: str = Field(alias='expectedValue', description="规定正确格式")
     text_snippet: str = Field(alias='textSnippet', description="格式错误片段")
+    occurrences: int = Field(1, description="该错误出现的run数")
+    locations: List[int] = Field(default_factory=list, description="错误所在片段的首个run序号（从0开始）")
     
     class Config:
         populate_by_name = True
 
 
+class ChunkReport(BaseModel):
+    """分块统计：提示词开销与正文token占比"""
+    block_count: int = Field(alias='blockCount', description="文本块数量（即大模型调用次数）")
+    block_tokens: int = Field(alias='blockTokens', description="单块token预算")
+    prompt_tokens: int = Field(alias='promptTokens', description="单次调用的系统提示词token数")
+    content_tokens: int = Field(alias='contentTokens', description="正文token总数")
+    overhead_tokens: int = Field(alias='overheadTokens', description="提示词token总开销")
+    overhead_ratio: float = Field(alias='overheadRatio', description="提示词开销占总输入token的比例")
 
+    class Config:
+        populate_by_name = True
 
+
+class PrefilterReport(BaseModel):
+    """语法审核本地预检统计"""
+    paragraph_count: int = Field(alias='paragraphCount', description="段落总数")
+    skipped: Dict[str, int] = Field(description="按原因统计的跳过段落数（too_short/numeric/code_like/approved）")
+    local_error_count: int = Field(alias='localErrorCount', description="本地发现的机械性错误数")
+    llm_calls: int = Field(0, alias='llmCalls', description="实际发送给大模型的文本块数")
+    llm_calls_without_prefilter: int = Field(0, alias='llmCallsWithoutPrefilter', description="不做预检时的文本块数")
+    avoided_ratio: float = Field(0.0, alias='avoidedRatio', description="避免的大模型调用比例")
+
+    class Config:
+        populate_by_name = True
+
+
+class IncrementalReport(BaseModel):
+    """增量审核统计"""
+    baseline_review_id: str = Field(alias='baselineReviewId', description="基线审核ID")
+    paragraph_count: int = Field(alias='paragraphCount', description="段落总数")
+    reviewed_paragraphs: int = Field(alias='reviewedParagraphs', description="重新审核的新增或修改段落数（相同内容只计一次）")
+    reused_paragraphs: int = Field(alias='reusedParagraphs', description="沿用基线结果的段落数")
+    removed_paragraphs: int = Field(alias='removedParagraphs', description="基线中已删除的段落数")
+    format_unit_count: int = Field(alias='formatUnitCount', description="参与格式审核的段落数")
+    reviewed_format_units: int = Field(alias='reviewedFormatUnits', description="重新执行格式审核的段落数")
+    reviewed_ratio: float = Field(alias='reviewedRatio', description="重新审核的字符占比")
+
+    class Config:
+        populate_by_name = True
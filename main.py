@@ -8,6 +8,9 @@ from Api.FileReviewApi.file_review_api import router as file_review_router
 from Api.RarApi.rar_api import router as rar_router,init_rar_config
 from Api.RarApi.file_download_api import router as download_router
 from Api.ConvertApi.convert_api import router as convert_router
+from Agents.FileReviewAgents.agent_terminology import shutdown_process_pool as shutdown_term_pool
+from Agents.FileReviewAgents.agent_batch_review import shutdown_extraction_pool
+from Agents.FileConvertAgents.conversion_pool import get_conversion_pool, shutdown_conversion_pool
 import uvicorn
 from Configs.logging_config import setup_logging
 
@@ -20,10 +23,14 @@ async def lifespan(app: FastAPI):
     # 服务启动时初始化配置
     logger.info("Initializing application...")
     init_rar_config() # 初始化RarApi的配置
+    get_conversion_pool() # 启动转换进程池，预先导入转换器模块
     logger.info("Application initialized successfully")
     yield
     # 此处可添加服务关闭时的清理逻辑（如有需要）
     logger.info("Application shutting down...")
+    shutdown_term_pool() # 关闭术语扫描进程池
+    shutdown_extraction_pool() # 关闭批量审核的文档提取进程池
+    shutdown_conversion_pool() # 关闭转换进程池
 
 def create_app():
     # 创建FastAPI应用实例